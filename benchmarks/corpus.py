@@ -0,0 +1,93 @@
+"""Generate synthetic keyword corpora for benchmarks."""
+import random
+from typing import List
+
+import xlsxwriter
+
+SYLLABLES = (
+    "ka ke ki ko lo la li mu ma me no na ni ro ra ri su sa se ta to ti "
+    "ve va vi ze zo za bar bel dan dor fen fir gal gor han hol"
+).split()
+
+STOPWORDS = "the for with and of to in on best how what is near".split()
+
+
+def make_vocabulary(vocab_size: int, seed: int = 0) -> List[str]:
+    """Build distinct pseudo-words from random syllables.
+
+    Args:
+        vocab_size(int): Number of words to build.
+        seed(int): Random seed. Default is 0.
+
+    Returns:
+        :obj:`list` of :obj:`str`: Distinct words, in rank order.
+
+    """
+    rng = random.Random(seed)
+    vocab: List[str] = []
+    seen = set(STOPWORDS)
+    while len(vocab) < vocab_size:
+        word = "".join(rng.choices(SYLLABLES, k=rng.randint(1, 4)))
+        if word not in seen:
+            seen.add(word)
+            vocab.append(word)
+    return vocab
+
+
+def generate_terms(
+    rows: int,
+    vocab_size: int = 20000,
+    zipf: float = 1.1,
+    max_words: int = 6,
+    stopword_rate: float = 0.1,
+    seed: int = 0,
+) -> List[str]:
+    """Generate keyword phrases with Zipf-distributed word frequencies.
+
+    Args:
+        rows(int): Number of phrases to generate.
+        vocab_size(int): Number of distinct content words. Default is 20000.
+        zipf(float): Zipf exponent; higher values skew frequency towards
+            the first words of the vocabulary. Default is 1.1.
+        max_words(int): Longest phrase length. Default is 6.
+        stopword_rate(float): Share of words drawn from STOPWORDS.
+            Default is 0.1.
+        seed(int): Random seed. Default is 0.
+
+    Returns:
+        :obj:`list` of :obj:`str`: Generated phrases.
+
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(vocab_size, seed)
+    weights = [1 / rank ** zipf for rank in range(1, vocab_size + 1)]
+    lengths = rng.choices(range(1, max_words + 1), k=rows)
+    words = rng.choices(vocab, weights=weights, k=sum(lengths))
+    terms = []
+    position = 0
+    for length in lengths:
+        phrase = words[position : position + length]
+        position += length
+        if rng.random() < stopword_rate * length:
+            phrase.insert(rng.randrange(length + 1), rng.choice(STOPWORDS))
+        terms.append(" ".join(phrase))
+    return terms
+
+
+def write_workbook(
+    file_path: str, terms: List[str], column_name: str = "Keyword"
+) -> None:
+    """Write terms to a single-column xlsx file.
+
+    Args:
+        file_path(str): Path of the workbook to write.
+        terms(:obj:`list` of :obj:`str`): Terms for the column.
+        column_name(str): Header of the column. Default is `Keyword`.
+
+    """
+    workbook = xlsxwriter.Workbook(file_path, {"constant_memory": True})
+    worksheet = workbook.add_worksheet()
+    worksheet.write(0, 0, column_name)
+    for row, term in enumerate(terms, start=1):
+        worksheet.write_string(row, 0, term)
+    workbook.close()
@@ -0,0 +1,152 @@
+"""Time each stage of the FileHandler -> Grammer -> write pipeline."""
+import datetime
+import json
+import os
+import platform
+import tempfile
+from typing import Any, Dict, List, Sequence
+
+import click
+from corpus import generate_terms, write_workbook
+
+from excel_ngrams.constants import COUNTERS, TOKENIZERS
+from excel_ngrams.file_handler import FileHandler
+from excel_ngrams.grammer import Grammer
+from excel_ngrams.metrics import format_table, Metrics
+
+
+def run_pipeline(
+    file_path: str,
+    max_n: int,
+    top_results: int,
+    tokenizer: str,
+    counter: str,
+) -> List[Dict[str, Any]]:
+    """Run the pipeline once on file_path, timing every stage.
+
+    Args:
+        file_path(str): Workbook with a `Keyword` column.
+        max_n(int): The longest phrase length to count.
+        top_results(int): The number of results per length.
+        tokenizer(str): Grammer tokenizer engine.
+        counter(str): Grammer counting engine.
+
+    Returns:
+        :obj:`list` of :obj:`dict`: Results for each stage, in order.
+
+    """
+    timer = Metrics()
+    file_handler = FileHandler(file_path)
+    with timer.stage("set_terms") as record:
+        terms = file_handler.set_terms(file_path, 0, "Keyword")
+        record["rows"] = len(terms)
+    with timer.stage("load_model"):
+        grammer = Grammer([], tokenizer=tokenizer, counter=counter)
+    with timer.stage("remove_escaped_chars"):
+        cleaned = grammer.remove_escaped_chars(terms)
+    with timer.stage("tokenize") as record:
+        tokens = list(grammer.tokenize_texts(cleaned))
+        record["tokens"] = sum(len(row) for row in tokens)
+    grammer = Grammer([], tokenizer=tokenizer, counter=counter, tokens=tokens)
+    with timer.stage("filter_stopwords"):
+        # The structures the default row boundary counts from.
+        grammer.get_unique_rows(stopwords=True)
+        grammer.get_row_counts()
+        if counter == "numpy":
+            grammer.get_unique_word_ids(stopwords=True)
+    results = {}
+    for n in range(1, max_n + 1):
+        with timer.stage(f"count_{n}"):
+            results[n] = grammer.get_ngrams(n, top_n_results=top_results)
+    with timer.stage("df_from_terms"):
+        dataframes = [grammer.df_from_terms(results[n], n) for n in results]
+    with timer.stage("combine_dataframes"):
+        combined = grammer.combine_dataframes(dataframes)
+    with timer.stage("write"):
+        output_path = file_handler.write(combined)
+    os.remove(f"{output_path}.csv")
+    click.echo(format_table(timer.stages))
+    return timer.stages
+
+
+@click.command()
+@click.option(
+    "--rows",
+    "-r",
+    multiple=True,
+    type=int,
+    default=[10_000, 100_000, 1_000_000],
+    show_default=True,
+)
+@click.option("--vocab-size", default=20_000, show_default=True)
+@click.option("--zipf", default=1.1, show_default=True)
+@click.option("--max-n", "-m", default=5, show_default=True)
+@click.option("--top-results", "-t", default=250, show_default=True)
+@click.option(
+    "--tokenizer",
+    type=click.Choice(TOKENIZERS),
+    default="spacy-full",
+    show_default=True,
+)
+@click.option(
+    "--counter", type=click.Choice(COUNTERS), default="python", show_default=True
+)
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False),
+    default="benchmarks/results.json",
+    show_default=True,
+)
+def main(
+    rows: Sequence[int],
+    vocab_size: int,
+    zipf: float,
+    max_n: int,
+    top_results: int,
+    tokenizer: str,
+    counter: str,
+    seed: int,
+    output: str,
+) -> None:
+    """Benchmark the n-gram pipeline on synthetic keyword corpora."""
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for row_count in rows:
+            click.echo(f"{row_count} rows")
+            file_path = os.path.join(tmp_dir, f"corpus_{row_count}.xlsx")
+            terms = generate_terms(row_count, vocab_size, zipf, seed=seed)
+            write_workbook(file_path, terms)
+            del terms
+            stages = run_pipeline(file_path, max_n, top_results, tokenizer, counter)
+            runs.append(
+                {
+                    "rows": row_count,
+                    "total_wall_s": round(sum(s["wall_s"] for s in stages), 4),
+                    "stages": stages,
+                }
+            )
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "vocab_size": vocab_size,
+            "zipf": zipf,
+            "max_n": max_n,
+            "top_results": top_results,
+            "tokenizer": tokenizer,
+            "counter": counter,
+            "seed": seed,
+        },
+        "runs": runs,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    click.secho(f"Results written to {output}.", fg="green")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ from nox.sessions import Session
 
 
 nox.options.sessions = "lint", "mypy", "pytype", "tests"
-locations = "src", "tests", "noxfile.py", "docs/conf.py"
+locations = "src", "tests", "benchmarks", "noxfile.py", "docs/conf.py"
 package = "excel_ngrams"
 
 
@@ -117,6 +117,14 @@ def typeguard(session: Session) -> None:
     session.run("pytest", f"--typeguard-packages={package}", *args)
 
 
+@nox.session(python="3.9")
+def benchmarks(session: Session) -> None:
+    """Benchmark pipeline stages on synthetic corpora."""
+    args = session.posargs or ["--rows=10000", "--rows=100000", "--rows=1000000"]
+    session.run("poetry", "install", "--no-dev", external=True)
+    session.run("python", "benchmarks/run.py", *args)
+
+
 @nox.session(python="3.9")
 def docs(session: Session) -> None:
     """Build the documentation."""
@@ -0,0 +1,237 @@
+"""Run n-gram analysis for many files, sheets and columns in one process."""
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import glob
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+from typing import Union
+
+import pandas as pd
+
+from .cache import CorpusCache
+from .file_handler import FileHandler
+from .grammer import Grammer
+
+# Columns of a batch manifest; sheet_name and column_name may be left out.
+MANIFEST_COLUMNS = ("file_path", "sheet_name", "column_name")
+
+SUMMARY_COLUMNS = (
+    "file_path",
+    "sheet_name",
+    "column_name",
+    "status",
+    "output_path",
+    "rows",
+    "tokens",
+    "wall_s",
+    "error",
+)
+
+
+class Job(NamedTuple):
+    """One column of one sheet to analyse."""
+
+    file_path: str
+    sheet_name: Union[int, str] = 0
+    column_name: str = "Keyword"
+
+
+def jobs_from_patterns(
+    patterns: Sequence[str], sheet_name: Union[int, str], column_name: str
+) -> List[Job]:
+    """Expands glob patterns into one job per matching file.
+
+    Args:
+        patterns(Sequence of :obj:`str`): Glob patterns, e.g. `exports/*.xlsx`.
+            `**` matches any number of directories.
+        sheet_name(int or str): The sheet to read from every file.
+        column_name(str): The column to read from every file.
+
+    Returns:
+        :obj:`list` of :obj:`Job`: Jobs in sorted path order, without
+            duplicates.
+
+    """
+    paths = {
+        path
+        for pattern in patterns
+        for path in glob.glob(pattern, recursive=True)
+        if os.path.isfile(path)
+    }
+    return [Job(path, sheet_name, column_name) for path in sorted(paths)]
+
+
+def read_manifest(
+    manifest_path: str, sheet_name: Union[int, str] = 0, column_name: str = "Keyword"
+) -> List[Job]:
+    """Reads jobs from a CSV manifest with a header row.
+
+    The manifest needs a `file_path` column and may have `sheet_name` and
+    `column_name` columns; blank cells take the given defaults. Relative
+    file paths are resolved from the manifest's directory.
+
+    Args:
+        manifest_path(str): The path to the manifest CSV file.
+        sheet_name(int or str): Default sheet. Default is 0 (first sheet).
+        column_name(str): Default column. Default is `Keyword`.
+
+    Returns:
+        :obj:`list` of :obj:`Job`: Jobs in manifest order.
+
+    Raises:
+        ValueError: The manifest has no `file_path` column.
+
+    """
+    base_dir = os.path.dirname(manifest_path)
+    with open(manifest_path, newline="") as f:
+        reader = csv.DictReader(f)
+        if "file_path" not in (reader.fieldnames or ()):
+            raise ValueError(f"Manifest {manifest_path} has no 'file_path' column")
+        jobs = []
+        for row in reader:
+            file_path = (row.get("file_path") or "").strip()
+            if not file_path:
+                continue
+            jobs.append(
+                Job(
+                    os.path.join(base_dir, file_path),
+                    (row.get("sheet_name") or "").strip() or sheet_name,
+                    (row.get("column_name") or "").strip() or column_name,
+                )
+            )
+    return jobs
+
+
+def job_label(job: Job) -> str:
+    """str: Sheet and column of job, safe for use in a file name."""
+    return re.sub(r"[^\w.-]+", "-", f"{job.sheet_name}_{job.column_name}")
+
+
+def warm_model(tokenizer: str) -> None:
+    """Load the Spacy model and stopwords once in a worker process."""
+    Grammer([], tokenizer=tokenizer)
+
+
+def run_job(job: Job, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyses one job and writes its output, recording any error.
+
+    Grammer's model and stopwords are class attributes, so they are loaded
+    by the first job in a process and reused by every later one.
+
+    Args:
+        job(Job): The file, sheet and column to analyse.
+        settings(dict): Options shared by all jobs: input_format, max_n,
+            top_results, stopwords, stopwords_file, tokenizer, counter,
+            boundary, memory_budget, stream, cache_dir, cache_size (in MB),
+            output_format and xlsx_layout.
+
+    Returns:
+        dict: Summary row for the job with the SUMMARY_COLUMNS keys.
+
+    """
+    summary = dict.fromkeys(SUMMARY_COLUMNS)
+    summary.update(job._asdict())
+    start = time.perf_counter()
+    try:
+        file_handler = FileHandler(*job, input_format=settings["input_format"])
+        tokens = None
+        if settings["cache_dir"] is not None:
+            corpus_cache = CorpusCache(
+                settings["cache_dir"], max_size=settings["cache_size"] * 1024 * 1024
+            )
+            cache_key = corpus_cache.make_key(
+                *job,
+                settings["tokenizer"],
+                split_sentences=settings["boundary"] == "sentence",
+            )
+            tokens = corpus_cache.get(cache_key)
+        terms: Iterable[str]
+        if tokens is not None:
+            terms = []
+        elif settings["stream"]:
+            terms = file_handler.iter_terms()
+        else:
+            terms = file_handler.get_terms()
+
+        grammer = Grammer(
+            terms,
+            tokenizer=settings["tokenizer"],
+            counter=settings["counter"],
+            boundary=settings["boundary"],
+            memory_budget=settings["memory_budget"],
+            tokens=tokens,
+            stopwords_file=settings["stopwords_file"],
+        )
+        rows = grammer.tokenize()
+        if settings["cache_dir"] is not None and tokens is None:
+            corpus_cache.put(cache_key, rows)
+        results_dataframe = grammer.ngram_range(
+            settings["max_n"],
+            top_n_results=settings["top_results"],
+            stopwords=settings["stopwords"],
+        )
+        output_path = file_handler.write(
+            results_dataframe,
+            label=job_label(job),
+            output_format=settings["output_format"],
+            xlsx_layout=settings["xlsx_layout"],
+        )
+        summary.update(
+            status="ok",
+            output_path=f"{output_path}.{settings['output_format']}",
+            rows=len(rows),
+            tokens=sum(len(row) for row in rows),
+        )
+    except Exception as error:
+        summary.update(status="failed", error=str(error) or type(error).__name__)
+    summary["wall_s"] = round(time.perf_counter() - start, 4)
+    return summary
+
+
+def run_batch(
+    jobs: Sequence[Job], settings: Dict[str, Any], workers: int = 1
+) -> Iterator[Dict[str, Any]]:
+    """Runs jobs serially or across worker processes.
+
+    Each worker process loads the Spacy model once when it starts and keeps
+    it for every job it is given. A failed job doesn't stop the others.
+
+    Args:
+        jobs(Sequence of :obj:`Job`): Jobs to run.
+        settings(dict): Options shared by all jobs, see run_job.
+        workers(int): Number of jobs run at once. Default is 1.
+
+    Yields:
+        dict: Summary row for each job, in job order.
+
+    """
+    if workers == 1 or len(jobs) < 2:
+        for job in jobs:
+            yield run_job(job, settings)
+        return
+    with ProcessPoolExecutor(
+        min(workers, len(jobs)),
+        initializer=warm_model,
+        initargs=(settings["tokenizer"],),
+    ) as executor:
+        yield from executor.map(run_job, jobs, [settings] * len(jobs))
+
+
+def write_summary(summaries: List[Dict[str, Any]], path: Optional[str]) -> str:
+    """Writes job summary rows to a csv file.
+
+    Args:
+        summaries(:obj:`list` of :obj:`dict`): Rows from run_job.
+        path(str, optional): Where to write. Default is a timestamped
+            `batch_<datetime>_summary.csv` in the working directory.
+
+    Returns:
+        str: Path to which the summary was written.
+
+    """
+    if path is None:
+        path = f"batch_{time.strftime('%Y%m%d%H%M%S')}_summary.csv"
+    pd.DataFrame(summaries, columns=SUMMARY_COLUMNS).to_csv(path, index=False)
+    return path
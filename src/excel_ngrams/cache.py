@@ -0,0 +1,252 @@
+"""Cache tokenised corpora on disk between runs, and tokens in memory."""
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Bump when cleaning or tokenising changes so stale entries are never read.
+CACHE_VERSION = 1
+
+# Separates words in the stored vocabulary; cleaned terms never contain it.
+SEPARATOR = "\x00"
+
+
+def file_digest(file_path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents.
+
+    Args:
+        file_path(str): The path to the file to hash.
+        block_size(int): Bytes read at a time. Default is 1 MiB.
+
+    Returns:
+        str: Hex digest of the file.
+
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CorpusCache:
+    """Class to store and load tokenised rows in a cache directory.
+
+    Each entry holds the words of every row as a vocabulary and an array of
+    integer ids with row offsets, saved as a compressed NumPy archive. When
+    the directory grows beyond max_size bytes, least recently used entries
+    are removed; reading an entry marks it as used.
+
+    Attributes:
+        cache_dir(str): Directory holding cache entries.
+        max_size(int): Maximum total size of entries in bytes.
+
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = 512 * 1024 * 1024) -> None:
+        """Constructs attributes for CorpusCache, creating cache_dir."""
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        file_path: str,
+        sheet_name: Union[int, str],
+        column_name: str,
+        tokenizer: str,
+        split_sentences: bool = False,
+    ) -> str:
+        """Builds the cache key for a column tokenised with given settings.
+
+        Args:
+            file_path(str): The path to the input file, hashed by content.
+            sheet_name(int or str): The name or number of the sheet.
+            column_name(str): The name of the column of terms.
+            tokenizer(str): The Grammer tokenizer engine.
+            split_sentences(bool): Whether rows are split into sentences
+                before tokenising, as with the sentence boundary.
+                Default is False.
+
+        Returns:
+            str: Key identifying the tokenised corpus.
+
+        """
+        settings = f"{CACHE_VERSION}|{sheet_name!r}|{column_name}|{tokenizer}"
+        if split_sentences:
+            settings += "|sentences"
+        digest = hashlib.sha256(file_digest(file_path).encode())
+        digest.update(settings.encode())
+        return digest.hexdigest()
+
+    def get_path(self, key: str) -> str:
+        """str: Path of the entry for key."""
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key: str) -> Optional[List[List[str]]]:
+        """Loads tokenised rows for key.
+
+        Args:
+            key(str): Key from make_key.
+
+        Returns:
+            :obj:`list` of :obj:`list` of :obj:`str`: Words for each row,
+                or None if key isn't cached.
+
+        """
+        path = self.get_path(key)
+        try:
+            with np.load(path) as entry:
+                vocab = entry["vocab"].tobytes().decode("utf-8").split(SEPARATOR)
+                ids = entry["ids"].tolist()
+                offsets = entry["offsets"].tolist()
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process sharing cache_dir since loading.
+            pass
+        words = [vocab[i] for i in ids]
+        return [words[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    def put(self, key: str, rows: List[List[str]]) -> None:
+        """Stores tokenised rows for key, then evicts old entries.
+
+        Args:
+            key(str): Key from make_key.
+            rows(:obj:`list` of :obj:`list` of :obj:`str`): Words for
+                each row.
+
+        """
+        index: Dict[str, int] = {}
+        ids = [index.setdefault(word, len(index)) for row in rows for word in row]
+        offsets = np.cumsum([0] + [len(row) for row in rows], dtype=np.int64)
+        vocab = SEPARATOR.join(index).encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(
+                f,
+                vocab=np.frombuffer(vocab, dtype=np.uint8),
+                ids=np.array(ids, dtype=np.int32),
+                offsets=offsets,
+            )
+        os.replace(tmp_path, self.get_path(key))
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until within max_size.
+
+        Entries another process sharing cache_dir removes meanwhile are
+        skipped.
+
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class TokenMemo:
+    """Class holding the words of recently tokenised texts in memory.
+
+    A least recently used map from tokenizer and text to the words of the
+    text, bounded by number of entries. One memo is shared by every Grammer
+    in a process, so a text repeated across rows, n-gram lengths, instances
+    or, in a long-lived process, runs is tokenised once. Lookups are
+    counted so the memo can be sized from its hit rate.
+
+    Attributes:
+        max_entries(int): Most texts held. 0 holds none.
+        hits(int): Lookups that found the text.
+        misses(int): Lookups that didn't.
+
+    """
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        """Constructs an empty memo with room for max_entries texts."""
+        if max_entries < 0:
+            raise ValueError("max_entries can't be negative")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, ...]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        """int: Number of texts held."""
+        return len(self._entries)
+
+    def get(self, tokenizer: str, text: str) -> Optional[Tuple[str, ...]]:
+        """Looks up the words of text, marking it as used.
+
+        Args:
+            tokenizer(str): The Grammer tokenizer engine.
+            text(str): A cleaned text.
+
+        Returns:
+            :obj:`tuple` of :obj:`str`: Words of text, or None if it isn't
+                held.
+
+        """
+        key = (tokenizer, text)
+        words = self._entries.get(key)
+        if words is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return words
+
+    def put(self, tokenizer: str, text: str, words: Sequence[str]) -> None:
+        """Stores the words of text, evicting the least recently used.
+
+        Args:
+            tokenizer(str): The Grammer tokenizer engine.
+            text(str): A cleaned text.
+            words(Sequence of :obj:`str`): Its words.
+
+        """
+        key = (tokenizer, text)
+        self._entries[key] = tuple(words)
+        self._entries.move_to_end(key)
+        self.resize(self.max_entries)
+
+    def resize(self, max_entries: int) -> None:
+        """Sets max_entries, evicting the least recently used beyond it.
+
+        Args:
+            max_entries(int): Most texts to hold. 0 empties the memo.
+
+        """
+        self.max_entries = max_entries
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """dict: Entries held, max_entries, hits, misses and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
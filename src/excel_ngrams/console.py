@@ -1,42 +1,809 @@
 """Command-line interface."""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from typing import TYPE_CHECKING
+
 import click
 
 from . import __version__
-from .file_handler import FileHandler
-from .grammer import Grammer
+from .constants import BOUNDARIES, COUNTERS, INPUT_FORMATS, OUTPUT_FORMATS
+from .constants import RANK_METRICS, SPACY_BATCH_SIZE, TOKEN_MEMO_SIZE
+from .constants import TOKENIZERS, XLSX_LAYOUTS
 
+if TYPE_CHECKING:
+    from .file_handler import FileHandler
 
-@click.command()
-@click.option("--file-path", "-f", type=click.Path(exists=True), required=True)
-@click.option("--sheet-name", "-s", default=0, type=str, show_default=True)
-@click.option("--column-name", "-c", default="Keyword", type=str, show_default=True)
-@click.option("--max-n", "-m", default=5, show_default=True)
-@click.option("--top-results", "-t", default=250, show_default=True)
-@click.option("--stopwords", "-w", default=True, show_default=True)
+
+input_format_option = click.option(
+    "--input-format",
+    type=click.Choice(INPUT_FORMATS),
+    default=None,
+    help="Format of the input file. Default is detected from its extension,"
+    " reading unknown extensions as Excel. txt files hold one term per line.",
+)
+
+boundary_option = click.option(
+    "--boundary",
+    type=click.Choice(BOUNDARIES),
+    default="row",
+    show_default=True,
+    help="Count n-grams within each row, within each sentence of a row, or"
+    " (none) also across the end of one row and the start of the next.",
+)
+
+output_format_option = click.option(
+    "--output-format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="csv",
+    show_default=True,
+    help="parquet and feather hold one row per n-gram with columns n, rank,"
+    " term and frequency, and need pyarrow.",
+)
+
+xlsx_layout_option = click.option(
+    "--xlsx-layout",
+    type=click.Choice(XLSX_LAYOUTS),
+    default="per-n",
+    show_default=True,
+    help="Write xlsx output with a sheet per n-gram length, or with every"
+    " length side by side on one sheet as in csv output.",
+)
+
+
+def written_message(output_file_path: str, output_format: str) -> str:
+    """str: Message saying where output of output_format was written."""
+    if output_format.startswith("csv"):
+        kind = "CSV"
+    elif output_format == "xlsx":
+        kind = "Excel"
+    else:
+        kind = output_format.capitalize()
+    return f"{kind} file written to {output_file_path}."
+
+
+def analysis_options(function: Callable[..., None]) -> Callable[..., None]:
+    """Adds the options shared by every command that runs Grammer.
+
+    Args:
+        function(Callable): Click command callback.
+
+    Returns:
+        Callable: The callback with input, sheet, column, n-gram, tokenizer,
+            counter, cache and output options added.
+
+    """
+    options = [
+        input_format_option,
+        click.option(
+            "--sheet-name",
+            "-s",
+            default=0,
+            type=str,
+            show_default=True,
+            help="Sheet name or number, a comma-separated list of them, or"
+            " 'all'. Several sheets are read in one pass over the workbook.",
+        ),
+        click.option(
+            "--column-name", "-c", default="Keyword", type=str, show_default=True
+        ),
+        click.option("--max-n", "-m", default=5, show_default=True),
+        click.option("--top-results", "-t", default=250, show_default=True),
+        click.option("--stopwords", "-w", default=True, show_default=True),
+        click.option(
+            "--stopwords-file",
+            type=click.Path(exists=True, dir_okay=False),
+            default=None,
+            help="Text file of stopwords, one per line, instead of the bundled"
+            " English set.",
+        ),
+        click.option(
+            "--tokenizer",
+            type=click.Choice(TOKENIZERS),
+            default="spacy-full",
+            show_default=True,
+            help="spacy-tokenizer and regex skip tagging, parsing and NER.",
+        ),
+        click.option(
+            "--counter",
+            type=click.Choice(COUNTERS),
+            default="python",
+            show_default=True,
+            help="numpy counts integer-encoded n-grams with vectorised operations.",
+        ),
+        boundary_option,
+        click.option(
+            "--memory-budget",
+            type=click.IntRange(min=1),
+            default=None,
+            help="Count approximately, tracking at most this many n-grams per"
+            " length. Adds an error bound column to the output.",
+        ),
+        click.option(
+            "--stream/--no-stream",
+            default=False,
+            show_default=True,
+            help="Read the column row by row instead of loading the whole sheet.",
+        ),
+        click.option(
+            "--cache-dir",
+            type=click.Path(file_okay=False),
+            default=None,
+            help="Reuse tokenised terms stored here by earlier runs on the same"
+            " file.",
+        ),
+        click.option(
+            "--cache-size",
+            default=512,
+            type=click.IntRange(min=0),
+            show_default=True,
+            help="Maximum size of the cache directory in MB.",
+        ),
+        output_format_option,
+        xlsx_layout_option,
+    ]
+    for option in reversed(options):
+        function = option(function)
+    return function
+
+
+def parse_batch_size(
+    ctx: click.Context, param: click.Parameter, value: str
+) -> Optional[int]:
+    """Converts --batch-size to a positive int, or None for auto.
+
+    Args:
+        ctx(click.Context): The command context.
+        param(click.Parameter): The option.
+        value(str): The option's value.
+
+    Returns:
+        int: The batch size, or None to tune it.
+
+    Raises:
+        BadParameter: value is neither auto nor a positive whole number.
+
+    """
+    if value == "auto":
+        return None
+    if not value.isdigit() or int(value) < 1:
+        raise click.BadParameter("expected a positive whole number or auto")
+    return int(value)
+
+
+def memo_message(stats: Dict[str, Any]) -> str:
+    """str: One line summary of TokenMemo.stats, for --profile."""
+    rate = "n/a" if stats["hit_rate"] is None else f"{stats['hit_rate']:.1%}"
+    return (
+        f"Token memo: {stats['hits']} hits, {stats['misses']} misses ({rate}),"
+        f" {stats['entries']} of {stats['max_entries']} entries used"
+    )
+
+
+def report_metrics(
+    stages: List[Dict[str, Any]], profile: bool, metrics_json: Optional[str]
+) -> None:
+    """Prints stage metrics and/or writes them to JSON.
+
+    Printed metrics end with the hit rate of the shared token memo.
+
+    Args:
+        stages(list): Stage records from one or more Metrics objects.
+        profile(bool): Whether to print them as a table.
+        metrics_json(str, optional): Path of a JSON file to write them to.
+
+    """
+    from .grammer import Grammer
+    from .metrics import format_table, write_json
+
+    if profile:
+        click.echo(format_table(stages))
+        click.echo(memo_message(Grammer.token_memo().stats()))
+    if metrics_json is not None:
+        write_json(stages, metrics_json)
+
+
+def check_conflicts(
+    state_path: Optional[str],
+    cache_dir: Optional[str],
+    memory_budget: Optional[int],
+    per_sheet: bool,
+    weight_column: Optional[str] = None,
+    rank_by: str = "frequency",
+    stream: bool = False,
+    boundary: str = "row",
+) -> None:
+    """Rejects options of main that can't be used together.
+
+    Args:
+        state_path(str, optional): The --state option.
+        cache_dir(str, optional): The --cache-dir option.
+        memory_budget(int, optional): The --memory-budget option.
+        per_sheet(bool): The --per-sheet option.
+        weight_column(str, optional): The --weight-column option.
+        rank_by(str): The --rank-by option.
+        stream(bool): The --stream option.
+        boundary(str): The --boundary option.
+
+    Raises:
+        UsageError: Options conflict.
+
+    """
+    if state_path is not None and (cache_dir is not None or memory_budget):
+        raise click.UsageError(
+            "--state can't be combined with --cache-dir or --memory-budget."
+        )
+    if per_sheet and (state_path is not None or cache_dir is not None):
+        raise click.UsageError(
+            "--per-sheet can't be combined with --state or --cache-dir."
+        )
+    if rank_by == "weight" and weight_column is None:
+        raise click.UsageError("--rank-by weight needs --weight-column.")
+    weighted_options = [
+        name
+        for name, given in (
+            ("--state", state_path is not None),
+            ("--cache-dir", cache_dir is not None),
+            ("--memory-budget", memory_budget is not None),
+            ("--per-sheet", per_sheet),
+            ("--stream", stream),
+            ("--boundary none", boundary == "none"),
+        )
+        if given
+    ]
+    if weight_column is not None and weighted_options:
+        raise click.UsageError(
+            f"--weight-column can't be combined with {', '.join(weighted_options)}."
+        )
+
+
+def analyse_sheets(
+    file_handler: "FileHandler",
+    grammer_options: Dict[str, Any],
+    ngram_options: Dict[str, Any],
+    output_format: str,
+    xlsx_layout: str,
+) -> List[Dict[str, Any]]:
+    """Analyses each selected sheet on its own, writing a file per sheet.
+
+    Args:
+        file_handler(FileHandler): Handler for the input workbook.
+        grammer_options(dict): Keyword arguments for Grammer.
+        ngram_options(dict): Keyword arguments for Grammer.ngram_range.
+        output_format(str): Passed to FileHandler.write.
+        xlsx_layout(str): Passed to FileHandler.write.
+
+    Returns:
+        list: Stage records of each sheet's Grammer.
+
+    """
+    from .batch import Job, job_label
+    from .grammer import Grammer
+
+    stages = []
+    for sheet, terms in file_handler.get_sheet_terms().items():
+        click.echo(f"Performing n-gram analysis of sheet {sheet}...")
+        grammer = Grammer(terms, **grammer_options)
+        results_dataframe = grammer.ngram_range(**ngram_options)
+        label = job_label(Job(file_handler.file_path, sheet, file_handler.column_name))
+        output_file_path = file_handler.write(
+            results_dataframe,
+            label=label,
+            output_format=output_format,
+            xlsx_layout=xlsx_layout,
+        )
+        click.secho(written_message(output_file_path, output_format), fg="green")
+        stages += grammer.metrics.stages
+    return stages
+
+
+@click.group(invoke_without_command=True)
+@click.option("--file-path", "-f", type=click.Path(exists=True), default=None)
+@analysis_options
+@click.option(
+    "--workers",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Processes used to tokenise terms.",
+)
+@click.option(
+    "--batch-size",
+    default=str(SPACY_BATCH_SIZE),
+    callback=parse_batch_size,
+    show_default=True,
+    help="Texts spaCy tokenises per batch, or auto to time a few sizes on"
+    " the first texts and keep the fastest.",
+)
+@click.option(
+    "--token-memo-size",
+    default=TOKEN_MEMO_SIZE,
+    type=click.IntRange(min=0),
+    show_default=True,
+    help="Distinct texts whose tokens are kept in memory for reuse. 0 turns"
+    " the memo off.",
+)
+@click.option(
+    "--weight-column",
+    default=None,
+    help="Column of numbers, e.g. search volume, read with the terms. Each"
+    " n-gram also gets the total weight of the rows it occurs in.",
+)
+@click.option(
+    "--rank-by",
+    type=click.Choice(RANK_METRICS),
+    default="frequency",
+    show_default=True,
+    help="Rank n-grams by frequency or, with --weight-column, by weight.",
+)
+@click.option(
+    "--per-sheet/--merge-sheets",
+    default=False,
+    show_default=True,
+    help="With several sheets, write a file for each sheet instead of one"
+    " analysis of them all.",
+)
+@click.option(
+    "--state",
+    "state_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Keep full counts in this file and on later runs only count rows"
+    " appended since. Recounts everything if earlier rows or settings change.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Print time, rows, tokens and peak memory for each stage.",
+)
+@click.option(
+    "--metrics-json",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write time, rows, tokens and peak memory for each stage to JSON.",
+)
 @click.version_option(version=__version__)
+@click.pass_context
 def main(
-    file_path: str,
+    ctx: click.Context,
+    file_path: Optional[str],
+    input_format: Optional[str],
     sheet_name: str,
     column_name: str,
     max_n: int,
     top_results: int,
     stopwords: bool,
+    stopwords_file: Optional[str],
+    tokenizer: str,
+    counter: str,
+    boundary: str,
+    memory_budget: Optional[int],
+    stream: bool,
+    cache_dir: Optional[str],
+    cache_size: int,
+    output_format: str,
+    xlsx_layout: str,
+    workers: int,
+    batch_size: Optional[int],
+    token_memo_size: int,
+    weight_column: Optional[str],
+    rank_by: str,
+    per_sheet: bool,
+    state_path: Optional[str],
+    profile: bool,
+    metrics_json: Optional[str],
 ) -> None:
     """Excel n-grams project CLI interface."""
+    if ctx.invoked_subcommand is not None:
+        return
+    if file_path is None:
+        raise click.UsageError("Missing option '--file-path' / '-f'.")
+    check_conflicts(
+        state_path,
+        cache_dir,
+        memory_budget,
+        per_sheet,
+        weight_column,
+        rank_by,
+        stream,
+        boundary,
+    )
+    # Imported here so --help and --version don't load spaCy, NLTK or pandas.
+    from .cache import CorpusCache
+    from .file_handler import FileHandler
+    from .grammer import Grammer
+    from .state import make_settings, open_state
+
+    Grammer.token_memo().resize(token_memo_size)
     file_handler = FileHandler(
-        file_path=file_path, sheet_name=sheet_name, column_name=column_name
+        file_path=file_path,
+        sheet_name=sheet_name,
+        column_name=column_name,
+        input_format=input_format,
+        weight_column=weight_column,
     )
-    text_to_anlayse = file_handler.get_terms()
+    if per_sheet:
+        click.echo("Reading file...")
+        stages = analyse_sheets(
+            file_handler,
+            dict(
+                tokenizer=tokenizer,
+                workers=workers,
+                batch_size=batch_size,
+                counter=counter,
+                memory_budget=memory_budget,
+                stopwords_file=stopwords_file,
+                boundary=boundary,
+            ),
+            dict(max_n=max_n, top_n_results=top_results, stopwords=stopwords),
+            output_format,
+            xlsx_layout,
+        )
+        report_metrics(file_handler.metrics.stages + stages, profile, metrics_json)
+        return
+    read_terms = file_handler.iter_terms if stream else file_handler.get_terms
+    corpus_cache = None
+    tokens = None
+    if cache_dir is not None:
+        corpus_cache = CorpusCache(cache_dir, max_size=cache_size * 1024 * 1024)
+        cache_key = corpus_cache.make_key(
+            file_path,
+            sheet_name,
+            column_name,
+            tokenizer,
+            split_sentences=boundary == "sentence",
+        )
+        tokens = corpus_cache.get(cache_key)
+
+    if tokens is not None:
+        text_to_anlayse: Iterable[str] = []
+        click.echo("Using cached tokens...")
+    else:
+        text_to_anlayse = read_terms()
+        click.echo("Reading file...")
 
-    click.echo("Reading file...")
+    state = None
+    if state_path is not None:
+        settings = make_settings(tokenizer, stopwords, stopwords_file, boundary)
+        state, text_to_anlayse = open_state(state_path, settings, max_n, read_terms)
+        click.echo(f"Skipping {state.rows} rows counted by an earlier run...")
 
-    grammer = Grammer(text_to_anlayse)
+    grammer = Grammer(
+        text_to_anlayse,
+        tokenizer=tokenizer,
+        workers=workers,
+        batch_size=batch_size,
+        counter=counter,
+        memory_budget=memory_budget,
+        tokens=tokens,
+        stopwords_file=stopwords_file,
+        boundary=boundary,
+        weights=file_handler.get_weights(),
+        rank_by=rank_by,
+    )
+    if corpus_cache is not None and tokens is None:
+        corpus_cache.put(cache_key, grammer.tokenize())
 
     click.echo("Performing n-gram analysis...")
 
-    results_dataframe = grammer.ngram_range(
-        max_n, top_n_results=top_results, stopwords=stopwords
+    if state is not None:
+        state.update(grammer, stopwords)
+        state.save(state_path)
+        results_dataframe = grammer.ngram_range_from_counts(
+            state.counts, top_n_results=top_results
+        )
+    else:
+        results_dataframe = grammer.ngram_range(
+            max_n, top_n_results=top_results, stopwords=stopwords
+        )
+    output_file_path = file_handler.write(
+        results_dataframe, output_format=output_format, xlsx_layout=xlsx_layout
+    )
+
+    click.secho(written_message(output_file_path, output_format), fg="green")
+
+    report_metrics(
+        file_handler.metrics.stages + grammer.metrics.stages, profile, metrics_json
+    )
+
+
+@main.command()
+@click.argument("patterns", nargs=-1)
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="CSV file with file_path and optional sheet_name and column_name"
+    " columns, one job per row.",
+)
+@analysis_options
+@click.option(
+    "--workers",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Jobs run at once, each in its own process with its own loaded model.",
+)
+@click.option(
+    "--summary",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Path of the summary csv. Default is batch_<datetime>_summary.csv.",
+)
+def batch(
+    patterns: Sequence[str],
+    manifest: Optional[str],
+    input_format: Optional[str],
+    sheet_name: str,
+    column_name: str,
+    max_n: int,
+    top_results: int,
+    stopwords: bool,
+    stopwords_file: Optional[str],
+    tokenizer: str,
+    counter: str,
+    boundary: str,
+    memory_budget: Optional[int],
+    stream: bool,
+    cache_dir: Optional[str],
+    cache_size: int,
+    output_format: str,
+    xlsx_layout: str,
+    workers: int,
+    summary: Optional[str],
+) -> None:
+    """Analyse each file matching PATTERNS or listed in --manifest."""
+    from .batch import jobs_from_patterns, read_manifest, run_batch, write_summary
+
+    if not patterns and manifest is None:
+        raise click.UsageError("Give file patterns or --manifest.")
+    jobs = jobs_from_patterns(patterns, sheet_name, column_name)
+    if manifest is not None:
+        jobs += read_manifest(manifest, sheet_name, column_name)
+    if not jobs:
+        raise click.ClickException("No input files found.")
+
+    settings = {
+        "input_format": input_format,
+        "max_n": max_n,
+        "top_results": top_results,
+        "stopwords": stopwords,
+        "stopwords_file": stopwords_file,
+        "tokenizer": tokenizer,
+        "counter": counter,
+        "boundary": boundary,
+        "memory_budget": memory_budget,
+        "stream": stream,
+        "cache_dir": cache_dir,
+        "cache_size": cache_size,
+        "output_format": output_format,
+        "xlsx_layout": xlsx_layout,
+    }
+    click.echo(f"Running {len(jobs)} jobs...")
+    summaries = []
+    for job_summary in run_batch(jobs, settings, workers=workers):
+        summaries.append(job_summary)
+        job = f"{job_summary['file_path']} [{job_summary['sheet_name']}]"
+        if job_summary["status"] == "ok":
+            click.echo(f"{job}: written to {job_summary['output_path']}")
+        else:
+            click.secho(f"{job}: failed: {job_summary['error']}", fg="red")
+
+    summary_path = write_summary(summaries, summary)
+    click.secho(f"Summary written to {summary_path}.", fg="green")
+    failed = sum(job_summary["status"] != "ok" for job_summary in summaries)
+    if failed:
+        raise click.ClickException(f"{failed} of {len(jobs)} jobs failed.")
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", "-p", default=8000, type=int, show_default=True)
+@click.option(
+    "--workers",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Requests analysed at once, each worker process keeping its own model.",
+)
+@click.option(
+    "--max-queue",
+    default=8,
+    type=click.IntRange(min=0),
+    show_default=True,
+    help="Requests that may wait for a worker before others get a 503.",
+)
+@click.option(
+    "--tokenizer",
+    type=click.Choice(TOKENIZERS),
+    default="spacy-full",
+    show_default=True,
+    help="Loaded at startup and used when a request doesn't choose one.",
+)
+@click.option(
+    "--stopwords-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Text file of stopwords, one per line, instead of the bundled English set.",
+)
+@click.option(
+    "--timeout",
+    default=300.0,
+    type=click.FloatRange(min=0),
+    show_default=True,
+    help="Seconds to wait for an analysis before replying with a 504.",
+)
+def serve(
+    host: str,
+    port: int,
+    workers: int,
+    max_queue: int,
+    tokenizer: str,
+    stopwords_file: Optional[str],
+    timeout: float,
+) -> None:
+    """Serve n-gram analysis over HTTP with the model kept loaded."""
+    from .server import NgramServer
+
+    server = NgramServer(
+        (host, port),
+        workers=workers,
+        max_queue=max_queue,
+        tokenizer=tokenizer,
+        stopwords_file=stopwords_file,
+        timeout=timeout,
+    )
+    click.secho(f"Serving on http://{host}:{server.server_address[1]}", fg="green")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@main.command()
+@click.option("--file-path", "-f", type=click.Path(exists=True), required=True)
+@input_format_option
+@click.option("--sheet-name", "-s", default=0, type=str, show_default=True)
+@click.option("--column-name", "-c", default="Keyword", type=str, show_default=True)
+@click.option("--max-n", "-m", default=5, show_default=True)
+@click.option("--stopwords", "-w", default=True, show_default=True)
+@click.option(
+    "--stopwords-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Text file of stopwords, one per line, instead of the bundled English set.",
+)
+@click.option(
+    "--tokenizer",
+    type=click.Choice(TOKENIZERS),
+    default="spacy-full",
+    show_default=True,
+    help="spacy-tokenizer and regex skip tagging, parsing and NER.",
+)
+@boundary_option
+@click.option(
+    "--workers",
+    "-j",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Processes used to tokenise terms.",
+)
+@click.option(
+    "--stream/--no-stream",
+    default=False,
+    show_default=True,
+    help="Read the column row by row instead of loading the whole sheet.",
+)
+@click.option(
+    "--prune",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Keep only this many n-grams per length. Merged counts then carry"
+    " an error bound.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="Path of the snapshot file to write.",
+)
+def snapshot(
+    file_path: str,
+    input_format: Optional[str],
+    sheet_name: str,
+    column_name: str,
+    max_n: int,
+    stopwords: bool,
+    stopwords_file: Optional[str],
+    tokenizer: str,
+    boundary: str,
+    workers: int,
+    stream: bool,
+    prune: Optional[int],
+    output: str,
+) -> None:
+    """Write full n-gram counts of one shard of a corpus, for merge."""
+    from .file_handler import FileHandler
+    from .grammer import Grammer
+    from .state import CountState, make_settings
+
+    file_handler = FileHandler(
+        file_path=file_path,
+        sheet_name=sheet_name,
+        column_name=column_name,
+        input_format=input_format,
     )
-    output_file_path = file_handler.write(results_dataframe)
+    read_terms = file_handler.iter_terms if stream else file_handler.get_terms
+    settings = make_settings(tokenizer, stopwords, stopwords_file, boundary)
+    state = CountState(settings, max_n)
+    grammer = Grammer(
+        state.new_rows(read_terms()),
+        tokenizer=tokenizer,
+        workers=workers,
+        stopwords_file=stopwords_file,
+        boundary=boundary,
+    )
+    click.echo("Counting n-grams...")
+    state.update(grammer, stopwords)
+    if prune is not None:
+        state.prune(prune)
+    state.save(output)
+    click.secho(f"Snapshot of {state.rows} rows written to {output}.", fg="green")
+
+
+@main.command()
+@click.argument("snapshots", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--top-results", "-t", default=250, show_default=True)
+@click.option(
+    "--output",
+    "-o",
+    default="merged",
+    show_default=True,
+    help="Output path, before the datetime and n-grams suffix.",
+)
+@output_format_option
+@xlsx_layout_option
+def merge(
+    snapshots: Sequence[str],
+    top_results: int,
+    output: str,
+    output_format: str,
+    xlsx_layout: str,
+) -> None:
+    """Merge snapshots, given in corpus order, into n-gram results."""
+    from .file_handler import FileHandler
+    from .grammer import Grammer
+    from .state import CountState, merge_errors, merge_states
 
-    click.secho(f"CSV file written to {output_file_path}.", fg="green")
+    states = []
+    for path in snapshots:
+        state = CountState.load(path)
+        if state is None:
+            raise click.ClickException(f"Can't read snapshot {path}")
+        states.append(state)
+    try:
+        merged = merge_states(states)
+    except ValueError as error:
+        raise click.ClickException(str(error)) from None
+
+    error_bounds = None
+    if any(merged.bounds.values()):
+        error_bounds = {
+            n: merge_errors(
+                states, n, (key for key, _ in counts.most_common(top_results))
+            )
+            for n, counts in merged.counts.items()
+        }
+    grammer = Grammer([], tokens=[])
+    results_dataframe = grammer.ngram_range_from_counts(
+        merged.counts, top_n_results=top_results, error_bounds=error_bounds
+    )
+    output_file_path = FileHandler(output).write(
+        results_dataframe, output_format=output_format, xlsx_layout=xlsx_layout
+    )
+    click.secho(written_message(output_file_path, output_format), fg="green")
@@ -0,0 +1,30 @@
+"""Engine names shared by Grammer and the CLI.
+
+Kept free of heavy imports so the CLI can build its options without
+loading spaCy, NLTK, NumPy or pandas.
+"""
+
+TOKENIZERS = ("spacy-full", "spacy-tokenizer", "regex")
+
+COUNTERS = ("python", "numpy")
+
+# Where ngrams stop: at the end of each row, of each sentence, or nowhere.
+BOUNDARIES = ("row", "sentence", "none")
+
+# Input formats, detected from the file extension unless given.
+INPUT_FORMATS = ("excel", "csv", "tsv", "parquet", "txt")
+
+# csv formats keep the side-by-side layout; columnar formats are long/tidy.
+OUTPUT_FORMATS = ("csv", "csv.gz", "parquet", "feather", "xlsx")
+
+# xlsx output has a sheet per n-gram length or the side-by-side layout.
+XLSX_LAYOUTS = ("per-n", "side-by-side")
+
+# Weighted results are ranked by frequency or by their weight total.
+RANK_METRICS = ("frequency", "weight")
+
+# Texts held by the token memo shared by Grammer instances in a process.
+TOKEN_MEMO_SIZE = 100_000
+
+# Texts spaCy buffers per batch unless the batch size is given or tuned.
+SPACY_BATCH_SIZE = 1000
@@ -0,0 +1,264 @@
+"""Count ngrams as packed integer keys or with bounded memory."""
+import heapq
+import itertools
+from typing import Dict, Generic, Hashable, Iterable, List, Optional, Sequence
+from typing import Tuple, TypeVar
+
+import numpy as np
+
+# Largest key that can be packed before windows are re-encoded.
+MAX_KEY = np.iinfo(np.int64).max
+
+# Item type counted by SpaceSaving, e.g. ngram tuples.
+T = TypeVar("T", bound=Hashable)
+
+
+def encode_words(words: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """Map each word to an integer id, in order of first appearance.
+
+    Args:
+        words(Sequence of :obj:`str`): Words to encode.
+
+    Returns:
+        ids(np.ndarray): Id of each word in words.
+        vocab(:obj:`list` of :obj:`str`): Word for each id.
+
+    """
+    vocab: Dict[str, int] = {}
+    ids = np.fromiter(
+        (vocab.setdefault(word, len(vocab)) for word in words),
+        dtype=np.int64,
+        count=len(words),
+    )
+    return ids, list(vocab)
+
+
+def ngram_keys(ids: np.ndarray, vocab_size: int, n: int) -> np.ndarray:
+    """Pack each window of n ids into a single integer key.
+
+    Keys are built one column at a time as key * vocab_size + id. If the
+    next step could overflow int64, the keys so far are replaced by their
+    rank among distinct keys, which keeps them below the number of windows.
+
+    Args:
+        ids(np.ndarray): Word ids in corpus order.
+        vocab_size(int): Number of distinct ids.
+        n(int): The length of phrases to pack.
+
+    Returns:
+        np.ndarray: One key per ngram position; equal ngrams share a key.
+
+    """
+    windows = len(ids) - n + 1
+    keys = ids[:windows].copy()
+    for i in range(1, n):
+        if keys.size and int(keys.max()) + 1 > MAX_KEY // max(vocab_size, 1):
+            keys = np.unique(keys, return_inverse=True)[1].astype(np.int64)
+        keys = keys * vocab_size + ids[i : i + windows]
+    return keys
+
+
+def window_keys(
+    ids: np.ndarray, vocab_size: int, n: int, row_ids: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack the windows of n ids to count, optionally within rows only.
+
+    Args:
+        ids(np.ndarray): Word ids in corpus order.
+        vocab_size(int): Number of distinct ids.
+        n(int): The length of phrases to pack.
+        row_ids(np.ndarray, optional): Row of each word, non-decreasing.
+            When given, windows whose first and last words are in different
+            rows are left out. Default is None (every window).
+
+    Returns:
+        keys(np.ndarray): Key of each window kept, from ngram_keys.
+        positions(np.ndarray): Position of the first word of each window.
+
+    """
+    keys = ngram_keys(ids, vocab_size, n)
+    if row_ids is None:
+        return keys, np.arange(len(keys))
+    positions = np.flatnonzero(row_ids[: len(keys)] == row_ids[n - 1 :])
+    return keys[positions], positions
+
+
+def top_ngrams(
+    ids: np.ndarray,
+    vocab: List[str],
+    n: int,
+    top_n_results: int,
+    row_ids: Optional[np.ndarray] = None,
+    row_counts: Optional[np.ndarray] = None,
+) -> List[Tuple[Tuple[str, ...], int]]:
+    """Count ngrams of encoded words and return the most frequent.
+
+    Ranking matches Counter.most_common over the same words: descending
+    frequency, ties in order of first occurrence. Only the returned
+    ngrams are decoded back to strings.
+
+    Args:
+        ids(np.ndarray): Word ids in corpus order.
+        vocab(:obj:`list` of :obj:`str`): Word for each id.
+        n(int): The length of phrases to count.
+        top_n_results(int): The number of results to return.
+        row_ids(np.ndarray, optional): Row of each word, non-decreasing.
+            When given, windows whose first and last words are in different
+            rows are masked out before counting. Default is None (count
+            every window).
+        row_counts(np.ndarray, optional): Times each row occurs, with
+            row_ids. Windows in a row are counted that many times. Default
+            is None (once).
+
+    Returns:
+        :obj:`list` of :obj:`tuple`[:obj:`tuple`[str, ...], int]:
+            List of tuples containing term(s) and values.
+
+    """
+    if len(ids) < n or top_n_results <= 0:
+        return []
+    keys, positions = window_keys(ids, len(vocab), n, row_ids)
+    if row_counts is None:
+        _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    else:
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        window_counts = row_counts[row_ids[positions]]
+        counts = np.bincount(inverse, weights=window_counts).astype(np.int64)
+    first = positions[first]
+    order = np.lexsort((first, -counts))[:top_n_results]
+    return [
+        (tuple(vocab[i] for i in ids[first[j] : first[j] + n]), int(counts[j]))
+        for j in order
+    ]
+
+
+def top_weighted_ngrams(
+    ids: np.ndarray,
+    vocab: List[str],
+    n: int,
+    top_n_results: int,
+    weights: np.ndarray,
+    row_ids: Optional[np.ndarray] = None,
+    rank_by: str = "frequency",
+) -> List[Tuple[Tuple[str, ...], int, float]]:
+    """Count and sum the weights of ngrams of encoded words.
+
+    Each window adds the weight of its first word, which with row_ids is
+    the weight of the row it is in. Totals are summed per distinct key with
+    np.bincount. Ranking is as top_ngrams, by frequency or by total.
+
+    Args:
+        ids(np.ndarray): Word ids in corpus order.
+        vocab(:obj:`list` of :obj:`str`): Word for each id.
+        n(int): The length of phrases to count.
+        top_n_results(int): The number of results to return.
+        weights(np.ndarray): Weight of each word.
+        row_ids(np.ndarray, optional): Row of each word, as for top_ngrams.
+        rank_by(str): `frequency` or `weight`. Default is frequency.
+
+    Returns:
+        :obj:`list` of :obj:`tuple`[:obj:`tuple`[str, ...], int, float]:
+            Term(s), frequency and weight total of each result.
+
+    """
+    if len(ids) < n or top_n_results <= 0:
+        return []
+    keys, positions = window_keys(ids, len(vocab), n, row_ids)
+    _, first, inverse, counts = np.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True
+    )
+    totals = np.bincount(inverse, weights=weights[positions], minlength=len(counts))
+    first = positions[first]
+    metric = totals if rank_by == "weight" else counts
+    order = np.lexsort((first, -metric))[:top_n_results]
+    return [
+        (
+            tuple(vocab[i] for i in ids[first[j] : first[j] + n]),
+            int(counts[j]),
+            float(totals[j]),
+        )
+        for j in order
+    ]
+
+
+class SpaceSaving(Generic[T]):
+    """Approximate heavy-hitter counter using the Space-Saving algorithm.
+
+    At most capacity items are tracked. When a new item arrives and the
+    table is full, the item with the smallest count is evicted and the new
+    item inherits that count, which is recorded as its error. Every tracked
+    count overestimates the true frequency by at most its error, and every
+    error is at most total / capacity, so items seen more often than that
+    are always tracked.
+
+    Attributes:
+        capacity(int): Maximum number of items tracked.
+        total(int): Number of items seen.
+
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Constructs an empty summary with room for capacity items."""
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[T, int] = {}
+        self._errors: Dict[T, int] = {}
+        # Min-heap of (count, sequence, item); entries go stale as counts
+        # rise and are refreshed lazily when they reach the top.
+        self._heap: List[Tuple[int, int, T]] = []
+        self._sequence = itertools.count()
+
+    def _pop_min(self) -> Tuple[T, int]:
+        """Remove and return the tracked item with the smallest count."""
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self._counts[item] == count:
+                return item, count
+            entry = (self._counts[item], next(self._sequence), item)
+            heapq.heappush(self._heap, entry)
+
+    def update(self, items: Iterable[T]) -> None:
+        """Add each of items to the summary.
+
+        Args:
+            items(Iterable): Items to count, e.g. ngram tuples.
+
+        """
+        counts = self._counts
+        for item in items:
+            self.total += 1
+            if item in counts:
+                counts[item] += 1
+                continue
+            error = 0
+            if len(counts) >= self.capacity:
+                evicted, error = self._pop_min()
+                del counts[evicted]
+                del self._errors[evicted]
+            counts[item] = error + 1
+            self._errors[item] = error
+            heapq.heappush(self._heap, (error + 1, next(self._sequence), item))
+
+    @property
+    def max_error(self) -> int:
+        """int: Upper bound on the overestimate of any tracked count."""
+        return self.total // self.capacity
+
+    def most_common(self, top_n_results: int) -> List[Tuple[T, int, int]]:
+        """Return the items with the highest estimated counts.
+
+        Args:
+            top_n_results(int): The number of results to return.
+
+        Returns:
+            :obj:`list` of :obj:`tuple`[item, int, int]: Item, estimated
+                count and error bound, by descending count.
+
+        """
+        ranked = sorted(self._counts.items(), key=lambda pair: pair[1], reverse=True)
+        return [
+            (item, count, self._errors[item])
+            for item, count in ranked[: max(top_n_results, 0)]
+        ]
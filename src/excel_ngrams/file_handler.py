@@ -1,46 +1,265 @@
 """Return list of words from column in spreadsheet."""
 import datetime
+import importlib.util
+import itertools
 import os
-from typing import List, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from typing import Union
 
 import click
+import openpyxl
 import pandas as pd
+import xlsxwriter
+
+from .constants import INPUT_FORMATS, OUTPUT_FORMATS, XLSX_LAYOUTS
+from .metrics import Metrics
+
+# Input format for each file extension. Anything else is read as Excel.
+INPUT_EXTENSIONS = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".tab": "tsv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".txt": "txt",
+}
+
+# Compression extensions pandas infers, skipped when detecting the format.
+COMPRESSION_EXTENSIONS = (".gz", ".bz2", ".zip", ".xz")
+
+# Rows read at a time from csv, tsv and parquet inputs.
+CHUNK_ROWS = 65536
+
+# Columns of the long output, after any error bound or weight column is added.
+LONG_COLUMNS = ["n", "rank", "term", "frequency"]
+
+
+def input_format_from_path(file_path: str) -> str:
+    """Detects the input format of a file from its extension.
+
+    Args:
+        file_path(str): The path of the input file, e.g. `terms.csv.gz`.
+
+    Returns:
+        str: One of INPUT_FORMATS, `excel` if the extension isn't known.
+
+    """
+    root, extension = os.path.splitext(file_path.lower())
+    if extension in COMPRESSION_EXTENSIONS:
+        extension = os.path.splitext(root)[1]
+    return INPUT_EXTENSIONS.get(extension, "excel")
+
+
+def parse_sheet_names(
+    sheet_name: Union[int, str, List[Union[int, str]], None]
+) -> Union[int, str, List[Union[int, str]], None]:
+    """Reads a sheet option that may name several sheets.
+
+    Args:
+        sheet_name(int, str, list or None): `all`, a comma-separated list
+            of sheet names or numbers, or a single sheet. Text made only of
+            digits is a sheet number. Anything other than text is returned
+            as it is.
+
+    Returns:
+        int, str, list or None: The sheet, a list of sheets with numbers as
+            ints, or None for every sheet, as for pd.read_excel.
+
+    """
+    if not isinstance(sheet_name, str):
+        return sheet_name
+    if sheet_name.lower() == "all":
+        return None
+    if "," not in sheet_name:
+        return int(sheet_name) if sheet_name.isdigit() else sheet_name
+    names = [name.strip() for name in sheet_name.split(",") if name.strip()]
+    return [int(name) if name.isdigit() else name for name in names]
+
+
+def require_pyarrow(purpose: str) -> None:
+    """Raises ClickException unless pyarrow is installed.
+
+    Args:
+        purpose(str): What needs pyarrow, e.g. `parquet output`.
+
+    Raises:
+        ClickException: pyarrow isn't installed.
+
+    """
+    if not importlib.util.find_spec("pyarrow"):
+        raise click.ClickException(
+            f"{purpose} needs pyarrow: pip install 'excel-ngrams[columnar]'"
+        )
+
+
+def to_long_format(df: pd.DataFrame) -> pd.DataFrame:
+    """Reshapes side-by-side ngram_range output into one row per ngram.
+
+    Args:
+        df(pd.DataFrame): Combined dataframe from Grammer.ngram_range,
+            with NaN padding where lengths have fewer results.
+
+    Returns:
+        pd.DataFrame: Columns n, rank (from 1), term and frequency, plus
+            error_bound in approximate mode and weight when weighted, with
+            integer counts.
+
+    """
+    frames = []
+    for column in df.columns:
+        if not column.endswith("-gram"):
+            continue
+        length = int(df[column].notna().sum())
+        frame = pd.DataFrame(
+            {
+                "n": int(column.split("-")[0]),
+                "rank": range(1, length + 1),
+                "term": df[column].iloc[:length].astype(str).tolist(),
+                "frequency": df[f"{column} frequency"].iloc[:length].tolist(),
+            }
+        )
+        if f"{column} error bound" in df.columns:
+            frame["error_bound"] = df[f"{column} error bound"].iloc[:length].tolist()
+        if f"{column} weight" in df.columns:
+            frame["weight"] = df[f"{column} weight"].iloc[:length].tolist()
+        frames.append(frame)
+    long_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    counts = [c for c in ("n", "rank", "frequency", "error_bound") if c in long_df]
+    return long_df.astype({column: "int64" for column in counts})
+
+
+def cell_value(value: object) -> object:
+    """object: value to write to a cell, with whole floats as ints."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def write_xlsx(df: pd.DataFrame, file_path: str, layout: str = "per-n") -> None:
+    """Writes ngram_range output to an Excel workbook.
+
+    The workbook is written in XlsxWriter's constant_memory mode, which
+    flushes each row to disk once the next one is started, so rows are
+    written strictly in order and NaN padding is left as empty cells.
+
+    Args:
+        df(pd.DataFrame): Combined dataframe from Grammer.ngram_range.
+        file_path(str): Path of the workbook to write.
+        layout(str): per-n writes a sheet for each n-gram length with its
+            term, frequency and any error bound or weight columns.
+            side-by-side writes df as it is to one sheet. Default is per-n.
+
+    Raises:
+        ValueError: Unknown layout.
+
+    """
+    if layout not in XLSX_LAYOUTS:
+        raise ValueError(
+            f"Unknown xlsx layout {layout!r}, expected one of {XLSX_LAYOUTS}"
+        )
+    if layout == "per-n":
+        sheets = [
+            (f"{column}s", [c for c in df.columns if c.startswith(column)])
+            for column in df.columns
+            if column.endswith("-gram")
+        ]
+    else:
+        sheets = [("n-grams", list(df.columns))]
+    # Terms are written as text even if they look like formulas or URLs.
+    workbook = xlsxwriter.Workbook(
+        file_path,
+        {
+            "constant_memory": True,
+            "strings_to_formulas": False,
+            "strings_to_urls": False,
+        },
+    )
+    try:
+        bold = workbook.add_format({"bold": True})
+        for sheet_name, columns in sheets:
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, columns, bold)
+            for row, values in enumerate(
+                df[columns].itertuples(index=False, name=None), start=1
+            ):
+                if pd.isna(values[0]) and layout == "per-n":
+                    break
+                for col, value in enumerate(values):
+                    if not pd.isna(value):
+                        worksheet.write(row, col, cell_value(value))
+    finally:
+        workbook.close()
 
 
 class FileHandler:
     """Class to handle reading, data extraction, and writing to files.
 
+    Besides Excel workbooks, terms can be read from a column of a csv, tsv
+    or parquet file, reading only that column a chunk at a time, or from a
+    text file with one term per line.
+
     Attributes:
-        file_path(str): The path to Excel file to be read.
-        sheet_name(int or str): The name or number of the sheet to read from.
+        file_path(str): The path to the file to be read.
+        sheet_name(int, str, list or None): The name or number of the sheet
+            to read from, a list of them, or None for every sheet, as
+            returned by parse_sheet_names. Terms of several sheets are read
+            one sheet after another. Only used for Excel input.
         column_name(str): The name of the column to be read from.
-            Defaults to 'Keyword'.
+            Defaults to 'Keyword'. Not used for txt input.
+        input_format(str): One of INPUT_FORMATS. Defaults to the format
+            detected from the file extension.
+        weight_column(str, optional): The name of a column of numbers,
+            e.g. search volume, read with the terms by get_terms. Not used
+            for txt input or by iter_terms.
         term_list(list): A list of terms (read from from Excel column).
+            Read on first call to get_terms, so a FileHandler used only for
+            iter_terms never holds the whole column.
+        weight_list(list): Weight of each term in term_list, read with it
+            when weight_column is set. Empty and non-numeric cells are 0.
+        metrics(Metrics): Time, rows and peak memory of set_terms and
+            write calls. Streaming reads are interleaved with tokenising,
+            so they are timed as part of Grammer's tokenize stage.
 
     """
 
     def __init__(
         self,
         file_path: str,
-        sheet_name: Union[int, str] = 0,
+        sheet_name: Union[int, str, List[Union[int, str]], None] = 0,
         column_name: str = "Keyword",
+        input_format: Optional[str] = None,
+        weight_column: Optional[str] = None,
     ) -> None:
         """Constructs attributes for FileHandler object."""
         self.file_path = file_path
-        self.sheet_name = sheet_name
+        self.sheet_name = parse_sheet_names(sheet_name)
         self.column_name = column_name
-        self.term_list = self.set_terms(file_path, sheet_name, column_name)
+        self.input_format = input_format or input_format_from_path(file_path)
+        if self.input_format not in INPUT_FORMATS:
+            raise click.ClickException(
+                f"Unknown input format {self.input_format!r}, expected one of"
+                f" {INPUT_FORMATS}"
+            )
+        self.weight_column = weight_column
+        self.term_list: Optional[List[str]] = None
+        self.weight_list: Optional[List[float]] = None
+        self.metrics = Metrics()
 
     def set_terms(
-        self, file_path: str, sheet_name: Union[int, str], column_name: str
+        self,
+        file_path: str,
+        sheet_name: Union[int, str, List[Union[int, str]], None],
+        column_name: str,
     ) -> List[str]:
         """Sets term_list attribute from Excel doc.
 
-        Uses Pandas DataFrame as an intermediate to generate list.
+        Uses Pandas DataFrame as an intermediate to generate list, read by
+        read_columns.
 
         Args:
             file_path(str): The path to Excel file to read terms from.
-            sheet_name(int or str): The name or number of the sheet containing terms.
+            sheet_name(int, str, list or None): The name or number of the
+                sheet containing terms, a list of them, or None for all.
                 Defaults to 0 (first sheet when sheets are unnamed).
             column_name(str): The name of the column header containing terms.
                 Defaults to `Keyword`.
@@ -49,53 +268,363 @@ class FileHandler:
             list: Terms from Excel as Python array.
 
         """
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
-        return df[column_name].tolist()
+        with self.metrics.stage("set_terms") as record:
+            terms = self.read_columns(file_path, sheet_name, [column_name])[
+                column_name
+            ]
+            record["rows"] = len(terms)
+        return terms
+
+    def set_weighted_terms(self) -> Tuple[List[str], List[float]]:
+        """Reads terms and the weight_column of each row in one pass.
+
+        Returns:
+            terms(:obj:`list` of :obj:`str`): Terms, as from set_terms.
+            weights(:obj:`list` of :obj:`float`): Weight of each term, 0
+                where the cell is empty or not a number.
+
+        """
+        with self.metrics.stage("set_terms") as record:
+            columns = self.read_columns(
+                self.file_path, self.sheet_name, [self.column_name, self.weight_column]
+            )
+            terms = columns[self.column_name]
+            weights = pd.to_numeric(
+                pd.Series(columns[self.weight_column], dtype=object), errors="coerce"
+            )
+            record["rows"] = len(terms)
+        return terms, weights.fillna(0).astype(float).tolist()
+
+    def read_columns(
+        self,
+        file_path: str,
+        sheet_name: Union[int, str, List[Union[int, str]], None],
+        column_names: Sequence[str],
+    ) -> Dict[str, List[Any]]:
+        """Reads columns from the input in one pass, keeping empty rows.
+
+        Several sheets are read by read_sheets and joined in sheet order.
+        Other input formats are read by column_chunks.
+
+        Args:
+            file_path(str): The path to the file to read.
+            sheet_name(int, str, list or None): The sheet, list of sheets,
+                or None for every sheet. Only used for Excel input.
+            column_names(Sequence of :obj:`str`): Column headers to read.
+
+        Returns:
+            dict: Values of each column, in row order.
+
+        """
+        column_names = list(dict.fromkeys(column_names))
+        if self.input_format == "excel" and isinstance(sheet_name, (int, str)):
+            df = pd.read_excel(file_path, sheet_name=sheet_name)
+            for name in column_names:
+                self.check_column(df.columns, name)
+            return {name: df[name].tolist() for name in column_names}
+        parts: Iterable[Dict[str, List[Any]]]
+        if self.input_format == "excel":
+            parts = self.read_sheets(file_path, sheet_name, column_names).values()
+        else:
+            parts = self.column_chunks(file_path, column_names)
+        columns: Dict[str, List[Any]] = {name: [] for name in column_names}
+        for part in parts:
+            for name in column_names:
+                columns[name].extend(part[name])
+        return columns
+
+    def read_sheets(
+        self,
+        file_path: str,
+        sheet_name: Union[int, str, List[Union[int, str]], None],
+        column_names: Sequence[str],
+    ) -> Dict[Union[int, str], Dict[str, List[Any]]]:
+        """Reads columns from each of several sheets of one workbook.
+
+        The workbook is opened and its zip parsed once, then each sheet is
+        read from it in turn.
+
+        Args:
+            file_path(str): The path to Excel file to read terms from.
+            sheet_name(int, str, list or None): The sheet, list of sheets,
+                or None for every sheet in workbook order.
+            column_names(Sequence of :obj:`str`): Column headers to read
+                from each sheet.
+
+        Returns:
+            dict: Values of each column of each sheet, keyed by the sheet
+                name or number given, or by name for every sheet.
+
+        """
+        with pd.ExcelFile(file_path) as excel_file:
+            names: List[Union[int, str]]
+            if sheet_name is None:
+                names = excel_file.sheet_names
+            elif isinstance(sheet_name, (int, str)):
+                names = [sheet_name]
+            else:
+                names = sheet_name
+            sheets = {}
+            for name in names:
+                df = excel_file.parse(name)
+                for column_name in column_names:
+                    self.check_column(df.columns, column_name)
+                sheets[name] = {c: df[c].tolist() for c in column_names}
+        return sheets
+
+    def get_sheet_terms(self) -> Dict[Union[int, str], List[str]]:
+        """Reads terms of each selected sheet, for per-sheet analysis.
+
+        Returns:
+            dict: Terms of each sheet from read_sheets. Inputs other than
+                Excel have one sheet, keyed 0.
+
+        """
+        if self.input_format != "excel":
+            return {0: self.get_terms()}
+        with self.metrics.stage("set_terms") as record:
+            sheets = {
+                name: columns[self.column_name]
+                for name, columns in self.read_sheets(
+                    self.file_path, self.sheet_name, [self.column_name]
+                ).items()
+            }
+            record["rows"] = sum(len(terms) for terms in sheets.values())
+        return sheets
 
     def get_terms(self) -> List[str]:
         """:obj:`list` of :obj:`str`: Getter method returns terms_list."""
+        if self.term_list is None and self.weight_column is not None:
+            self.term_list, self.weight_list = self.set_weighted_terms()
+        elif self.term_list is None:
+            self.term_list = self.set_terms(
+                self.file_path, self.sheet_name, self.column_name
+            )
         return self.term_list
 
+    def get_weights(self) -> Optional[List[float]]:
+        """:obj:`list` of :obj:`float`: Weight of each term, or None."""
+        if self.weight_column is not None:
+            self.get_terms()
+        return self.weight_list
+
+    def column_chunks(
+        self, file_path: str, column_names: Sequence[str]
+    ) -> Iterator[Dict[str, List[Any]]]:
+        """Reads columns of a csv, tsv, parquet or txt file in chunks.
+
+        Only the target columns are parsed, CHUNK_ROWS rows at a time, so
+        memory use doesn't grow with the width or length of the file.
+        csv and tsv values are read as text. check_column raises
+        ClickException if a column isn't in the header, as does
+        require_pyarrow if parquet input lacks pyarrow.
+
+        Args:
+            file_path(str): The path of the file to read.
+            column_names(Sequence of :obj:`str`): Column headers to read.
+                For txt input, where each line is a term, the one name is
+                only used as the key of the lines.
+
+        Yields:
+            dict: Values of each column for the next rows, with None or NaN
+                for empty ones.
+
+        Raises:
+            ClickException: More than one column was asked of txt input.
+
+        """
+        if self.input_format == "txt":
+            if len(column_names) > 1:
+                raise click.ClickException("txt input has only a column of terms")
+            with open(file_path, encoding="utf-8") as f:
+                lines = (line.rstrip("\r\n") for line in f)
+                chunk = list(itertools.islice(lines, CHUNK_ROWS))
+                while chunk:
+                    yield {column_names[0]: chunk}
+                    chunk = list(itertools.islice(lines, CHUNK_ROWS))
+        elif self.input_format == "parquet":
+            require_pyarrow("parquet input")
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(file_path)
+            for column_name in column_names:
+                self.check_column(parquet_file.schema_arrow.names, column_name)
+            for batch in parquet_file.iter_batches(
+                batch_size=CHUNK_ROWS, columns=list(column_names)
+            ):
+                yield {
+                    name: batch.column(i).to_pylist()
+                    for i, name in enumerate(column_names)
+                }
+        else:
+            sep = "\t" if self.input_format == "tsv" else ","
+            header = pd.read_csv(file_path, sep=sep, nrows=0).columns
+            for column_name in column_names:
+                self.check_column(header, column_name)
+            for chunk in pd.read_csv(
+                file_path,
+                sep=sep,
+                usecols=list(column_names),
+                dtype=str,
+                chunksize=CHUNK_ROWS,
+            ):
+                yield {name: chunk[name].tolist() for name in column_names}
+
+    def check_column(
+        self, columns: Iterable[str], column_name: Optional[str] = None
+    ) -> None:
+        """Raises ClickException if a column isn't one of columns.
+
+        Args:
+            columns(Iterable of :obj:`str`): Header of the input.
+            column_name(str, optional): The column to look for. Default is
+                column_name.
+
+        Raises:
+            ClickException: Column not found in header.
+
+        """
+        column_name = column_name or self.column_name
+        if column_name not in columns:
+            raise click.ClickException(
+                f"Column {column_name!r} not found in {self.file_path}"
+            )
+
+    def iter_terms(self) -> Iterator[str]:
+        """Yields terms from the Excel column one row at a time.
+
+        Opens the workbook with openpyxl in read-only mode, which streams
+        rows from the sheet XML instead of loading it, and reads only the
+        cells of the target column, one selected sheet after another.
+        Other input formats are read by column_chunks. Empty cells are
+        skipped and other non-text values are converted to strings.
+        check_column raises ClickException if the column isn't in the
+        header.
+
+        Yields:
+            str: Each term in the column, in sheet order.
+
+        """
+        if self.input_format != "excel":
+            for chunk in self.column_chunks(self.file_path, [self.column_name]):
+                for value in chunk[self.column_name]:
+                    if value is not None and value == value and value != "":
+                        yield value if isinstance(value, str) else str(value)
+            return
+        workbook = openpyxl.load_workbook(
+            self.file_path, read_only=True, data_only=True
+        )
+        try:
+            for worksheet in self.select_worksheets(workbook):
+                header = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+                self.check_column(header)
+                column = header.index(self.column_name) + 1
+                for (value,) in worksheet.iter_rows(
+                    min_row=2, min_col=column, max_col=column, values_only=True
+                ):
+                    if value is not None:
+                        yield value if isinstance(value, str) else str(value)
+        finally:
+            workbook.close()
+
+    def select_worksheets(self, workbook: openpyxl.Workbook) -> List[Any]:
+        """Picks the worksheets named by sheet_name from workbook.
+
+        Args:
+            workbook(openpyxl.Workbook): The opened input workbook.
+
+        Returns:
+            list: Worksheets in the order of sheet_name, or every worksheet
+                in workbook order if sheet_name is None.
+
+        """
+        if self.sheet_name is None:
+            return list(workbook.worksheets)
+        sheet_names = (
+            self.sheet_name if isinstance(self.sheet_name, list) else [self.sheet_name]
+        )
+        return [
+            workbook.worksheets[name] if isinstance(name, int) else workbook[name]
+            for name in sheet_names
+        ]
+
     def get_file_path(self) -> str:
         """str: Getter method returns Excel doc file path."""
         return self.file_path
 
-    def get_destination_path(self) -> str:
+    def get_destination_path(self, label: str = "") -> str:
         """Creates path to write output csv file to.
 
         Uses the path of the input Excel file to create an
         output path that mimics the input file name but is
         appended with the datetime and `n-grams`.
 
+        Args:
+            label(str): Added after the file name when set, so outputs for
+                several sheets or columns of one file don't collide.
+                Default is no label.
+
         Returns:
             str: Path to write output file to.
 
         """
         file_path = self.get_file_path()
         file_name = os.path.splitext(file_path)[0]
+        if label:
+            file_name = f"{file_name}_{label}"
         now = datetime.datetime.now()
         date_time = now.strftime("%Y%m%d%H%M%S")
         return f"{file_name}_{date_time}_n-grams"
 
-    def write(self, df: pd.DataFrame) -> str:
+    def write(
+        self,
+        df: pd.DataFrame,
+        label: str = "",
+        output_format: str = "csv",
+        xlsx_layout: str = "per-n",
+    ) -> str:
         """Writes DataFrame to csv file.
 
         Gets path from get_destination_path method and use
         Pandas to_csv function to write DataFrame to csv file.
+        csv.gz keeps the same layout, gzip compressed. parquet and feather
+        are written in the long layout of to_long_format and need pyarrow.
+        xlsx is written by write_xlsx.
 
         Args:
             df(pd.DataFrame): Dataframe of terms and values columns
                 for ngrams.
+            label(str): Passed to get_destination_path. Default is no label.
+            output_format(str): One of OUTPUT_FORMATS, also used as the file
+                extension. Default is csv.
+            xlsx_layout(str): Passed to write_xlsx. Default is per-n.
 
         Returns:
-            str: Path to which csv file was written.
+            str: Path to which csv file was written, without extension.
 
         Raises:
             ClickException: Writing to csv file failed.
         """
+        if output_format not in OUTPUT_FORMATS:
+            raise click.ClickException(
+                f"Unknown output format {output_format!r}, expected one of"
+                f" {OUTPUT_FORMATS}"
+            )
+        if output_format in ("parquet", "feather"):
+            require_pyarrow(f"{output_format} output")
         try:
-            path = self.get_destination_path()
-            df.to_csv(f"{path}.csv")
+            with self.metrics.stage("write") as record:
+                path = self.get_destination_path(label)
+                file_path = f"{path}.{output_format}"
+                if output_format == "parquet":
+                    to_long_format(df).to_parquet(file_path, index=False)
+                elif output_format == "feather":
+                    to_long_format(df).to_feather(file_path)
+                elif output_format == "xlsx":
+                    write_xlsx(df, file_path, xlsx_layout)
+                else:
+                    df.to_csv(file_path)
+                record["rows"] = len(df)
             return path
         except Exception as error:
             err_message = str(error)
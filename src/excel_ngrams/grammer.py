@@ -1,11 +1,182 @@
 """Return dataframe of ngrams from list of words."""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import inspect
+import itertools
+import math
 import re
-from typing import Any, List, Sequence, Tuple
+import time
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional
+from typing import Counter as CounterType
+from typing import Sequence, Tuple
+import unicodedata
 
 import nltk
-from nltk.corpus import stopwords
+import numpy as np
 import pandas as pd
 import spacy
+from spacy.language import Language
+
+from .cache import TokenMemo
+from .constants import BOUNDARIES, COUNTERS, RANK_METRICS, SPACY_BATCH_SIZE
+from .constants import TOKEN_MEMO_SIZE, TOKENIZERS
+from .counting import encode_words, SpaceSaving, top_ngrams, top_weighted_ngrams
+from .metrics import Metrics
+from .stopwords import load_stopwords
+
+# Deletes newlines and tabs and straightens curly apostrophes in one pass.
+CLEAN_TABLE = str.maketrans({"\n": None, "\t": None, "’": "'"})
+
+# Pipeline components skipped by the spacy-tokenizer engine.
+SPACY_PIPES = ["tagger", "parser", "ner"]
+
+# Whether Language.pipe can run the pipeline in forked processes.
+PIPE_N_PROCESS = "n_process" in inspect.signature(Language.pipe).parameters
+
+# Batch sizes tried by tune_batch_size, each on the next TUNE_SAMPLE texts.
+BATCH_SIZES = (64, 256, 1000)
+TUNE_SAMPLE = 1000
+
+# Approximates spaCy's English tokenizer for keyword data: contractions are
+# split the same way ("it's" -> "it", "'s"), decimals and abbreviations are
+# kept whole ("3.5", "1,000", "u.s") and other symbols stand alone.
+TOKEN_PATTERN = re.compile(
+    r"[^\W_]+(?=n't\b)|n't\b|'(?:s|m|d|ll|re|ve)\b"
+    r"|\d+(?:[.,]\d+)+|[^\W\d_]+(?:\.[^\W\d_]+)+|\w+|[^\w\s]",
+    re.IGNORECASE,
+)
+
+# Splits a term into sentences after sentence-ending punctuation.
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def is_punct(text: str) -> bool:
+    """Check if every char in text is punctuation, as spaCy's is_punct does.
+
+    Args:
+        text(str): Token text to check.
+
+    Returns:
+        bool: Whether text is made up only of punctuation.
+
+    """
+    return all(unicodedata.category(char).startswith("P") for char in text)
+
+
+def shard(items: Sequence[Any], parts: int) -> List[Sequence[Any]]:
+    """Split a sequence into contiguous shards, in order.
+
+    Args:
+        items(Sequence): The sequence to split.
+        parts(int): The maximum number of shards.
+
+    Returns:
+        :obj:`list` of Sequence: Shards covering items in order.
+
+    """
+    size = max(1, math.ceil(len(items) / parts))
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _tokenize_shard(
+    texts: List[str], tokenizer: str, batch_size: Optional[int] = None
+) -> List[List[str]]:
+    """Tokenise a shard of cleaned terms in a worker process."""
+    grammer = Grammer([], tokenizer=tokenizer, batch_size=batch_size)
+    return list(grammer.tokenize_texts(texts))
+
+
+def row_ngrams(rows: Iterable[Sequence[str]], n: int) -> Iterator[Tuple[str, ...]]:
+    """Yield the ngrams of each row, none spanning two rows.
+
+    Args:
+        rows(Iterable of Sequence): Words of each row, in order.
+        n(int): The length of phrases.
+
+    Yields:
+        :obj:`tuple` of :obj:`str`: Each ngram, in corpus order.
+
+    """
+    for row in rows:
+        yield from zip(*(row[i:] for i in range(n)))
+
+
+def dedupe(items: Iterable[Hashable]) -> Tuple[List[Any], List[int]]:
+    """Collapse equal items into one, in order of first appearance.
+
+    Args:
+        items(Iterable): Hashable items, e.g. cleaned terms.
+
+    Returns:
+        unique(list): Each distinct item once.
+        index(:obj:`list` of int): Position in unique of each item.
+
+    """
+    positions: Dict[Hashable, int] = {}
+    index = [positions.setdefault(item, len(positions)) for item in items]
+    return list(positions), index
+
+
+def count_rows(
+    rows: Sequence[Sequence[str]], n: int, counts: Optional[Sequence[int]] = None
+) -> CounterType[Tuple[str, ...]]:
+    """Count the ngrams within each row.
+
+    Rows are counted once in order first, so keys keep the order of their
+    first occurrence, then repeated rows add their other occurrences.
+
+    Args:
+        rows(Sequence of Sequence): Words of each row, in order.
+        n(int): The length of phrases.
+        counts(Sequence of int, optional): Times each row occurs. Default is
+            once each.
+
+    Returns:
+        Counter: Frequency of each ngram tuple.
+
+    """
+    ngram_counts = Counter(row_ngrams(rows, n))
+    for row, count in zip(rows, counts or ()):
+        if count > 1:
+            for ngram in row_ngrams([row], n):
+                ngram_counts[ngram] += count - 1
+    return ngram_counts
+
+
+def check_weights(
+    weights: Optional[Iterable[float]],
+    rank_by: str,
+    memory_budget: Optional[int],
+    tokens: Optional[List[List[str]]],
+    boundary: str,
+) -> None:
+    """Check Grammer's weights can be used with its other arguments.
+
+    Args:
+        weights(Iterable of float, optional): Weight of each term.
+        rank_by(str): The metric to rank results by.
+        memory_budget(int, optional): Approximate counting budget.
+        tokens(list, optional): Tokens from an earlier tokenize call, which
+            can't be matched to the weights of their terms.
+        boundary(str): Where ngrams stop. Ngrams spanning rows have no
+            single row weight.
+
+    Raises:
+        ValueError: rank_by is weight without weights, or weights are given
+            with memory_budget, tokens or the `none` boundary.
+
+    """
+    if weights is None:
+        if rank_by == "weight":
+            raise ValueError("rank_by weight needs weights")
+        return
+    for name, conflict in (
+        ("memory_budget", memory_budget is not None),
+        ("tokens", tokens is not None),
+        ("boundary none", boundary == "none"),
+    ):
+        if conflict:
+            raise ValueError(f"weights can't be used with {name}")
 
 
 class Grammer:
@@ -18,38 +189,179 @@ class Grammer:
 
     Attributes:
         term_list: List of text as strings (one or more).
+        tokenizer: Tokenizer engine, one of TOKENIZERS. `spacy-full` runs
+            the whole Spacy pipeline, `spacy-tokenizer` only its tokenizer
+            and `regex` a compiled regex that needs no language model.
+        workers: Number of processes used to tokenise. With more than one,
+            distinct texts are split into contiguous shards tokenised in
+            worker processes, in order. The spacy-full engine instead runs
+            spaCy's own multiprocess pipe where it has one, forking the
+            loaded model. Ngrams are counted in this process, as sending
+            rows and counts between processes costs more than counting.
+        batch_size: Texts spaCy buffers per batch. None picks the fastest of
+            BATCH_SIZES with tune_batch_size when first tokenising.
+        counter: Counting engine, one of COUNTERS. `python` counts tuples of
+            strings with a Counter, `numpy` counts integer-encoded ngrams with
+            vectorised NumPy operations and decodes only the top results.
+            Both return the same frequencies in the same order.
+        boundary: Where ngrams stop, one of BOUNDARIES. `row` counts only
+            ngrams within a row, `sentence` only within a sentence of a row,
+            split after `.`, `!` or `?`, and `none` also counts ngrams
+            spanning the end of one row and the start of the next.
+        memory_budget: If set, ngrams are counted approximately with a
+            Space-Saving summary tracking at most this many ngrams per
+            length, instead of holding every distinct ngram. Counts may then
+            overestimate by up to the bound stored in error_bounds.
+        error_bounds: Maximum overestimate of each count returned by
+            get_ngrams in approximate mode, keyed by n.
+        weights: Weight of each term in term_list, e.g. its search volume.
+            When given, every ngram in a row adds the row's weight to its
+            total, and rows split into sentences share their term's weight.
+        rank_by: Metric results are ranked by, one of RANK_METRICS.
+            `weight` ranks by weight total and needs weights.
+        weight_totals: Weight total of each result returned by get_ngrams
+            when weights are given, keyed by n.
+        tokens: Words for each row (or sentence, with the sentence
+            boundary) from an earlier tokenize call. When given, term_list
+            is ignored and no Spacy model is loaded.
+        stopword_set: Stopwords removed when stopwords=True. The bundled
+            English set unless stopwords_file lists others, one per line.
+        metrics: Time, rows, tokens and peak memory of the tokenize stage
+            and of get_ngrams for each n. The tokenize stage also records
+            token memo hits and misses.
 
     _nlp and _stopwords are shared across all instances, but is loaded by the
-    constructor to avoid loading is in cases where it isn't needed.
+    constructor to avoid loading is in cases where it isn't needed. So is
+    the TokenMemo from token_memo, which holds the words of texts tokenised
+    by any instance.
+
+    The tokenised corpus is computed once per instance and reused by every
+    n-gram length, so it is reset whenever term_list is reassigned.
+    Identical rows are tokenised once, and unless boundary is `none`
+    counted once with the number of times they occur.
 
     """
 
     _nlp = None
+    _tokenizer_nlp = None
     _stopwords = None
+    _token_memo: Optional[TokenMemo] = None
 
-    def __init__(self, terms_list: List[str]) -> None:
+    def __init__(
+        self,
+        terms_list: Iterable[str],
+        tokenizer: str = "spacy-full",
+        workers: int = 1,
+        counter: str = "python",
+        memory_budget: Optional[int] = None,
+        tokens: Optional[List[List[str]]] = None,
+        stopwords_file: Optional[str] = None,
+        boundary: str = "row",
+        weights: Optional[Iterable[float]] = None,
+        rank_by: str = "frequency",
+        batch_size: Optional[int] = SPACY_BATCH_SIZE,
+    ) -> None:
         """Constructs attributes for Grammer object from FileHandler object."""
+        for name, value, choices in (
+            ("tokenizer", tokenizer, TOKENIZERS),
+            ("counter", counter, COUNTERS),
+            ("boundary", boundary, BOUNDARIES),
+            ("rank_by", rank_by, RANK_METRICS),
+        ):
+            if value not in choices:
+                raise ValueError(f"Unknown {name} {value!r}, expected one of {choices}")
+        check_weights(weights, rank_by, memory_budget, tokens, boundary)
+        for name, number in (
+            ("workers", workers),
+            ("memory_budget", memory_budget),
+            ("batch_size", batch_size),
+        ):
+            if number is not None and number < 1:
+                raise ValueError(f"{name} must be at least 1")
         self.term_list = terms_list
+        self.tokenizer = tokenizer
+        self.workers = workers
+        self.batch_size = batch_size
+        self.counter = counter
+        self.boundary = boundary
+        self.memory_budget = memory_budget
+        self.error_bounds: Dict[int, List[int]] = {}
+        self.weights = None if weights is None else list(weights)
+        self.rank_by = rank_by
+        self.weight_totals: Dict[int, List[float]] = {}
+        self.metrics = Metrics()
 
-        if Grammer._nlp is None:
-            try:
-                Grammer._nlp = spacy.load("en")
-            except OSError:
-                from spacy.cli import download
-
-                print(
-                    "Downloading language model for the spaCy\n"
-                    "(don't worry, this will only happen once)"
-                )
-                download("en")
-                Grammer._nlp = spacy.load("en")
+        if tokens is not None:
+            # Already tokenised, e.g. loaded from CorpusCache: skip Spacy.
+            self._tokenized_rows: Optional[List[List[str]]] = tokens
+        elif tokenizer == "spacy-full" and Grammer._nlp is None:
+            Grammer._nlp = self.load_model()
+        elif (
+            tokenizer == "spacy-tokenizer"
+            and Grammer._nlp is None
+            and Grammer._tokenizer_nlp is None
+        ):
+            Grammer._tokenizer_nlp = self.load_model(disable=SPACY_PIPES)
 
         if Grammer._stopwords is None:
-            try:
-                nltk.download("stopwords")
-                Grammer._stopwords = set(stopwords.words("english"))
-            except Exception as e:
-                print(f"Error: {e}")
+            Grammer._stopwords = load_stopwords()
+        if stopwords_file is None:
+            self.stopword_set = Grammer._stopwords
+        else:
+            self.stopword_set = load_stopwords(stopwords_file)
+
+    @staticmethod
+    def load_model(disable: Optional[List[str]] = None) -> Language:
+        """Load Spacy's English model, downloading it if it isn't installed.
+
+        Args:
+            disable(:obj:`list` of :obj:`str`, optional): Pipeline components
+                not to load. Default is None (full pipeline).
+
+        Returns:
+            Language: The loaded Spacy pipeline.
+
+        """
+        kwargs = {"disable": disable} if disable else {}
+        try:
+            return spacy.load("en", **kwargs)
+        except OSError:
+            from spacy.cli import download
+
+            print(
+                "Downloading language model for the spaCy\n"
+                "(don't worry, this will only happen once)"
+            )
+            download("en")
+            return spacy.load("en", **kwargs)
+
+    @staticmethod
+    def token_memo() -> TokenMemo:
+        """TokenMemo: Memo shared by every instance, made on first use."""
+        if Grammer._token_memo is None:
+            Grammer._token_memo = TokenMemo(TOKEN_MEMO_SIZE)
+        return Grammer._token_memo
+
+    @property
+    def term_list(self) -> Iterable[str]:
+        """Iterable of :obj:`str`: Terms to analyse, resets cached tokens."""
+        return self._term_list
+
+    @term_list.setter
+    def term_list(self, terms_list: Iterable[str]) -> None:
+        self._term_list = terms_list
+        self._tokenized_rows = None
+        self._unique_rows: Optional[List[List[str]]] = None
+        self._row_index: Optional[List[int]] = None
+        self._row_counts: Optional[np.ndarray] = None
+        self._unique_row_lists: Dict[bool, List[List[str]]] = {}
+        self._unique_word_ids: Dict[bool, Tuple[np.ndarray, List[str], np.ndarray]] = {}
+        self._row_lists: Dict[bool, List[List[str]]] = {}
+        self._word_lists: Dict[bool, List[str]] = {}
+        self._word_ids: Dict[bool, Tuple[np.ndarray, List[str]]] = {}
+        self._row_ids: Dict[bool, np.ndarray] = {}
+        self._row_weights: Optional[np.ndarray] = None
+        self._word_weights: Dict[bool, np.ndarray] = {}
 
     def in_stop_words(self, spacy_token_text: str) -> bool:
         """Check if word appears in stopword set.
@@ -62,9 +374,32 @@ class Grammer:
             bool: Whether text is present in stopwords.
 
         """
-        return spacy_token_text.lower() in Grammer._stopwords
+        return spacy_token_text.lower() in self.stopword_set
+
+    def clean_terms(self, text: Iterable[str]) -> Iterator[str]:
+        """Lazily remove newline and tab chars from terms.
 
-    def remove_escaped_chars(self, text: List[str]) -> List[str]:
+        Blank cells (None or NaN) are skipped and other non-string values
+        are converted with str, matching FileHandler.iter_terms.
+
+        Args:
+            text(Iterable of :obj:`str`): Terms to be cleaned of specific
+                chars, consumed one at a time.
+
+        Yields:
+            str: Each term without specific chars, skipping empty terms.
+
+        """
+        for item in text:
+            if not isinstance(item, str):
+                if item is None or item != item:
+                    continue
+                item = str(item)
+            item = item.strip().translate(CLEAN_TABLE)
+            if item:
+                yield item
+
+    def remove_escaped_chars(self, text: Iterable[str]) -> List[str]:
         """Remove newline and tab chars from string list.
 
         Args:
@@ -76,21 +411,510 @@ class Grammer:
                 specific chars.
 
         """
-        without_newlines = []
-        for item in text:
-            item = re.sub(r"(\n*\t*)", "", item.strip())
-            item = re.sub(r"’", "'", item)
-            if item != "":
-                without_newlines.append(item)
-        return without_newlines
+        return list(self.clean_terms(text))
+
+    def split_sentences(self, texts: Iterable[str]) -> Iterator[str]:
+        """Split each cleaned term into sentences with the sentence boundary.
+
+        Args:
+            texts(Iterable of :obj:`str`): Cleaned terms.
+
+        Yields:
+            str: Each sentence of each term, or each term unchanged unless
+                boundary is `sentence`.
+
+        """
+        if self.boundary != "sentence":
+            yield from texts
+            return
+        for text in texts:
+            yield from SENTENCE_PATTERN.split(text)
+
+    def weigh_terms(self) -> List[str]:
+        """Clean and split term list as tokenize does, keeping weights.
+
+        The weight of each term is kept for each text it gives, skipping
+        empty or blank terms together with their weight, and cached for
+        get_row_weights.
+
+        Returns:
+            :obj:`list` of :obj:`str`: Texts to tokenise, one per row.
+
+        Raises:
+            ValueError: There isn't one weight per term.
+
+        """
+        terms = list(self.term_list)
+        if len(terms) != len(self.weights):
+            raise ValueError(
+                f"Got {len(self.weights)} weights for {len(terms)} terms"
+            )
+        pairs = [
+            (text, weight)
+            for term, weight in zip(terms, self.weights)
+            for text in self.split_sentences(self.clean_terms([term]))
+        ]
+        self._row_weights = np.array([weight for _, weight in pairs], dtype=float)
+        return [text for text, _ in pairs]
+
+    def tokenize_texts(
+        self,
+        texts: Iterable[str],
+        batch_size: Optional[int] = None,
+        processes: int = 1,
+    ) -> Iterator[List[str]]:
+        """Split each text into lowercase words with the chosen tokenizer.
+
+        spaCy's pipe is consumed as a stream, so only the Docs of the
+        current batch are held at once.
+
+        Args:
+            texts(Iterable of :obj:`str`): Cleaned terms to tokenise.
+            batch_size(int, optional): Texts spaCy buffers per batch.
+                Default is batch_size, or SPACY_BATCH_SIZE until tuned.
+            processes(int): Processes for the spacy-full pipe, used when
+                PIPE_N_PROCESS. Default is 1.
+
+        Yields:
+            :obj:`list` of :obj:`str`: Words of each text, without
+                punctuation.
+
+        """
+        if self.tokenizer == "regex":
+            for text in texts:
+                yield [
+                    word.lower()
+                    for word in TOKEN_PATTERN.findall(text)
+                    if not is_punct(word)
+                ]
+            return
+
+        batch_size = batch_size or self.batch_size or SPACY_BATCH_SIZE
+        if self.tokenizer == "spacy-full":
+            kwargs = {"n_process": processes} if processes > 1 else {}
+            docs = Grammer._nlp.pipe(texts, batch_size=batch_size, **kwargs)
+        else:
+            nlp = Grammer._nlp or Grammer._tokenizer_nlp
+            docs = nlp.tokenizer.pipe(texts, batch_size=batch_size)
+        for doc in docs:
+            yield [token.text.lower().strip() for token in doc if not token.is_punct]
+
+    def tokenize(self) -> List[List[str]]:
+        """Tokenise term list once and cache the result on the instance.
+
+        Terms are cleaned with clean_terms and split by split_sentences, one
+        at a time, so term_list may be a lazy iterator such as
+        FileHandler.iter_terms, unless weights are given, when weigh_terms
+        reads it all. Identical texts are collapsed by dedupe and each
+        distinct text is tokenised once by tokenize_distinct. Punctuation is
+        dropped and words are lowercased, but stopwords are kept so the
+        same tokens serve either setting.
+
+        Returns:
+            :obj:`list` of :obj:`list` of :obj:`str`: Words for each row, or
+                each sentence with the sentence boundary.
+
+        """
+        if self._tokenized_rows is None:
+            with self.metrics.stage("tokenize") as record:
+                terms = self.split_sentences(self.clean_terms(self.term_list))
+                if self.weights is not None:
+                    terms = iter(self.weigh_terms())
+                texts, index = dedupe(terms)
+                memo = Grammer.token_memo()
+                hits, misses = memo.hits, memo.misses
+                unique = self.tokenize_distinct(texts)
+                rows = [unique[i] for i in index]
+                record["rows"] = len(rows)
+                record["unique_rows"] = len(unique)
+                record["memo_hits"] = memo.hits - hits
+                record["memo_misses"] = memo.misses - misses
+                record["batch_size"] = self.batch_size
+                record["tokens"] = sum(len(row) for row in rows)
+            self._tokenized_rows = rows
+            self._unique_rows, self._row_index = unique, index
+        return self._tokenized_rows
+
+    def tokenize_distinct(self, texts: Sequence[str]) -> List[List[str]]:
+        """Tokenise distinct texts, reusing words held by the token memo.
+
+        Texts the memo doesn't hold are passed through tokenize_texts and
+        added to the memo. With more than one worker they are sharded
+        across processes, or for spacy-full run through spaCy's
+        multiprocess pipe where it has one. If batch_size is None the
+        first of them are tokenised by tune_batch_size.
+
+        Args:
+            texts(Sequence of :obj:`str`): Distinct cleaned texts.
+
+        Returns:
+            :obj:`list` of :obj:`list` of :obj:`str`: Words of each text.
+
+        """
+        memo = Grammer.token_memo()
+        found = [memo.get(self.tokenizer, text) for text in texts]
+        missing = [text for text, words in zip(texts, found) if words is None]
+        tokenized: List[List[str]] = []
+        if self.batch_size is None and self.tokenizer != "regex":
+            self.batch_size, tokenized = self.tune_batch_size(missing)
+        rest = missing[len(tokenized) :]
+        spacy_processes = self.tokenizer == "spacy-full" and PIPE_N_PROCESS
+        if self.workers > 1 and rest and not spacy_processes:
+            shards = shard(rest, self.workers)
+            with ProcessPoolExecutor(self.workers) as executor:
+                results = executor.map(
+                    _tokenize_shard,
+                    shards,
+                    [self.tokenizer] * len(shards),
+                    [self.batch_size] * len(shards),
+                )
+                tokenized += [row for shard_rows in results for row in shard_rows]
+        else:
+            tokenized += self.tokenize_texts(rest, processes=self.workers)
+        for text, row in zip(missing, tokenized):
+            memo.put(self.tokenizer, text, row)
+        new_rows = iter(tokenized)
+        return [
+            next(new_rows) if words is None else list(words) for words in found
+        ]
+
+    def tune_batch_size(self, texts: Sequence[str]) -> Tuple[int, List[List[str]]]:
+        """Pick the spaCy batch size that tokenises the first texts fastest.
+
+        The first TUNE_SAMPLE texts warm spaCy's caches at SPACY_BATCH_SIZE,
+        then each of BATCH_SIZES tokenises the next TUNE_SAMPLE texts and is
+        timed per text. Their words are kept, so tuning tokenises nothing
+        twice.
+
+        Args:
+            texts(Sequence of :obj:`str`): Cleaned texts to tokenise.
+
+        Returns:
+            batch_size(int): The fastest size, or SPACY_BATCH_SIZE if there
+                were too few texts to time.
+            rows(:obj:`list` of :obj:`list` of :obj:`str`): Words of the
+                first texts, those tokenised while tuning.
+
+        """
+        rows = list(self.tokenize_texts(texts[:TUNE_SAMPLE], SPACY_BATCH_SIZE))
+        seconds_per_text: Dict[int, float] = {}
+        for size in BATCH_SIZES:
+            sample = texts[len(rows) : len(rows) + TUNE_SAMPLE]
+            if not sample:
+                break
+            start = time.perf_counter()
+            rows.extend(self.tokenize_texts(sample, size))
+            seconds_per_text[size] = (time.perf_counter() - start) / len(sample)
+        if not seconds_per_text:
+            return SPACY_BATCH_SIZE, rows
+        return min(seconds_per_text, key=seconds_per_text.get), rows
+
+    def dedupe_rows(self) -> Tuple[List[List[str]], List[int]]:
+        """Distinct tokenised rows and where each row is among them.
+
+        Set by tokenize, or found from given tokens on first use.
+
+        Returns:
+            unique(:obj:`list` of :obj:`list` of :obj:`str`): Words of each
+                distinct row, in order of first appearance.
+            index(:obj:`list` of int): Position in unique of each row.
+
+        """
+        if self._row_index is None:
+            unique, self._row_index = dedupe(tuple(row) for row in self.tokenize())
+            self._unique_rows = [list(row) for row in unique]
+        return self._unique_rows, self._row_index
+
+    def get_unique_rows(self, stopwords: bool = True) -> List[List[str]]:
+        """Distinct tokenised rows, without stopwords if asked, cached per flag.
+
+        Args:
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            :obj:`list` of :obj:`list` of :obj:`str`: Words of each distinct
+                row, in order of first appearance.
+
+        """
+        if stopwords not in self._unique_row_lists:
+            rows, _ = self.dedupe_rows()
+            if stopwords:
+                # Words are already lowercase, so skip in_stop_words.
+                stopword_set = self.stopword_set
+                rows = [
+                    [word for word in row if word not in stopword_set]
+                    for row in rows
+                ]
+            self._unique_row_lists[stopwords] = rows
+        return self._unique_row_lists[stopwords]
+
+    def get_row_counts(self) -> np.ndarray:
+        """np.ndarray: Times each row of dedupe_rows occurs, cached."""
+        if self._row_counts is None:
+            unique, index = self.dedupe_rows()
+            self._row_counts = np.bincount(index, minlength=len(unique))
+        return self._row_counts
+
+    def get_rows(self, stopwords: bool = True) -> List[List[str]]:
+        """Tokenised rows, without stopwords if asked, cached per flag.
+
+        Args:
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            :obj:`list` of :obj:`list` of :obj:`str`: Words of each row.
+
+        """
+        if stopwords not in self._row_lists:
+            unique = self.get_unique_rows(stopwords)
+            _, index = self.dedupe_rows()
+            self._row_lists[stopwords] = [unique[i] for i in index]
+        return self._row_lists[stopwords]
+
+    def get_words(self, stopwords: bool = True) -> List[str]:
+        """Flatten tokenised rows into a single word list.
+
+        Args:
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            :obj:`list` of :obj:`str`: Words from every row, in order.
+
+        """
+        if stopwords not in self._word_lists:
+            self._word_lists[stopwords] = list(
+                itertools.chain.from_iterable(self.get_rows(stopwords))
+            )
+        return self._word_lists[stopwords]
+
+    def get_row_ids(self, stopwords: bool = True) -> np.ndarray:
+        """np.ndarray: Row of each word in get_words, cached per flag."""
+        if stopwords not in self._row_ids:
+            rows = self.get_rows(stopwords)
+            lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+            self._row_ids[stopwords] = np.repeat(np.arange(len(rows)), lengths)
+        return self._row_ids[stopwords]
+
+    def get_row_weights(self) -> np.ndarray:
+        """np.ndarray: Weight of each row from tokenize, given weights."""
+        self.tokenize()
+        return self._row_weights
+
+    def get_word_weights(self, stopwords: bool = True) -> np.ndarray:
+        """np.ndarray: Row weight of each word in get_words, cached per flag."""
+        if stopwords not in self._word_weights:
+            rows = self.get_rows(stopwords)
+            lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+            self._word_weights[stopwords] = np.repeat(self.get_row_weights(), lengths)
+        return self._word_weights[stopwords]
+
+    def iter_ngrams(self, n: int, stopwords: bool = True) -> Iterator[Tuple[str, ...]]:
+        """Yield every ngram of length n allowed by boundary, in order.
+
+        Args:
+            n(int): The length of phrases.
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            Iterator of :obj:`tuple`: Each ngram in corpus order.
+
+        """
+        if self.boundary == "none":
+            return nltk.ngrams(self.get_words(stopwords), n)
+        return row_ngrams(self.get_rows(stopwords), n)
+
+    def get_unique_word_ids(
+        self, stopwords: bool = True
+    ) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """Encode the words of the distinct rows, cached per stopwords flag.
+
+        Args:
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            ids(np.ndarray): Id of each word of get_unique_rows, in order.
+            vocab(:obj:`list` of :obj:`str`): Word for each id.
+            row_ids(np.ndarray): Distinct row of each word.
+
+        """
+        if stopwords not in self._unique_word_ids:
+            rows = self.get_unique_rows(stopwords)
+            ids, vocab = encode_words(list(itertools.chain.from_iterable(rows)))
+            lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+            row_ids = np.repeat(np.arange(len(rows)), lengths)
+            self._unique_word_ids[stopwords] = (ids, vocab, row_ids)
+        return self._unique_word_ids[stopwords]
+
+    def get_word_ids(self, stopwords: bool = True) -> Tuple[np.ndarray, List[str]]:
+        """Encode the word list as integer ids, cached per stopwords flag.
+
+        Args:
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            ids(np.ndarray): Id of each word in the word list.
+            vocab(:obj:`list` of :obj:`str`): Word for each id.
+
+        """
+        if stopwords not in self._word_ids:
+            self._word_ids[stopwords] = encode_words(self.get_words(stopwords))
+        return self._word_ids[stopwords]
+
+    def count_ngrams(
+        self, n: int, stopwords: bool = True, prefix: Sequence[str] = ()
+    ) -> CounterType[Tuple[str, ...]]:
+        """Count every ngram of length n in the tokenised corpus.
+
+        Unless boundary is `none`, ngrams are counted within each row by
+        count_row_ngrams. Otherwise they are counted across the whole word
+        list, keys keeping the order of their first occurrence.
+
+        Args:
+            n(int): The length of phrases to count.
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+            prefix(Sequence of :obj:`str`): Words that came before the corpus,
+                e.g. the end of rows counted by an earlier run. Only ngrams
+                ending in the corpus are counted, and only if boundary is
+                `none`. Default is no words.
+
+        Returns:
+            Counter: Frequency of each ngram tuple.
+
+        """
+        if self.boundary != "none":
+            return self.count_row_ngrams(n, stopwords)
+        word_list = self.get_words(stopwords)
+        if n > 1 and prefix:
+            word_list = [*prefix[-(n - 1) :], *word_list]
+        return Counter(nltk.ngrams(word_list, n))
+
+    def count_row_ngrams(
+        self, n: int, stopwords: bool = True
+    ) -> CounterType[Tuple[str, ...]]:
+        """Count the ngrams within each row.
+
+        Each distinct row is counted once and its ngrams weighted by the
+        number of times it occurs, which gives the counts, in the same
+        order, of counting every row.
+
+        Args:
+            n(int): The length of phrases to count.
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            Counter: Frequency of each ngram tuple.
+
+        """
+        rows = self.get_unique_rows(stopwords)
+        return count_rows(rows, n, self.get_row_counts().tolist())
+
+    def weigh_ngrams(
+        self, n: int, stopwords: bool = True
+    ) -> Dict[Tuple[str, ...], float]:
+        """Sum the row weights of every ngram of length n within rows.
+
+        Args:
+            n(int): The length of phrases.
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            dict: Weight total of each ngram tuple.
+
+        """
+        totals: Dict[Tuple[str, ...], float] = {}
+        rows = self.get_rows(stopwords)
+        for row, weight in zip(rows, self.get_row_weights().tolist()):
+            for ngram in row_ngrams([row], n):
+                totals[ngram] = totals.get(ngram, 0.0) + weight
+        return totals
+
+    def get_weighted_ngrams(
+        self, n: int, top_n_results: int = 250, stopwords: bool = True
+    ) -> List[Tuple[Tuple[str, ...], int, float]]:
+        """Count ngrams and sum their weights, ranked by rank_by.
+
+        Ties keep the order in which the ngrams first appear, with either
+        counter.
+
+        Args:
+            n(int): The length of phrases to analyse.
+            top_n_results(int): The number of results to return.
+                Default is 250.
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            :obj:`list` of :obj:`tuple`[:obj:`tuple`[str, ...], int, float]:
+                Term(s), frequency and weight total of each result.
+
+        """
+        if self.counter == "numpy":
+            ids, vocab = self.get_word_ids(stopwords)
+            return top_weighted_ngrams(
+                ids,
+                vocab,
+                n,
+                top_n_results,
+                self.get_word_weights(stopwords),
+                self.get_row_ids(stopwords),
+                self.rank_by,
+            )
+        counts = self.count_ngrams(n, stopwords)
+        totals = self.weigh_ngrams(n, stopwords)
+        metric = totals if self.rank_by == "weight" else counts
+        ranked = sorted(counts, key=lambda ngram: -metric[ngram])
+        return [
+            (ngram, counts[ngram], totals[ngram])
+            for ngram in ranked[: max(top_n_results, 0)]
+        ]
+
+    def count_tokens(self, stopwords: bool = True) -> int:
+        """Count the words ngrams are counted from, for stage metrics.
+
+        The exact counts within rows only use the distinct rows, so the
+        words are counted from them and the times each row occurs rather
+        than from get_words, which is only built where it is counted from.
+
+        Args:
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        Returns:
+            int: Number of words in the corpus.
+
+        """
+        if (
+            self.boundary == "none"
+            or self.weights is not None
+            or self.memory_budget is not None
+        ):
+            return len(self.get_words(stopwords))
+        rows = self.get_unique_rows(stopwords)
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        return int(lengths @ self.get_row_counts())
 
     def get_ngrams(
         self, n: int, top_n_results: int = 250, stopwords: bool = True
     ) -> Sequence[Tuple[Tuple[Any, ...], int]]:
         """Create tuple with terms and frequency from list.
 
-        List of terms is tokenised using Spacy's NLP pipe, set to lowercase
-        and ngrams are calculated with NLTK's ngrams function.
+        Words come from the cached output of tokenize, so the corpus is only
+        tokenised once however many n-gram lengths are requested. Ngrams are
+        counted by count_ngrams, or by the NumPy engine, and ranked by
+        frequency, ties keeping the order in which the ngrams first appear.
+        With a memory_budget the counts are approximate and their error
+        bounds are stored in error_bounds[n]. With weights, results come
+        from get_weighted_ngrams and their totals are stored in
+        weight_totals[n].
 
         Args:
             n(int): The length of phrases to analyse.
@@ -104,18 +928,29 @@ class Grammer:
                 List of tuples containing term(s) and values.
 
         """
-        word_list = []
-        term_list = self.remove_escaped_chars(self.term_list)
-        for doc in list(Grammer._nlp.pipe(term_list)):
-            for token in doc:
-                word = token.text.lower().strip()
-                if not token.is_punct:
-                    if not stopwords or (stopwords and not self.in_stop_words(word)):
-                        word_list.append(word)
-        n_grams_series = pd.Series(nltk.ngrams(word_list, n)).value_counts()
-        if top_n_results <= len(n_grams_series):
-            n_grams_series = n_grams_series[:top_n_results]
-        return list(zip(n_grams_series.index, n_grams_series))
+        tokens = self.count_tokens(stopwords)
+        with self.metrics.stage(f"count_{n}") as record:
+            record["tokens"] = tokens
+            if self.weights is not None:
+                weighted = self.get_weighted_ngrams(n, top_n_results, stopwords)
+                self.weight_totals[n] = [total for _, _, total in weighted]
+                return [(ngram, count) for ngram, count, _ in weighted]
+            if self.memory_budget is not None:
+                summary: SpaceSaving[Tuple[str, ...]] = SpaceSaving(
+                    self.memory_budget
+                )
+                summary.update(self.iter_ngrams(n, stopwords))
+                results = summary.most_common(top_n_results)
+                self.error_bounds[n] = [error for _, _, error in results]
+                return [(ngram, count) for ngram, count, _ in results]
+            if self.counter == "numpy" and self.boundary != "none":
+                ids, vocab, row_ids = self.get_unique_word_ids(stopwords)
+                row_counts = self.get_row_counts()
+                return top_ngrams(ids, vocab, n, top_n_results, row_ids, row_counts)
+            if self.counter == "numpy":
+                ids, vocab = self.get_word_ids(stopwords)
+                return top_ngrams(ids, vocab, n, top_n_results)
+            return self.count_ngrams(n, stopwords).most_common(top_n_results)
 
     def terms_to_columns(
         self, ngram_tuples: Sequence[Tuple[Tuple[Any, ...], int]]
@@ -135,13 +970,15 @@ class Grammer:
         """
         term_col: Tuple[str, ...]
         value_col: Tuple[Any, ...]
-        term_col, value_col = zip(*ngram_tuples)
+        term_col, value_col = zip(*ngram_tuples) if ngram_tuples else ((), ())
         term_col_list: List[str] = [" ".join(term) for term in term_col]
         value_col_list: List[int] = list(value_col)
         return term_col_list, value_col_list
 
     def df_from_terms(
-        self, ngram_tuples: Sequence[Tuple[Tuple[Any, ...], int]]
+        self,
+        ngram_tuples: Sequence[Tuple[Tuple[Any, ...], int]],
+        n: Optional[int] = None,
     ) -> pd.DataFrame:
         """Creates DataFrame from lists of terms and values as tuple.
 
@@ -150,6 +987,9 @@ class Grammer:
         Args:
             ngram_tuples(list): :obj:`list` of :obj:`tuple`[:obj:`tuple`
                 [str], int]. Results from get_ngrams.
+            n(int, optional): The phrase length, for headers when there are
+                no results, e.g. no row is n words long. Default is the
+                length of the first term.
 
         Returns:
             df(pd.DataFrame): Pandas DataFrame comprising a column of
@@ -157,7 +997,7 @@ class Grammer:
 
         """
         term_col, value_col = self.terms_to_columns(ngram_tuples)
-        ngram_val = len(term_col[0].split())
+        ngram_val = n if n is not None else len(term_col[0].split())
         terms_header = f"{ngram_val}-gram"
         freq_header = f"{ngram_val}-gram frequency"
         dict_ = {terms_header: term_col, freq_header: value_col}
@@ -184,13 +1024,47 @@ class Grammer:
         print(pd.concat(dfs, axis=1))
         return pd.concat(dfs, axis=1)
 
+    def ngram_range_from_counts(
+        self,
+        counts: Dict[int, CounterType[Tuple[str, ...]]],
+        top_n_results: int = 250,
+        error_bounds: Optional[Dict[int, List[int]]] = None,
+    ) -> pd.DataFrame:
+        """Creates the ngram_range output from full count tables.
+
+        Args:
+            counts(dict): Counter of ngram tuples for each phrase length,
+                e.g. from CountState.
+            top_n_results(int): The number of rows of results to return.
+                Default is 250.
+            error_bounds(dict, optional): Error bound of each result, in
+                most_common order, for each phrase length. When given, each
+                length gets an error bound column.
+
+        Returns:
+            pd.DataFrame: Combined dataframe of the most frequent ngrams of
+                each length, ties in order of first occurrence.
+
+        """
+        df_list = []
+        for i in sorted(counts):
+            df = self.df_from_terms(counts[i].most_common(top_n_results), i)
+            if error_bounds is not None:
+                df[f"{i}-gram error bound"] = error_bounds[i]
+            df_list.append(df)
+        if len(df_list) > 1:
+            return self.combine_dataframes(df_list)
+        return df_list[0]
+
     def ngram_range(
         self, max_n: int, n: int = 1, top_n_results: int = 250, stopwords: bool = True
     ) -> pd.DataFrame:
         """Gets ngram terms and outputs for a range of phrase lengths.
 
         Gets ngrams from single terms as default up to desired maximum
-        phrase length and creates Pandas DataFrame from results.
+        phrase length and creates Pandas DataFrame from results. In
+        approximate mode each length also gets an error bound column, and
+        with weights a weight column.
 
         Args:
             max_n(int): The longest phrase length desired in output.
@@ -208,7 +1082,11 @@ class Grammer:
         df_list = []
         for i in range(n, max_n + 1):
             ngrams_list = self.get_ngrams(i, top_n_results, stopwords)
-            df = self.df_from_terms(ngrams_list)
+            df = self.df_from_terms(ngrams_list, i)
+            if self.memory_budget is not None:
+                df[f"{i}-gram error bound"] = self.error_bounds[i]
+            if self.weights is not None:
+                df[f"{i}-gram weight"] = self.weight_totals[i]
             df_list.append(df)
         if len(df_list) > 1:
             combined_dataframe = self.combine_dataframes(df_list)
@@ -0,0 +1,153 @@
+"""Record time, volume and memory of pipeline stages."""
+from contextlib import contextmanager
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+COLUMNS = (
+    "stage",
+    "wall_s",
+    "cpu_s",
+    "rows",
+    "tokens",
+    "rss_delta_mb",
+    "peak_delta_mb",
+)
+
+# Peak RSS each open stage reached before an inner stage reset the peak.
+_open_peaks: List[List[Optional[float]]] = []
+
+
+def read_rss_mb() -> Tuple[Optional[float], Optional[float]]:
+    """Return the process's current and peak resident set size in MB.
+
+    Returns:
+        rss(float, optional): Current resident set size.
+        peak(float, optional): Peak resident set size since the process
+            started or the peak was last reset. Both are read from
+            /proc/self/status, so are None other than on Linux.
+
+    """
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        rss, peak = (int(fields[key].split()[0]) for key in ("VmRSS", "VmHWM"))
+    except (OSError, KeyError, ValueError):
+        return None, None
+    return round(rss / 1024, 1), round(peak / 1024, 1)
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process's peak resident set size to its current size.
+
+    Only Linux can do this, through /proc/self/clear_refs.
+
+    Returns:
+        bool: Whether the peak was reset.
+
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _raise_open_peaks(peak: Optional[float]) -> None:
+    """Record peak for each open stage before the peak is reset."""
+    for cell in _open_peaks:
+        if peak is not None and (cell[0] is None or peak > cell[0]):
+            cell[0] = peak
+
+
+class Metrics:
+    """Class to record metrics for each stage of work on an object.
+
+    Attributes:
+        stages(list): One dict per finished stage with its name, start
+            time, wall and CPU seconds, rows and tokens processed (None when
+            not applicable), and how far the process's resident set size
+            ended and peaked above where it was when the stage started, in
+            MB. CPU time and memory cover this process only, not worker
+            processes. Memory is measured on Linux only and is None
+            elsewhere.
+
+    """
+
+    def __init__(self) -> None:
+        """Constructs attributes for Metrics object with no stages."""
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Time the body of a with block as a stage.
+
+        The yielded record can be updated with `rows` and `tokens` counts
+        inside the block. The peak resident set size is reset when the
+        stage starts, so each stage reports its own peak, and open outer
+        stages keep the peak they had reached.
+
+        Args:
+            name(str): The name of the stage.
+
+        Yields:
+            dict: The record for this stage.
+
+        """
+        record: Dict[str, Any] = dict.fromkeys(COLUMNS)
+        record.update(stage=name, started=time.time())
+        _raise_open_peaks(read_rss_mb()[1])
+        reset = reset_peak_rss()
+        start_rss, start_peak = read_rss_mb()
+        peak: List[Optional[float]] = [None]
+        _open_peaks.append(peak)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall, 4)
+            record["cpu_s"] = round(time.process_time() - cpu, 4)
+            _open_peaks.remove(peak)
+            end_rss, end_peak = read_rss_mb()
+            if start_rss is not None and end_rss is not None:
+                record["rss_delta_mb"] = round(end_rss - start_rss, 1)
+                # Without a reset the peak is the lifetime peak, which only
+                # belongs to this stage if it rose during it.
+                if reset or end_peak > start_peak:
+                    stage_peak = max(peak[0] or end_peak, end_peak)
+                    record["peak_delta_mb"] = round(stage_peak - start_rss, 1)
+            self.stages.append(record)
+
+
+def format_table(stages: List[Dict[str, Any]]) -> str:
+    """Formats stage records as a plain text table.
+
+    Args:
+        stages(list): Stage records from one or more Metrics objects.
+
+    Returns:
+        str: Table with one row per stage, in order of start time.
+
+    """
+    header = ["stage", "wall s", "cpu s", "rows", "tokens", "RSS +MB", "peak +MB"]
+    lines = [f"{header[0]:<20}" + "".join(f"{h:>13}" for h in header[1:])]
+    for record in sorted(stages, key=lambda r: r["started"]):
+        cells = [
+            "-" if record[column] is None else f"{record[column]:,}"
+            for column in COLUMNS[1:]
+        ]
+        lines.append(f"{record['stage']:<20}" + "".join(f"{c:>13}" for c in cells))
+    return "\n".join(lines)
+
+
+def write_json(stages: List[Dict[str, Any]], path: str) -> None:
+    """Writes stage records to a JSON file, in order of start time.
+
+    Args:
+        stages(list): Stage records from one or more Metrics objects.
+        path(str): The path of the JSON file to write.
+
+    """
+    with open(path, "w") as f:
+        json.dump(sorted(stages, key=lambda r: r["started"]), f, indent=2)
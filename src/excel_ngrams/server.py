@@ -0,0 +1,460 @@
+"""Serve n-gram analysis over HTTP with a warm model and bounded workers."""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+import click
+import pandas as pd
+
+from .batch import warm_model
+from .constants import BOUNDARIES, COUNTERS, INPUT_FORMATS, TOKENIZERS
+from .file_handler import FileHandler, to_long_format
+from .grammer import Grammer
+
+# Request parameters and their defaults, matching the CLI options.
+DEFAULTS: Dict[str, Any] = {
+    "input_format": None,
+    "sheet_name": 0,
+    "column_name": "Keyword",
+    "max_n": 5,
+    "top_results": 250,
+    "stopwords": True,
+    "tokenizer": "spacy-full",
+    "counter": "python",
+    "boundary": "row",
+    "memory_budget": None,
+    "format": "json",
+}
+
+FORMATS = ("json", "csv")
+
+# Number of recent request latencies kept for percentiles.
+LATENCY_WINDOW = 1024
+
+
+def parse_int(value: Union[int, str], name: str) -> int:
+    """Converts a request parameter to a positive integer.
+
+    Args:
+        value(int or str): JSON number or query string text.
+        name(str): The parameter name, for error messages.
+
+    Returns:
+        int: The value as an integer.
+
+    Raises:
+        ValueError: Value isn't an integer of at least 1.
+
+    """
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer") from None
+    if number < 1:
+        raise ValueError(f"{name} must be at least 1")
+    return number
+
+
+def parse_params(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Validates request parameters, filling in defaults.
+
+    Values may be JSON types or query string text, e.g. `max_n=3` or
+    `stopwords=false`. A sheet_name made only of digits is a sheet number.
+
+    Args:
+        values(dict): Parameters from the JSON body or query string.
+
+    Returns:
+        dict: Every key of DEFAULTS with a value of the expected type.
+
+    Raises:
+        ValueError: A parameter is unknown or has an invalid value.
+
+    """
+    unknown = set(values) - set(DEFAULTS) - {"file_path", "terms"}
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    params = {**DEFAULTS, **{k: v for k, v in values.items() if k in DEFAULTS}}
+    if isinstance(params["sheet_name"], str) and params["sheet_name"].isdigit():
+        params["sheet_name"] = int(params["sheet_name"])
+    params["max_n"] = parse_int(params["max_n"], "max_n")
+    params["top_results"] = parse_int(params["top_results"], "top_results")
+    if params["memory_budget"] is not None:
+        params["memory_budget"] = parse_int(params["memory_budget"], "memory_budget")
+    if params["input_format"] not in (None, *INPUT_FORMATS):
+        raise ValueError(f"input_format must be one of {', '.join(INPUT_FORMATS)}")
+    if isinstance(params["stopwords"], str):
+        params["stopwords"] = params["stopwords"].lower() not in ("0", "false", "no")
+    for key, choices in (
+        ("tokenizer", TOKENIZERS),
+        ("counter", COUNTERS),
+        ("boundary", BOUNDARIES),
+        ("format", FORMATS),
+    ):
+        if params[key] not in choices:
+            raise ValueError(f"{key} must be one of {', '.join(choices)}")
+    return params
+
+
+def get_source(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Picks the terms or file to analyse from request values.
+
+    Args:
+        values(dict): Parameters from the JSON body or query string.
+
+    Returns:
+        dict: Either `terms`, a list of strings, or `file_path`.
+
+    Raises:
+        ValueError: Neither terms nor file_path was given.
+
+    """
+    if "terms" in values:
+        if not isinstance(values["terms"], list):
+            raise ValueError("terms must be a list of strings")
+        return {"terms": values["terms"]}
+    if "file_path" in values:
+        return {"file_path": str(values["file_path"])}
+    raise ValueError("Give terms, file_path or upload a workbook")
+
+
+def analyse(
+    source: Dict[str, Any], params: Dict[str, Any], stopwords_file: Optional[str]
+) -> pd.DataFrame:
+    """Runs ngram_range on a file or list of terms in a worker process.
+
+    Args:
+        source(dict): Either `file_path` of a workbook or `terms`, a list
+            of strings.
+        params(dict): Parameters from parse_params.
+        stopwords_file(str, optional): Stopwords file set for the server.
+
+    Returns:
+        pd.DataFrame: Combined dataframe from Grammer.ngram_range.
+
+    """
+    terms: Iterable[str]
+    if "terms" in source:
+        # Grammer skips nulls and converts other values to text.
+        terms = source["terms"]
+    else:
+        terms = FileHandler(
+            source["file_path"],
+            params["sheet_name"],
+            params["column_name"],
+            params["input_format"],
+        ).iter_terms()
+    grammer = Grammer(
+        terms,
+        tokenizer=params["tokenizer"],
+        counter=params["counter"],
+        boundary=params["boundary"],
+        memory_budget=params["memory_budget"],
+        stopwords_file=stopwords_file,
+    )
+    return grammer.ngram_range(
+        params["max_n"],
+        top_n_results=params["top_results"],
+        stopwords=params["stopwords"],
+    )
+
+
+def df_to_records(df: pd.DataFrame) -> Dict[str, Any]:
+    """Splits a combined dataframe into records for each phrase length.
+
+    Args:
+        df(pd.DataFrame): Combined dataframe from Grammer.ngram_range.
+
+    Returns:
+        dict: Term and frequency records, and error bound in approximate
+            mode, keyed by n.
+
+    """
+    long_df = to_long_format(df)
+    return {
+        str(n): rows.drop(columns=["n", "rank"]).to_dict("records")
+        for n, rows in long_df.groupby("n", sort=True)
+    }
+
+
+class ServiceStats:
+    """Thread-safe request counts and latencies for the metrics endpoint.
+
+    Attributes:
+        started(float): Time the server started, from time.time.
+
+    """
+
+    def __init__(self) -> None:
+        """Constructs empty counts."""
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counts = {"completed": 0, "failed": 0, "rejected": 0, "in_flight": 0}
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def begin(self) -> None:
+        """Counts a request accepted for analysis."""
+        with self._lock:
+            self._counts["in_flight"] += 1
+
+    def end(self, latency: float, ok: bool) -> None:
+        """Counts an accepted request as finished.
+
+        Args:
+            latency(float): Seconds from receiving the request to replying.
+            ok(bool): Whether the request succeeded.
+
+        """
+        with self._lock:
+            self._counts["in_flight"] -= 1
+            self._counts["completed" if ok else "failed"] += 1
+            self._latencies.append(latency)
+
+    def reject(self) -> None:
+        """Counts a request turned away because the queue was full."""
+        with self._lock:
+            self._counts["rejected"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """dict: Counts, uptime and latency percentiles in milliseconds."""
+        with self._lock:
+            counts = dict(self._counts)
+            latencies = sorted(self._latencies)
+        latency_ms = dict.fromkeys(("mean", "p50", "p95", "max"))
+        if latencies:
+            latency_ms.update(
+                mean=sum(latencies) / len(latencies),
+                p50=latencies[int(0.5 * (len(latencies) - 1))],
+                p95=latencies[int(0.95 * (len(latencies) - 1))],
+                max=latencies[-1],
+            )
+            latency_ms = {k: round(v * 1000, 1) for k, v in latency_ms.items()}
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            **counts,
+            "latency_ms": latency_ms,
+        }
+
+
+class NgramServer(ThreadingHTTPServer):
+    """HTTP server that runs analyses on a warm pool of worker processes.
+
+    Each worker loads the Spacy model and stopwords once when the server
+    starts. At most workers requests are analysed at once and up to
+    max_queue more wait for a worker; beyond that requests get a 503.
+
+    Attributes:
+        executor(ProcessPoolExecutor): Worker processes running analyse.
+        slots(BoundedSemaphore): One slot per running or queued request.
+        stats(ServiceStats): Request counts and latencies.
+        stopwords_file(str, optional): Stopwords file used by every request.
+        timeout(float): Seconds to wait for an analysis before giving up.
+        max_body(int): Largest request body accepted, in bytes.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        workers: int = 1,
+        max_queue: int = 8,
+        tokenizer: str = "spacy-full",
+        stopwords_file: Optional[str] = None,
+        timeout: float = 300,
+        max_body: int = 100 * 1024 * 1024,
+    ) -> None:
+        """Binds the server and starts warm worker processes."""
+        super().__init__(address, NgramRequestHandler)
+        self.executor = ProcessPoolExecutor(
+            workers, initializer=warm_model, initargs=(tokenizer,)
+        )
+        # Start every worker now rather than on the first request.
+        for future in [self.executor.submit(time.sleep, 0) for _ in range(workers)]:
+            future.result()
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.stats = ServiceStats()
+        self.default_tokenizer = tokenizer
+        self.stopwords_file = stopwords_file
+        self.timeout = timeout
+        self.max_body = max_body
+
+    def server_close(self) -> None:
+        """Closes the socket and stops the worker processes."""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class NgramRequestHandler(BaseHTTPRequestHandler):
+    """Handles health, metrics and n-gram requests for NgramServer.
+
+    `GET /health` and `GET /metrics` return JSON. `POST /ngrams` takes a
+    JSON body with `terms` or a server-side `file_path` plus parameters, or
+    an uploaded workbook as the body with parameters in the query string.
+
+    """
+
+    server: NgramServer
+
+    def send_body(
+        self, status: int, body: bytes, content_type: str = "application/json"
+    ) -> None:
+        """Sends a complete response.
+
+        Args:
+            status(int): HTTP status code.
+            body(bytes): Response body.
+            content_type(str): MIME type of body. Default is JSON.
+
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status: int, data: Dict[str, Any]) -> None:
+        """Sends data as a JSON response.
+
+        Args:
+            status(int): HTTP status code.
+            data(dict): JSON serialisable response.
+
+        """
+        self.send_body(status, json.dumps(data).encode("utf-8"))
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Returns server health or metrics."""
+        path = urlsplit(self.path).path
+        if path == "/health":
+            self.send_json(HTTPStatus.OK, {"status": "ok"})
+        elif path == "/metrics":
+            self.send_json(HTTPStatus.OK, self.server.stats.snapshot())
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Runs an n-gram analysis, or rejects it if the queue is full."""
+        url = urlsplit(self.path)
+        if url.path != "/ngrams":
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+        if not self.server.slots.acquire(blocking=False):
+            self.server.stats.reject()
+            self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Server busy"})
+            return
+        start = time.perf_counter()
+        self.server.stats.begin()
+        status: int = HTTPStatus.INTERNAL_SERVER_ERROR
+        try:
+            status = self.analyse(dict(parse_qsl(url.query)))
+        finally:
+            self.server.stats.end(time.perf_counter() - start, status == HTTPStatus.OK)
+
+    def read_values(
+        self, query: Dict[str, str]
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Reads parameters from the body and query string.
+
+        A JSON body holds parameters and terms or a file_path. Any other body
+        is saved to a temporary file and analysed as the workbook, which the
+        caller must remove.
+
+        Args:
+            query(dict): Query string parameters.
+
+        Returns:
+            values(dict): Request parameters.
+            upload_path(str, optional): Temporary file holding the upload.
+
+        Raises:
+            ValueError: JSON body isn't an object.
+
+        """
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        content_type = self.headers.get("Content-Type", "").split(";")[0]
+        if content_type == "application/json":
+            values = json.loads(body or b"{}")
+            if not isinstance(values, dict):
+                raise ValueError("Body must be a JSON object")
+            return {**query, **values}, None
+        values = dict(query)
+        suffix = os.path.splitext(values.pop("filename", ""))[1] or ".xlsx"
+        fd, upload_path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        values["file_path"] = upload_path
+        return values, upload_path
+
+    def analyse(self, query: Dict[str, str]) -> int:
+        """Reads the request, runs analyse on a worker and sends the result.
+
+        Releases the slot taken by do_POST once the analysis ends, so a
+        timed out analysis still holds its slot while a worker runs it. A
+        timed out analysis that hasn't started yet is cancelled.
+
+        Args:
+            query(dict): Query string parameters.
+
+        Returns:
+            int: HTTP status code sent.
+
+        """
+        upload_path = None
+        future = None
+        try:
+            if int(self.headers.get("Content-Length") or 0) > self.server.max_body:
+                self.send_json(
+                    HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large"}
+                )
+                return HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+            values, upload_path = self.read_values(query)
+            values.setdefault("tokenizer", self.server.default_tokenizer)
+            params = parse_params(values)
+            future = self.server.executor.submit(
+                analyse, get_source(values), params, self.server.stopwords_file
+            )
+            future.add_done_callback(lambda _: self.server.slots.release())
+            df = future.result(timeout=self.server.timeout)
+        except TimeoutError:
+            # Checked first: from Python 3.11 it is a subclass of OSError.
+            future.cancel()
+            self.send_json(HTTPStatus.GATEWAY_TIMEOUT, {"error": "Analysis timed out"})
+            return HTTPStatus.GATEWAY_TIMEOUT
+        except (ValueError, LookupError, OSError, click.ClickException) as error:
+            # Bad parameters, or a file, sheet or column that doesn't exist.
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return HTTPStatus.BAD_REQUEST
+        except Exception as error:
+            self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)})
+            return HTTPStatus.INTERNAL_SERVER_ERROR
+        finally:
+            if future is None:
+                self.server.slots.release()
+            if upload_path is not None:
+                # A timed out analysis may still be reading the upload.
+                if future is not None and not future.done():
+                    future.add_done_callback(lambda _: os.remove(upload_path))
+                else:
+                    os.remove(upload_path)
+
+        if params["format"] == "csv":
+            self.send_body(HTTPStatus.OK, df.to_csv().encode("utf-8"), "text/csv")
+        else:
+            self.send_json(HTTPStatus.OK, {"results": df_to_records(df)})
+        return HTTPStatus.OK
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Logs requests through click so they can be silenced in tests."""
+        click.echo(f"{self.address_string()} - {format % args}", err=True)
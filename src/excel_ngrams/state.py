@@ -0,0 +1,365 @@
+"""Keep full ngram counts to add appended rows or merge shards exactly."""
+from collections import Counter
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from typing import Counter as CounterType
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from .cache import file_digest, SEPARATOR
+from .grammer import Grammer
+
+# Bump when the file layout or counting changes so old states are recounted.
+STATE_VERSION = 3
+
+
+class StateMismatchError(ValueError):
+    """The rows counted by a state are no longer at the start of the input."""
+
+
+def make_settings(
+    tokenizer: str,
+    stopwords: bool,
+    stopwords_file: Optional[str] = None,
+    boundary: str = "row",
+) -> Dict[str, Any]:
+    """Describes the settings that counts in a state depend on.
+
+    Args:
+        tokenizer(str): The Grammer tokenizer engine.
+        stopwords(bool): Whether stopwords are removed.
+        stopwords_file(str, optional): Custom stopwords file, hashed by
+            content. Default is the bundled set.
+        boundary(str): The Grammer boundary. Default is row.
+
+    Returns:
+        dict: Settings to store with, and compare against, a state.
+
+    """
+    if stopwords_file is not None:
+        stopwords_file = file_digest(stopwords_file)
+    return {
+        "version": STATE_VERSION,
+        "tokenizer": tokenizer,
+        "stopwords": stopwords,
+        "stopwords_file": stopwords_file,
+        "boundary": boundary,
+    }
+
+
+def row_bytes(row: object) -> bytes:
+    """bytes: Row text as hashed by CountState, unambiguous between rows."""
+    return str(row).encode("utf-8") + b"\x00"
+
+
+def last_words(words: Sequence[str], max_n: int) -> List[str]:
+    """list: The last max_n - 1 of words, which may start an ngram."""
+    return list(words[max(len(words) - max_n + 1, 0) :])
+
+
+class CountState:
+    """Class holding every ngram count for the rows read so far.
+
+    Counts are kept in full, not just the top results, so counts for rows
+    appended later, or for other shards of a corpus, can be added to them
+    exactly. The state also records how many input rows were counted, a
+    hash of those rows to check they haven't changed, and the first and
+    last max_n - 1 words so that ngrams spanning two runs or shards can be
+    counted when the boundary setting is `none`.
+
+    A state may be pruned to its top results. Every ngram it no longer
+    holds then occurred at most bounds[n] times in its rows.
+
+    Attributes:
+        settings(dict): Settings from make_settings the counts depend on.
+        max_n(int): The longest phrase length counted.
+        rows(int): Number of input rows counted, including empty ones.
+        digest(str): SHA-256 hex digest of the counted rows.
+        words(int): Number of words counted.
+        head(:obj:`list` of :obj:`str`): The first max_n - 1 words counted.
+        tail(:obj:`list` of :obj:`str`): The last max_n - 1 words counted.
+        counts(dict): Counter of ngram tuples for each length 1 to max_n,
+            keys in order of first occurrence.
+        bounds(dict): Largest count of an ngram left out by pruning, for
+            each length. 0 when counts are complete.
+
+    """
+
+    def __init__(self, settings: Dict[str, Any], max_n: int) -> None:
+        """Constructs an empty state, as if no rows had been read."""
+        self.settings = settings
+        self.max_n = max_n
+        self.rows = 0
+        self.digest = hashlib.sha256().hexdigest()
+        self.words = 0
+        self.head: List[str] = []
+        self.tail: List[str] = []
+        self.counts: Dict[int, CounterType[Tuple[str, ...]]] = {
+            n: Counter() for n in range(1, max_n + 1)
+        }
+        self.bounds = dict.fromkeys(self.counts, 0)
+
+    def matches(self, settings: Dict[str, Any], max_n: int) -> bool:
+        """bool: Whether the counts were made with settings and max_n."""
+        return self.settings == settings and self.max_n == max_n
+
+    def new_rows(self, terms: Iterable[str]) -> Iterator[str]:
+        """Skips rows already counted and yields the rest.
+
+        The skipped rows are hashed and checked against digest straight
+        away. rows and digest are updated once the new rows are consumed.
+
+        Args:
+            terms(Iterable of :obj:`str`): Every row of the input, in order.
+
+        Returns:
+            Iterator of :obj:`str`: Rows after those already counted.
+
+        Raises:
+            StateMismatchError: The input doesn't start with the counted rows.
+
+        """
+        iterator = iter(terms)
+        digest = hashlib.sha256()
+        for _ in range(self.rows):
+            row = next(iterator, None)
+            if row is None:
+                raise StateMismatchError("Input has fewer rows than were counted")
+            digest.update(row_bytes(row))
+        if digest.hexdigest() != self.digest:
+            raise StateMismatchError("Rows counted earlier have changed")
+        return self._consume(iterator, digest)
+
+    def _consume(
+        self, iterator: Iterator[str], digest: "hashlib._Hash"
+    ) -> Iterator[str]:
+        """Yields new rows, then records them as counted."""
+        rows = self.rows
+        for row in iterator:
+            digest.update(row_bytes(row))
+            rows += 1
+            yield row
+        self.rows = rows
+        self.digest = digest.hexdigest()
+
+    def update(self, grammer: Grammer, stopwords: bool = True) -> None:
+        """Adds the ngrams of grammer's rows, which follow those counted.
+
+        Args:
+            grammer(Grammer): Grammer over the rows from new_rows.
+            stopwords(bool): flag to indicate removal of stopwords.
+                Default is True.
+
+        """
+        for n in range(1, self.max_n + 1):
+            self.counts[n].update(grammer.count_ngrams(n, stopwords, prefix=self.tail))
+        words = grammer.get_words(stopwords)
+        self.extend(words[: self.max_n - 1], words[-self.max_n :], len(words))
+
+    def extend(self, head: List[str], tail: List[str], words: int) -> None:
+        """Updates head, tail and words for words added after those counted.
+
+        Args:
+            head(:obj:`list` of :obj:`str`): The first max_n - 1 added words.
+            tail(:obj:`list` of :obj:`str`): The last max_n - 1 added words.
+            words(int): The number of added words.
+
+        """
+        if self.words < self.max_n - 1:
+            self.head = (self.head + head)[: self.max_n - 1]
+        if words < self.max_n - 1:
+            # head holds every added word, which may follow the old tail.
+            tail = self.tail + head
+        self.tail = last_words(tail, self.max_n)
+        self.words += words
+
+    def prune(self, top_n_results: int) -> None:
+        """Keeps only the most frequent ngrams of each length.
+
+        Kept ngrams stay in order of first occurrence. bounds[n] is raised
+        to the largest count dropped.
+
+        Args:
+            top_n_results(int): The number of ngrams to keep per length.
+
+        """
+        for n, counts in self.counts.items():
+            kept = {key for key, _ in counts.most_common(top_n_results)}
+            dropped = [count for key, count in counts.items() if key not in kept]
+            self.bounds[n] = max([self.bounds[n], *dropped])
+            self.counts[n] = Counter({k: c for k, c in counts.items() if k in kept})
+
+    def save(self, path: str) -> None:
+        """Writes the state to a compressed NumPy archive.
+
+        Words are stored once in a vocabulary and each ngram as a row of
+        integer ids, next to its count. The file is replaced atomically.
+
+        Args:
+            path(str): Where to write the state.
+
+        """
+        index: Dict[str, int] = {}
+        arrays = {}
+        for n, counts in self.counts.items():
+            ids = [index.setdefault(word, len(index)) for key in counts for word in key]
+            arrays[f"ids_{n}"] = np.array(ids, dtype=np.int32).reshape(-1, n)
+            arrays[f"counts_{n}"] = np.fromiter(
+                counts.values(), dtype=np.int64, count=len(counts)
+            )
+        meta = {
+            "settings": self.settings,
+            "max_n": self.max_n,
+            "rows": self.rows,
+            "digest": self.digest,
+            "words": self.words,
+            "head": self.head,
+            "tail": self.tail,
+            "bounds": [self.bounds[n] for n in sorted(self.bounds)],
+        }
+        for name, data in (
+            ("meta", json.dumps(meta)),
+            ("vocab", SEPARATOR.join(index)),
+        ):
+            arrays[name] = np.frombuffer(data.encode("utf-8"), dtype=np.uint8)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> Optional["CountState"]:
+        """Reads a state written by save.
+
+        Args:
+            path(str): The path of the state file.
+
+        Returns:
+            CountState: The loaded state, or None if the file is missing or
+                unreadable.
+
+        """
+        try:
+            with np.load(path) as archive:
+                meta = json.loads(archive["meta"].tobytes().decode("utf-8"))
+                vocab = archive["vocab"].tobytes().decode("utf-8").split(SEPARATOR)
+                state = CountState(meta["settings"], meta["max_n"])
+                for n in state.counts:
+                    keys = archive[f"ids_{n}"].tolist()
+                    counts = archive[f"counts_{n}"].tolist()
+                    state.counts[n] = Counter(
+                        {
+                            tuple(vocab[i] for i in key): count
+                            for key, count in zip(keys, counts)
+                        }
+                    )
+        except (OSError, EOFError, KeyError, ValueError):
+            return None
+        state.rows = meta["rows"]
+        state.digest = meta["digest"]
+        state.words = meta["words"]
+        state.head = meta["head"]
+        state.tail = meta["tail"]
+        state.bounds = dict(zip(sorted(state.bounds), meta["bounds"]))
+        return state
+
+
+def open_state(
+    path: str,
+    settings: Dict[str, Any],
+    max_n: int,
+    read_terms: Callable[[], Iterable[str]],
+) -> Tuple[CountState, Iterator[str]]:
+    """Loads the state at path and returns the rows it hasn't counted.
+
+    Starts from an empty state if there is no state at path, if it was made
+    with other settings or max_n, or if the rows it counted have changed.
+
+    Args:
+        path(str): The path of the state file.
+        settings(dict): Settings from make_settings.
+        max_n(int): The longest phrase length to count.
+        read_terms(Callable): Returns every row of the input, in order.
+            Called again if the rows counted by the state have changed.
+
+    Returns:
+        state(CountState): State to update with the new rows.
+        new_rows(Iterator of :obj:`str`): Rows to count.
+
+    """
+    state = CountState.load(path)
+    if state is not None and state.matches(settings, max_n):
+        try:
+            return state, state.new_rows(read_terms())
+        except StateMismatchError:
+            pass
+    state = CountState(settings, max_n)
+    return state, state.new_rows(read_terms())
+
+
+def merge_states(states: Sequence[CountState]) -> CountState:
+    """Combines the counts of consecutive shards of a corpus.
+
+    States must be given in corpus order. Ngrams spanning two shards are
+    counted from the tail of the words so far and the head of the next
+    shard, so merging complete states gives exactly the counts, in the same
+    order, of one state over the whole corpus. Unless the boundary setting
+    is `none`, no ngram spans two shards. Merged bounds are the sum of the
+    shards' bounds.
+
+    Args:
+        states(Sequence of :obj:`CountState`): States with equal settings
+            and max_n.
+
+    Returns:
+        CountState: State over every shard's rows.
+
+    Raises:
+        ValueError: No states were given or their settings differ.
+
+    """
+    if not states:
+        raise ValueError("No states to merge")
+    merged = CountState(states[0].settings, states[0].max_n)
+    spanning = merged.settings.get("boundary") == "none"
+    for state in states:
+        if not state.matches(merged.settings, merged.max_n):
+            raise ValueError("States were counted with different settings")
+        words = merged.tail + state.head if spanning else []
+        start = len(merged.tail)
+        for n, counts in merged.counts.items():
+            counts.update(
+                tuple(words[i : i + n])
+                for i in range(max(start - n + 1, 0), min(start, len(words) - n + 1))
+            )
+            counts.update(state.counts[n])
+            merged.bounds[n] += state.bounds[n]
+        merged.extend(state.head, state.tail, state.words)
+        merged.rows += state.rows
+    return merged
+
+
+def merge_errors(
+    states: Sequence[CountState], n: int, keys: Iterable[Tuple[str, ...]]
+) -> List[int]:
+    """Bounds the undercount of merged ngrams left out of pruned states.
+
+    Args:
+        states(Sequence of :obj:`CountState`): The merged states.
+        n(int): The length of the ngrams.
+        keys(Iterable of :obj:`tuple`): Ngrams from the merged counts.
+
+    Returns:
+        :obj:`list` of :obj:`int`: For each key, the sum of bounds of the
+            states that don't hold it.
+
+    """
+    return [
+        sum(state.bounds[n] for state in states if key not in state.counts[n])
+        for key in keys
+    ]
@@ -0,0 +1,159 @@
+"""Tests cases for the batch module."""
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+import pytest
+import xlsxwriter
+
+from excel_ngrams.batch import (
+    Job,
+    job_label,
+    jobs_from_patterns,
+    read_manifest,
+    run_batch,
+    run_job,
+    write_summary,
+)
+
+TERMS = ["diet snacks", "keto snacks", "low carb snacks", "low calorie snacks"]
+
+
+def write_workbook(path: Path, column_name: str = "Keyword") -> str:
+    """Writes TERMS under column_name to the first sheet of a workbook."""
+    workbook = xlsxwriter.Workbook(str(path))
+    worksheet = workbook.add_worksheet()
+    worksheet.write_column(0, 0, [column_name, *TERMS])
+    workbook.close()
+    return str(path)
+
+
+@pytest.fixture
+def settings() -> Dict[str, Any]:
+    """Fixture returns settings shared by batch jobs."""
+    return {
+        "input_format": None,
+        "max_n": 2,
+        "top_results": 10,
+        "stopwords": True,
+        "stopwords_file": None,
+        "tokenizer": "regex",
+        "counter": "python",
+        "boundary": "row",
+        "memory_budget": None,
+        "stream": False,
+        "cache_dir": None,
+        "cache_size": 512,
+        "output_format": "csv",
+        "xlsx_layout": "per-n",
+    }
+
+
+def test_jobs_from_patterns(tmp_path: Path) -> None:
+    """It makes one job per matching file, sorted and without duplicates."""
+    write_workbook(tmp_path / "b.xlsx")
+    write_workbook(tmp_path / "a.xlsx")
+    (tmp_path / "notes.txt").write_text("")
+    patterns = [str(tmp_path / "*.xlsx"), str(tmp_path / "a.*")]
+    jobs = jobs_from_patterns(patterns, 0, "Keyword")
+    assert jobs == [
+        Job(str(tmp_path / "a.xlsx"), 0, "Keyword"),
+        Job(str(tmp_path / "b.xlsx"), 0, "Keyword"),
+    ]
+
+
+def test_read_manifest_fills_defaults(tmp_path: Path) -> None:
+    """It resolves paths from the manifest's directory and fills blanks."""
+    manifest = tmp_path / "jobs.csv"
+    manifest.write_text(
+        "file_path,sheet_name,column_name\n"
+        "a.xlsx,,\n"
+        "b.xlsx,Sheet2,Query\n"
+        ",,\n"
+    )
+    assert read_manifest(str(manifest), 0, "Keyword") == [
+        Job(str(tmp_path / "a.xlsx"), 0, "Keyword"),
+        Job(str(tmp_path / "b.xlsx"), "Sheet2", "Query"),
+    ]
+
+
+def test_read_manifest_requires_file_path(tmp_path: Path) -> None:
+    """It raises ValueError when there is no file_path column."""
+    manifest = tmp_path / "jobs.csv"
+    manifest.write_text("path\na.xlsx\n")
+    with pytest.raises(ValueError):
+        read_manifest(str(manifest))
+
+
+def test_job_label_is_safe_for_file_names() -> None:
+    """It replaces characters that don't belong in file names."""
+    assert job_label(Job("a.xlsx", "Q1 / Q2", "Keyword")) == "Q1-Q2_Keyword"
+
+
+def test_run_job_writes_output(tmp_path: Path, settings: Dict[str, Any]) -> None:
+    """It writes n-grams for the job and summarises it."""
+    path = write_workbook(tmp_path / "terms.xlsx")
+    summary = run_job(Job(path), settings)
+    assert summary["status"] == "ok"
+    assert summary["rows"] == 4
+    assert summary["tokens"] == 10
+    assert Path(summary["output_path"]).name.startswith("terms_0_Keyword_")
+    output = pd.read_csv(summary["output_path"])
+    assert output["1-gram"][0] == "snacks"
+    assert output["1-gram frequency"][0] == 4
+
+
+def test_run_job_writes_output_format(
+    tmp_path: Path, settings: Dict[str, Any]
+) -> None:
+    """It writes the chosen output format and reports its path."""
+    settings["output_format"] = "csv.gz"
+    summary = run_job(Job(write_workbook(tmp_path / "terms.xlsx")), settings)
+    assert summary["output_path"].endswith("_n-grams.csv.gz")
+    assert pd.read_csv(summary["output_path"])["1-gram"][0] == "snacks"
+
+
+def test_run_job_records_failure(tmp_path: Path, settings: Dict[str, Any]) -> None:
+    """It records an error instead of raising it."""
+    path = write_workbook(tmp_path / "terms.xlsx", column_name="Query")
+    summary = run_job(Job(path), settings)
+    assert summary["status"] == "failed"
+    assert "Keyword" in summary["error"]
+    assert summary["output_path"] is None
+
+
+def test_run_job_uses_cache(tmp_path: Path, settings: Dict[str, Any]) -> None:
+    """It stores tokens on the first run and reads them on the next."""
+    path = write_workbook(tmp_path / "terms.xlsx")
+    settings["cache_dir"] = str(tmp_path / "cache")
+    first = run_job(Job(path), settings)
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    second = run_job(Job(path), settings)
+    assert (first["rows"], first["tokens"]) == (second["rows"], second["tokens"])
+
+
+def test_run_batch_in_workers_matches_serial(
+    tmp_path: Path, settings: Dict[str, Any]
+) -> None:
+    """It gives the same results in job order across worker processes."""
+    jobs = [
+        Job(write_workbook(tmp_path / "a.xlsx")),
+        Job(write_workbook(tmp_path / "b.xlsx", column_name="Query"), 0, "Query"),
+        Job(str(tmp_path / "missing.xlsx")),
+    ]
+    serial = list(run_batch(jobs, settings))
+    parallel = list(run_batch(jobs, settings, workers=2))
+    assert [s["status"] for s in serial] == ["ok", "ok", "failed"]
+    assert [s["file_path"] for s in parallel] == [job.file_path for job in jobs]
+    assert [(s["status"], s["tokens"]) for s in parallel] == [
+        (s["status"], s["tokens"]) for s in serial
+    ]
+
+
+def test_write_summary(tmp_path: Path, settings: Dict[str, Any]) -> None:
+    """It writes one summary row per job."""
+    path = write_workbook(tmp_path / "terms.xlsx")
+    summaries = list(run_batch([Job(path), Job(path, 0, "Query")], settings))
+    summary_path = write_summary(summaries, str(tmp_path / "summary.csv"))
+    summary = pd.read_csv(summary_path)
+    assert summary["status"].tolist() == ["ok", "failed"]
@@ -0,0 +1,104 @@
+"""Tests cases for the cache module."""
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from excel_ngrams.cache import CorpusCache, file_digest, TokenMemo
+
+ROWS = [["diet", "snacks"], [], ["it", "'s", "", "low", "carb", "snacks"]]
+
+
+@pytest.fixture
+def corpus_cache(tmp_path: Path) -> CorpusCache:
+    """Fixture returns CorpusCache in a temporary directory."""
+    return CorpusCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def input_file(tmp_path: Path) -> str:
+    """Fixture returns path to a small input file."""
+    path = tmp_path / "terms.xlsx"
+    path.write_bytes(b"keyword export")
+    return str(path)
+
+
+def test_round_trips_rows(corpus_cache: CorpusCache) -> None:
+    """It loads the same rows it stored."""
+    corpus_cache.put("key", ROWS)
+    assert corpus_cache.get("key") == ROWS
+
+
+def test_missing_key_returns_none(corpus_cache: CorpusCache) -> None:
+    """It returns None for a key that isn't cached."""
+    assert corpus_cache.get("missing") is None
+
+
+def test_key_depends_on_content_and_settings(input_file: str) -> None:
+    """It changes key when file content or settings change."""
+    key = CorpusCache.make_key(input_file, 0, "Keyword", "spacy-full")
+    assert key == CorpusCache.make_key(input_file, 0, "Keyword", "spacy-full")
+    assert key != CorpusCache.make_key(input_file, "0", "Keyword", "spacy-full")
+    assert key != CorpusCache.make_key(input_file, 0, "Keyword", "regex")
+    assert key != CorpusCache.make_key(
+        input_file, 0, "Keyword", "spacy-full", split_sentences=True
+    )
+    Path(input_file).write_bytes(b"new keyword export")
+    assert key != CorpusCache.make_key(input_file, 0, "Keyword", "spacy-full")
+
+
+def test_file_digest_is_sha256(input_file: str) -> None:
+    """It returns the SHA-256 hex digest of the file."""
+    assert file_digest(input_file, block_size=4) == (
+        "f34cfb5cf8f855cdfe6c3dd07b3dbb8e8528434985e0aa20a6fa908f696ba8a0"
+    )
+
+
+def test_evicts_least_recently_used(corpus_cache: CorpusCache) -> None:
+    """It removes the least recently used entries beyond max_size."""
+    corpus_cache.put("old", ROWS)
+    corpus_cache.put("used", ROWS)
+    os.utime(corpus_cache.get_path("old"), (1, 1))
+    os.utime(corpus_cache.get_path("used"), (2, 2))
+    assert corpus_cache.get("used") == ROWS
+    corpus_cache.max_size = os.path.getsize(corpus_cache.get_path("used")) * 2
+    corpus_cache.put("new", ROWS)
+    assert corpus_cache.get("old") is None
+    assert corpus_cache.get("used") == ROWS
+    assert corpus_cache.get("new") == ROWS
+
+
+def test_tolerates_entries_removed_by_another_process(
+    corpus_cache: CorpusCache,
+) -> None:
+    """It reads and evicts when a shared entry disappears meanwhile."""
+    corpus_cache.put("old", ROWS)
+    with patch("excel_ngrams.cache.os.utime", side_effect=FileNotFoundError):
+        assert corpus_cache.get("old") == ROWS
+    corpus_cache.max_size = 0
+    with patch("excel_ngrams.cache.os.remove", side_effect=FileNotFoundError):
+        corpus_cache.evict()
+    with patch("excel_ngrams.cache.os.stat", side_effect=FileNotFoundError):
+        corpus_cache.evict()
+
+
+def test_token_memo_evicts_least_recently_used() -> None:
+    """It keeps the most recently used texts and counts lookups."""
+    memo = TokenMemo(max_entries=2)
+    memo.put("regex", "diet snacks", ["diet", "snacks"])
+    memo.put("regex", "keto", ["keto"])
+    assert memo.get("regex", "diet snacks") == ("diet", "snacks")
+    memo.put("regex", "nuts", ["nuts"])
+    assert memo.get("regex", "keto") is None
+    assert memo.get("spacy-full", "nuts") is None
+    assert memo.stats() == {
+        "entries": 2,
+        "max_entries": 2,
+        "hits": 1,
+        "misses": 2,
+        "hit_rate": 0.3333,
+    }
+    memo.resize(0)
+    memo.put("regex", "keto", ["keto"])
+    assert len(memo) == 0
@@ -1,16 +1,29 @@
 """Test cases for the console module."""
+import json
 import os
-from typing import Generator, TextIO
+from pathlib import Path
+import subprocess
+import sys
+from typing import Generator, List, TextIO
 from unittest.mock import call, Mock
 
 import click
 import click.testing
 from click.testing import CliRunner
 from freezegun import freeze_time
+import pandas as pd
 import pytest
 from pytest_mock import MockFixture
+import xlsxwriter
 
 from excel_ngrams import console
+from excel_ngrams.cache import TokenMemo
+from excel_ngrams.metrics import Metrics
+
+# Cumulative import time allowed for excel_ngrams.console, in microseconds.
+IMPORT_TIME_BUDGET_US = 250_000
+
+HEAVY_MODULES = {"spacy", "nltk", "pandas", "numpy", "openpyxl"}
 
 
 @pytest.fixture
@@ -22,13 +35,19 @@ def runner() -> CliRunner:
 @pytest.fixture
 def mock_file_handler(mocker: MockFixture) -> Mock:
     """Fixture for mocking FileHandler."""
-    return mocker.patch("excel_ngrams.console.FileHandler")
+    return mocker.patch("excel_ngrams.file_handler.FileHandler")
 
 
 @pytest.fixture
 def mock_grammer(mocker: MockFixture) -> Mock:
     """Fixture for mocking Grammer."""
-    return mocker.patch("excel_ngrams.console.Grammer")
+    return mocker.patch("excel_ngrams.grammer.Grammer")
+
+
+@pytest.fixture
+def mock_corpus_cache(mocker: MockFixture) -> Mock:
+    """Fixture for mocking CorpusCache."""
+    return mocker.patch("excel_ngrams.cache.CorpusCache")
 
 
 @pytest.fixture(scope="session")
@@ -73,8 +92,27 @@ def test_main_calls_filehandler_specified_path(
     result = runner.invoke(console.main, ["--file-path=test.xlsx"])
     assert result.exit_code == 0
     mock_file_handler.assert_called_with(
-        file_path="test.xlsx", sheet_name=0, column_name="Keyword"
+        file_path="test.xlsx",
+        sheet_name=0,
+        column_name="Keyword",
+        input_format=None,
+        weight_column=None,
+    )
+
+
+def test_main_passes_input_format_to_filehandler(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It reads the input in the format given."""
+    result = runner.invoke(
+        console.main, ["--file-path=test.xlsx", "--input-format=csv"]
     )
+    assert result.exit_code == 0
+    args, kwargs = mock_file_handler.call_args
+    assert kwargs["input_format"] == "csv"
 
 
 def test_main_calls_grammer(
@@ -102,6 +140,370 @@ def test_main_calls_grammer_with_default_args(
     assert instance.ngram_range.call_args == call(5, top_n_results=250, stopwords=True)
 
 
+def test_main_passes_tokenizer_to_grammer(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It passes the chosen tokenizer engine to Grammer."""
+    result = runner.invoke(
+        console.main, ["--file-path=test.xlsx", "--tokenizer=regex"]
+    )
+    assert result.exit_code == 0
+    args, kwargs = mock_grammer.call_args
+    assert kwargs["tokenizer"] == "regex"
+
+
+def test_main_passes_workers_to_grammer(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It passes the number of worker processes to Grammer."""
+    result = runner.invoke(console.main, ["--file-path=test.xlsx", "--workers=4"])
+    assert result.exit_code == 0
+    args, kwargs = mock_grammer.call_args
+    assert kwargs["workers"] == 4
+
+
+@pytest.mark.parametrize("value, expected", [("64", 64), ("auto", None)])
+def test_main_passes_batch_size_to_grammer(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+    value: str,
+    expected: object,
+) -> None:
+    """It passes the spaCy batch size, or None to tune it, to Grammer."""
+    args = ["--file-path=test.xlsx", f"--batch-size={value}"]
+    result = runner.invoke(console.main, args)
+    assert result.exit_code == 0
+    args, kwargs = mock_grammer.call_args
+    assert kwargs["batch_size"] == expected
+
+
+def test_main_rejects_bad_batch_size(
+    runner: CliRunner, fake_excel_file: TextIO
+) -> None:
+    """It exits with a usage error for a batch size that isn't positive."""
+    result = runner.invoke(console.main, ["--file-path=test.xlsx", "--batch-size=0"])
+    assert result.exit_code == 2
+
+
+def test_main_passes_counter_to_grammer(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It passes the chosen counting engine to Grammer."""
+    result = runner.invoke(console.main, ["--file-path=test.xlsx", "--counter=numpy"])
+    assert result.exit_code == 0
+    args, kwargs = mock_grammer.call_args
+    assert kwargs["counter"] == "numpy"
+
+
+def test_main_passes_memory_budget_to_grammer(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It passes the approximate counting budget to Grammer."""
+    result = runner.invoke(
+        console.main, ["--file-path=test.xlsx", "--memory-budget=5000"]
+    )
+    assert result.exit_code == 0
+    args, kwargs = mock_grammer.call_args
+    assert kwargs["memory_budget"] == 5000
+
+
+def test_main_streams_terms_when_requested(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It passes the lazy term iterator to Grammer with --stream."""
+    result = runner.invoke(console.main, ["--file-path=test.xlsx", "--stream"])
+    assert result.exit_code == 0
+    instance = mock_file_handler.return_value
+    instance.get_terms.assert_not_called()
+    args, kwargs = mock_grammer.call_args
+    assert args[0] == instance.iter_terms.return_value
+
+
+def test_main_passes_stopwords_file_to_grammer(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It passes the custom stopwords file path to Grammer."""
+    result = runner.invoke(
+        console.main, ["--file-path=test.xlsx", "--stopwords-file=test.xlsx"]
+    )
+    assert result.exit_code == 0
+    args, kwargs = mock_grammer.call_args
+    assert kwargs["stopwords_file"] == "test.xlsx"
+
+
+def test_main_passes_output_format_to_write(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It writes the chosen output format and names it."""
+    result = runner.invoke(
+        console.main, ["--file-path=test.xlsx", "--output-format=parquet"]
+    )
+    assert result.exit_code == 0
+    args, kwargs = mock_file_handler.return_value.write.call_args
+    assert kwargs["output_format"] == "parquet"
+    assert "Parquet file written to" in result.output
+
+
+def test_main_passes_xlsx_layout_to_write(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It writes xlsx output in the chosen layout."""
+    result = runner.invoke(
+        console.main,
+        ["--file-path=test.xlsx", "--output-format=xlsx", "--xlsx-layout=side-by-side"],
+    )
+    assert result.exit_code == 0
+    args, kwargs = mock_file_handler.return_value.write.call_args
+    assert kwargs["xlsx_layout"] == "side-by-side"
+    assert "Excel file written to" in result.output
+
+
+def test_main_prints_profile(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It prints a table of stage metrics from FileHandler and Grammer."""
+    mock_file_handler.return_value.metrics = Metrics()
+    mock_grammer.return_value.metrics = Metrics()
+    with mock_file_handler.return_value.metrics.stage("set_terms"):
+        pass
+    with mock_grammer.return_value.metrics.stage("tokenize"):
+        pass
+    memo = TokenMemo()
+    memo.get("regex", "diet snacks")
+    mock_grammer.token_memo.return_value = memo
+    args = ["--file-path=test.xlsx", "--profile", "--token-memo-size=10"]
+    result = runner.invoke(console.main, args)
+    assert result.exit_code == 0
+    assert "peak +MB" in result.output
+    assert "set_terms" in result.output
+    assert "tokenize" in result.output
+    assert "Token memo: 0 hits, 1 misses (0.0%), 0 of 10 entries" in result.output
+
+
+def test_main_sizes_token_memo(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It resizes the shared token memo."""
+    args = ["--file-path=test.xlsx", "--token-memo-size=5"]
+    result = runner.invoke(console.main, args)
+    assert result.exit_code == 0
+    mock_grammer.token_memo.return_value.resize.assert_called_once_with(5)
+
+
+def test_main_writes_metrics_json(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    fake_excel_file: TextIO,
+    tmp_path: Path,
+) -> None:
+    """It writes stage metrics to the given JSON file."""
+    mock_file_handler.return_value.metrics = Metrics()
+    mock_grammer.return_value.metrics = Metrics()
+    with mock_grammer.return_value.metrics.stage("count_1"):
+        pass
+    path = tmp_path / "metrics.json"
+    result = runner.invoke(
+        console.main, ["--file-path=test.xlsx", f"--metrics-json={path}"]
+    )
+    assert result.exit_code == 0
+    assert json.loads(path.read_text())[0]["stage"] == "count_1"
+
+
+def test_main_uses_cached_tokens(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    mock_corpus_cache: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It passes cached tokens to Grammer without reading the file."""
+    cache = mock_corpus_cache.return_value
+    cache.get.return_value = [["diet", "snacks"]]
+    result = runner.invoke(
+        console.main, ["--file-path=test.xlsx", "--cache-dir=.ngram-cache"]
+    )
+    assert result.exit_code == 0
+    mock_file_handler.return_value.get_terms.assert_not_called()
+    args, kwargs = mock_grammer.call_args
+    assert kwargs["tokens"] == [["diet", "snacks"]]
+    cache.put.assert_not_called()
+
+
+def test_main_stores_tokens_on_cache_miss(
+    runner: CliRunner,
+    mock_file_handler: Mock,
+    mock_grammer: Mock,
+    mock_corpus_cache: Mock,
+    fake_excel_file: TextIO,
+) -> None:
+    """It stores the tokens from Grammer when they aren't cached."""
+    cache = mock_corpus_cache.return_value
+    cache.get.return_value = None
+    result = runner.invoke(
+        console.main, ["--file-path=test.xlsx", "--cache-dir=.ngram-cache"]
+    )
+    assert result.exit_code == 0
+    cache.make_key.assert_called_with(
+        "test.xlsx", 0, "Keyword", "spacy-full", split_sentences=False
+    )
+    cache.put.assert_called_once_with(
+        cache.make_key.return_value, mock_grammer.return_value.tokenize.return_value
+    )
+
+
+def test_main_rejects_state_with_cache(
+    runner: CliRunner, fake_excel_file: TextIO
+) -> None:
+    """It exits with a usage error when --state is used with --cache-dir."""
+    result = runner.invoke(
+        console.main,
+        ["--file-path=test.xlsx", "--state=state.npz", "--cache-dir=.ngram-cache"],
+    )
+    assert result.exit_code == 2
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--rank-by=weight"],
+        ["--weight-column=Volume", "--state=state.npz"],
+        ["--weight-column=Volume", "--boundary=none"],
+    ],
+)
+def test_main_rejects_weights_with_other_options(
+    runner: CliRunner, fake_excel_file: TextIO, args: List[str]
+) -> None:
+    """It exits with a usage error when weights can't be used."""
+    result = runner.invoke(console.main, ["--file-path=test.xlsx", *args])
+    assert result.exit_code == 2
+
+
+def test_main_ranks_by_weight_column(runner: CliRunner, tmp_path: Path) -> None:
+    """It adds weight totals and ranks by them with --rank-by weight."""
+    path = tmp_path / "terms.csv"
+    path.write_text(
+        "Keyword,Volume\ndiet snacks,10\nketo snacks,5\nketo bars,20\n"
+    )
+    args = [f"--file-path={path}", "--weight-column=Volume", "--tokenizer=regex"]
+    result = runner.invoke(console.main, [*args, "-m1", "--rank-by=weight"])
+    assert result.exit_code == 0
+    output = pd.read_csv(next(tmp_path.glob("terms_*_n-grams.csv")))
+    assert output["1-gram"].tolist()[:2] == ["keto", "bars"]
+    assert output["1-gram frequency"].tolist()[:2] == [2, 1]
+    assert output["1-gram weight"].tolist()[:2] == [25.0, 20.0]
+
+
+def test_main_counts_only_appended_rows_with_state(
+    runner: CliRunner, tmp_path: Path
+) -> None:
+    """It reads only rows appended since the saved state."""
+    path = tmp_path / "terms.xlsx"
+    state = tmp_path / "state.npz"
+    args = [f"--file-path={path}", f"--state={state}", "--tokenizer=regex"]
+    terms = ["diet snacks", "keto snacks", "low carb snacks"]
+    for rows in (terms[:2], terms):
+        workbook = xlsxwriter.Workbook(str(path))
+        workbook.add_worksheet().write_column(0, 0, ["Keyword", *rows])
+        workbook.close()
+        result = runner.invoke(console.main, [*args, "--max-n=2"])
+        assert result.exit_code == 0
+    assert "Skipping 2 rows counted by an earlier run" in result.output
+    assert "low carb" in result.output
+    assert "snacks low" not in result.output
+
+
+def test_main_writes_a_file_per_sheet(runner: CliRunner, tmp_path: Path) -> None:
+    """It analyses each sheet on its own with --per-sheet."""
+    path = tmp_path / "terms.xlsx"
+    workbook = xlsxwriter.Workbook(str(path))
+    workbook.add_worksheet("Q1").write_column(0, 0, ["Keyword", "diet snacks"])
+    workbook.add_worksheet("Q2").write_column(0, 0, ["Keyword", "keto bars"])
+    workbook.close()
+    args = [f"--file-path={path}", "--sheet-name=all", "--tokenizer=regex", "-m2"]
+    result = runner.invoke(console.main, [*args, "--per-sheet"])
+    assert result.exit_code == 0
+    outputs = sorted(tmp_path.glob("terms_*_n-grams.csv"))
+    assert [output.name[:16] for output in outputs] == [
+        "terms_Q1_Keyword",
+        "terms_Q2_Keyword",
+    ]
+    assert "keto" not in outputs[0].read_text()
+    result = runner.invoke(console.main, args)
+    assert result.exit_code == 0
+    assert "keto" in result.output and "diet" in result.output
+
+
+def test_snapshots_merge_to_full_run(runner: CliRunner, tmp_path: Path) -> None:
+    """It merges snapshots of shards into the single run's output."""
+    terms = ["diet snacks", "keto snacks", "low carb snacks", "low calorie snacks"]
+    snapshots = []
+    for i, rows in enumerate((terms[:2], terms[2:], terms)):
+        path = tmp_path / f"terms_{i}.xlsx"
+        workbook = xlsxwriter.Workbook(str(path))
+        workbook.add_worksheet().write_column(0, 0, ["Keyword", *rows])
+        workbook.close()
+        snapshots.append(str(tmp_path / f"{i}.snapshot"))
+        result = runner.invoke(
+            console.main,
+            [
+                "snapshot",
+                f"--file-path={path}",
+                f"--output={snapshots[-1]}",
+                "--tokenizer=regex",
+            ],
+        )
+        assert result.exit_code == 0
+    outputs: List[Path] = []
+    for paths in (snapshots[:2], snapshots[2:]):
+        output = str(tmp_path / f"merged_{len(outputs)}")
+        result = runner.invoke(console.main, ["merge", *paths, f"--output={output}"])
+        assert result.exit_code == 0
+        outputs.extend(tmp_path.glob(f"merged_{len(outputs)}_*.csv"))
+    assert outputs[0].read_text() == outputs[1].read_text()
+
+
+def test_merge_fails_on_unreadable_snapshot(
+    runner: CliRunner, fake_excel_file: TextIO
+) -> None:
+    """It exits with status code of one if a snapshot can't be read."""
+    result = runner.invoke(console.main, ["merge", "test.xlsx"])
+    assert result.exit_code == 1
+    assert "Can't read snapshot test.xlsx" in result.output
+
+
 def test_main_fails_on_non_existent_path(runner: CliRunner) -> None:
     """It exits with status code of zero if file path doesn't exist."""
     result = runner.invoke(console.main, ["--file-path=doesnt_exist.xlsx"])
@@ -126,6 +528,108 @@ def test_main_fails_on_grammer_error(
     assert result.exit_code == 1
 
 
+def test_main_requires_file_path_without_subcommand(runner: CliRunner) -> None:
+    """It exits with a usage error when neither path nor subcommand is given."""
+    result = runner.invoke(console.main, [])
+    assert result.exit_code == 2
+    assert "--file-path" in result.output
+
+
+def test_batch_runs_jobs_and_writes_summary(
+    runner: CliRunner, mocker: MockFixture, fake_excel_file: TextIO
+) -> None:
+    """It runs a job per matching file and writes a summary."""
+    mock_run_batch = mocker.patch(
+        "excel_ngrams.batch.run_batch",
+        return_value=iter(
+            [
+                {
+                    "file_path": "test.xlsx",
+                    "sheet_name": 0,
+                    "status": "ok",
+                    "output_path": "test_0_Keyword_n-grams.csv",
+                }
+            ]
+        ),
+    )
+    mock_write_summary = mocker.patch(
+        "excel_ngrams.batch.write_summary", return_value="summary.csv"
+    )
+    result = runner.invoke(console.main, ["batch", "test.xlsx", "--workers=3"])
+    assert result.exit_code == 0
+    args, kwargs = mock_run_batch.call_args
+    assert [job.file_path for job in args[0]] == ["test.xlsx"]
+    assert args[1]["tokenizer"] == "spacy-full"
+    assert kwargs["workers"] == 3
+    mock_write_summary.assert_called_once()
+    assert "Summary written to summary.csv" in result.output
+
+
+def test_batch_fails_when_a_job_fails(
+    runner: CliRunner, mocker: MockFixture, fake_excel_file: TextIO
+) -> None:
+    """It exits with status code of one if any job failed."""
+    mocker.patch(
+        "excel_ngrams.batch.run_batch",
+        return_value=iter(
+            [
+                {
+                    "file_path": "test.xlsx",
+                    "sheet_name": 0,
+                    "status": "failed",
+                    "error": "boom",
+                }
+            ]
+        ),
+    )
+    mocker.patch("excel_ngrams.batch.write_summary", return_value="summary.csv")
+    result = runner.invoke(console.main, ["batch", "test.xlsx"])
+    assert result.exit_code == 1
+    assert "1 of 1 jobs failed" in result.output
+
+
+def test_batch_requires_patterns_or_manifest(runner: CliRunner) -> None:
+    """It exits with a usage error when given no jobs."""
+    result = runner.invoke(console.main, ["batch"])
+    assert result.exit_code == 2
+
+
+def test_console_import_within_budget() -> None:
+    """It imports the CLI without heavy dependencies, within budget."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import excel_ngrams.console"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = {}
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        imported[name.strip()] = int(cumulative)
+    assert HEAVY_MODULES.isdisjoint(imported)
+    assert imported["excel_ngrams.console"] < IMPORT_TIME_BUDGET_US
+
+
+def test_version_does_not_load_heavy_modules() -> None:
+    """It prints the version without importing spaCy, NLTK or pandas."""
+    code = (
+        "import sys\n"
+        "from excel_ngrams import console\n"
+        "try:\n"
+        "    console.main(['--version'])\n"
+        "except SystemExit:\n"
+        "    print(sorted(m for m in sys.modules if m.split('.')[0] in sys.argv))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, *HEAVY_MODULES],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert "version" in result.stdout
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
 @pytest.mark.skip("e2e test creates and deletes output file - doesn't run by default")
 @pytest.mark.e2e
 def test_main_succeeds_end_to_end(runner: CliRunner) -> None:
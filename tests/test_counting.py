@@ -0,0 +1,115 @@
+"""Tests cases for the counting module."""
+from collections import Counter
+from typing import Tuple
+
+import nltk
+import numpy as np
+import pytest
+from pytest_mock import MockFixture
+
+from excel_ngrams import counting
+from excel_ngrams.counting import encode_words, ngram_keys, SpaceSaving, top_ngrams
+from excel_ngrams.counting import top_weighted_ngrams
+
+WORDS = "low carb snacks keto snacks low carb diet snacks low carb snacks".split()
+
+
+def test_encode_words_in_order_of_appearance() -> None:
+    """It assigns ids in order of first appearance."""
+    ids, vocab = encode_words(["b", "a", "b", "c"])
+    assert ids.tolist() == [0, 1, 0, 2]
+    assert vocab == ["b", "a", "c"]
+
+
+def test_ngram_keys_equal_for_equal_ngrams() -> None:
+    """It gives equal keys to equal windows only."""
+    ids, vocab = encode_words(WORDS)
+    keys = ngram_keys(ids, len(vocab), 2).tolist()
+    windows = list(nltk.ngrams(WORDS, 2))
+    for i in range(len(keys)):
+        for j in range(len(keys)):
+            assert (keys[i] == keys[j]) == (windows[i] == windows[j])
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4])
+def test_top_ngrams_matches_counter(n: int) -> None:
+    """It returns the same frequencies and order as Counter.most_common."""
+    ids, vocab = encode_words(WORDS)
+    expected = Counter(nltk.ngrams(WORDS, n)).most_common(5)
+    assert top_ngrams(ids, vocab, n, 5) == expected
+
+
+def test_top_ngrams_reencodes_large_keys(mocker: MockFixture) -> None:
+    """It re-encodes keys that would overflow and keeps the same counts."""
+    mocker.patch.object(counting, "MAX_KEY", 40)
+    ids, vocab = encode_words(WORDS)
+    expected = Counter(nltk.ngrams(WORDS, 4)).most_common(10)
+    assert top_ngrams(ids, vocab, 4, 10) == expected
+
+
+def test_top_ngrams_fewer_words_than_n() -> None:
+    """It returns no ngrams when there are fewer words than n."""
+    ids, vocab = encode_words(["snacks"])
+    assert top_ngrams(ids, vocab, 2, 5) == []
+
+
+def test_space_saving_exact_within_capacity() -> None:
+    """It counts exactly when every distinct item fits in capacity."""
+    summary: SpaceSaving[Tuple[str, ...]] = SpaceSaving(capacity=100)
+    summary.update(nltk.ngrams(WORDS, 2))
+    expected = Counter(nltk.ngrams(WORDS, 2)).most_common(3)
+    assert [(item, count) for item, count, _ in summary.most_common(3)] == expected
+    assert all(error == 0 for _, _, error in summary.most_common(3))
+
+
+def test_space_saving_error_bounds_hold() -> None:
+    """It overestimates each count by no more than its error bound."""
+    stream = [i % 7 for i in range(50)] + [0] * 30 + list(range(100, 140))
+    summary: SpaceSaving[int] = SpaceSaving(capacity=5)
+    summary.update(stream)
+    true_counts = Counter(stream)
+    results = summary.most_common(5)
+    assert len(results) == 5
+    assert results[0][0] == 0
+    for item, count, error in results:
+        assert true_counts[item] <= count <= true_counts[item] + error
+        assert error <= summary.max_error
+
+
+def test_space_saving_rejects_zero_capacity() -> None:
+    """It raises ValueError when capacity is less than one."""
+    with pytest.raises(ValueError):
+        SpaceSaving(capacity=0)
+
+
+def test_top_ngrams_within_rows() -> None:
+    """It skips windows spanning two rows when given row ids."""
+    rows = [WORDS[:3], WORDS[3:4], WORDS[4:]]
+    ids, vocab = encode_words(WORDS)
+    row_ids = np.repeat(np.arange(len(rows)), [len(row) for row in rows])
+    counts = Counter(ngram for row in rows for ngram in nltk.ngrams(row, 2))
+    assert top_ngrams(ids, vocab, 2, 5, row_ids) == counts.most_common(5)
+
+
+def test_top_ngrams_counts_rows_by_multiplicity() -> None:
+    """It counts the windows of each row as often as the row occurs."""
+    rows = [WORDS[:3], WORDS[3:5], WORDS[5:]]
+    ids, vocab = encode_words(WORDS)
+    row_ids = np.repeat(np.arange(len(rows)), [len(row) for row in rows])
+    row_counts = np.array([3, 1, 2])
+    repeated = [row for row, count in zip(rows, row_counts) for _ in range(count)]
+    counts = Counter(ngram for row in repeated for ngram in nltk.ngrams(row, 2))
+    assert top_ngrams(ids, vocab, 2, 5, row_ids, row_counts) == counts.most_common(5)
+
+
+def test_top_weighted_ngrams_sums_weights() -> None:
+    """It sums the weight of each window and can rank by the totals."""
+    rows = [WORDS[:3], WORDS[3:5], WORDS[5:]]
+    ids, vocab = encode_words(WORDS)
+    lengths = [len(row) for row in rows]
+    row_ids = np.repeat(np.arange(len(rows)), lengths)
+    weights = np.repeat([1.0, 10.0, 2.0], lengths)
+    by_count = top_weighted_ngrams(ids, vocab, 1, 2, weights, row_ids)
+    assert by_count == [(("snacks",), 4, 15.0), (("low",), 3, 5.0)]
+    by_weight = top_weighted_ngrams(ids, vocab, 1, 2, weights, row_ids, "weight")
+    assert by_weight == [(("snacks",), 4, 15.0), (("keto",), 1, 10.0)]
@@ -1,14 +1,19 @@
 """Tests cases for the file_handler module."""
+import gzip
 import os
+from pathlib import Path
+from typing import List, Union
 from unittest.mock import Mock, mock_open, patch
 
 import click
 from freezegun import freeze_time
+import openpyxl
 import pandas as pd
 import pytest
 import xlsxwriter
 
-from excel_ngrams.file_handler import FileHandler
+from excel_ngrams.file_handler import FileHandler, input_format_from_path
+from excel_ngrams.file_handler import parse_sheet_names, to_long_format, write_xlsx
 
 
 # ------- Instance fixtures -------
@@ -77,6 +82,195 @@ def test_gets_words_list_from_excel(file_handler: FileHandler) -> None:
     ]
 
 
+def test_reads_terms_on_first_get(excel_test_file: xlsxwriter.Workbook) -> None:
+    """It defers reading the Excel doc until terms are requested."""
+    file_handler = FileHandler("test_doc.xlsx")
+    assert file_handler.term_list is None
+    assert len(file_handler.get_terms()) == 4
+
+
+def test_records_read_metrics(file_handler: FileHandler) -> None:
+    """It records rows read by set_terms."""
+    file_handler.get_terms()
+    assert file_handler.metrics.stages[0]["stage"] == "set_terms"
+    assert file_handler.metrics.stages[0]["rows"] == 4
+
+
+def test_iter_terms_streams_column(file_handler: FileHandler) -> None:
+    """It yields the same terms as get_terms without loading the sheet."""
+    result = file_handler.iter_terms()
+    assert not isinstance(result, list)
+    assert list(result) == file_handler.get_terms()
+
+
+def test_iter_terms_by_sheet_name(excel_test_file: xlsxwriter.Workbook) -> None:
+    """It streams terms from a sheet given by name."""
+    file_handler = FileHandler("test_doc.xlsx", sheet_name="Sheet1")
+    assert list(file_handler.iter_terms())[0] == "diet snacks"
+
+
+def test_iter_terms_missing_column(excel_test_file: xlsxwriter.Workbook) -> None:
+    """It raises `ClickException` when the column isn't in the header."""
+    file_handler = FileHandler("test_doc.xlsx", column_name="Volume")
+    with pytest.raises(click.ClickException):
+        list(file_handler.iter_terms())
+
+
+@pytest.mark.parametrize(
+    "file_path, expected",
+    [
+        ("terms.xlsx", "excel"),
+        ("terms.CSV", "csv"),
+        ("terms.tsv.gz", "tsv"),
+        ("terms.parquet", "parquet"),
+        ("terms.txt", "txt"),
+        ("terms", "excel"),
+    ],
+)
+def test_input_format_from_path(file_path: str, expected: str) -> None:
+    """It detects the input format from the extension."""
+    assert input_format_from_path(file_path) == expected
+
+
+@pytest.mark.parametrize(
+    "name, text",
+    [
+        ("terms.csv", "Volume,Keyword\n10,diet snacks\n20,\n30,keto snacks\n"),
+        ("terms.tsv", "Volume\tKeyword\n10\tdiet snacks\n20\t\n30\tketo snacks\n"),
+    ],
+)
+def test_reads_delimited_column(tmp_path: Path, name: str, text: str) -> None:
+    """It reads the column from csv and tsv, streaming without empty rows."""
+    path = tmp_path / name
+    path.write_text(text)
+    file_handler = FileHandler(str(path))
+    terms = file_handler.get_terms()
+    assert terms[::2] == ["diet snacks", "keto snacks"]
+    assert pd.isna(terms[1])
+    assert list(file_handler.iter_terms()) == ["diet snacks", "keto snacks"]
+
+
+def test_reads_text_lines(tmp_path: Path) -> None:
+    """It reads one term per line of a text file, given the format."""
+    path = tmp_path / "terms.dat"
+    path.write_text("diet snacks\n\nketo snacks\n")
+    file_handler = FileHandler(str(path), input_format="txt")
+    assert file_handler.get_terms() == ["diet snacks", "", "keto snacks"]
+    assert list(file_handler.iter_terms()) == ["diet snacks", "keto snacks"]
+
+
+def test_reads_csv_in_chunks(tmp_path: Path) -> None:
+    """It gives the same terms when the file spans several chunks."""
+    path = tmp_path / "terms.csv"
+    path.write_text("Keyword\n" + "".join(f"term {i}\n" for i in range(5)))
+    with patch("excel_ngrams.file_handler.CHUNK_ROWS", 2):
+        file_handler = FileHandler(str(path))
+        chunks = file_handler.column_chunks(str(path), ["Keyword"])
+        assert [len(c["Keyword"]) for c in chunks] == [2, 2, 1]
+        assert list(file_handler.iter_terms())[-1] == "term 4"
+
+
+def test_reads_weight_column(tmp_path: Path) -> None:
+    """It reads the weight of each term in the same pass, 0 if not a number."""
+    path = tmp_path / "terms.csv"
+    path.write_text("Volume,Keyword\n10,diet snacks\n,\nn/a,keto snacks\n2.5,nuts\n")
+    file_handler = FileHandler(str(path), weight_column="Volume")
+    assert file_handler.get_weights() == [10.0, 0.0, 0.0, 2.5]
+    assert len(file_handler.get_terms()) == 4
+    assert len(file_handler.metrics.stages) == 1
+    assert FileHandler(str(path)).get_weights() is None
+
+
+def test_reads_weight_column_of_sheets(two_sheet_file: str) -> None:
+    """It reads the weight column of each sheet given."""
+    file_handler = FileHandler(two_sheet_file, "all", weight_column="Keyword")
+    assert file_handler.get_weights() == [0.0, 0.0, 0.0]
+    file_handler = FileHandler(two_sheet_file, "Q2", weight_column="Volume")
+    with pytest.raises(click.ClickException, match="Volume"):
+        file_handler.get_terms()
+
+
+def test_delimited_missing_column(tmp_path: Path) -> None:
+    """It raises `ClickException` when the column isn't in the csv header."""
+    path = tmp_path / "terms.csv"
+    path.write_text("Query\ndiet snacks\n")
+    with pytest.raises(click.ClickException, match="Keyword"):
+        FileHandler(str(path)).get_terms()
+
+
+def test_reads_parquet_column(tmp_path: Path) -> None:
+    """It reads only the target column of a parquet file."""
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "terms.parquet"
+    pd.DataFrame({"Keyword": ["diet snacks", None], "Volume": [1, 2]}).to_parquet(
+        path
+    )
+    file_handler = FileHandler(str(path))
+    assert file_handler.get_terms() == ["diet snacks", None]
+    assert list(file_handler.iter_terms()) == ["diet snacks"]
+
+
+@pytest.mark.parametrize(
+    "sheet_name, expected",
+    [
+        (0, 0),
+        ("1", 1),
+        ("Sheet1", "Sheet1"),
+        ("ALL", None),
+        ("Q1, 2,", ["Q1", 2]),
+    ],
+)
+def test_parse_sheet_names(
+    sheet_name: Union[int, str], expected: Union[int, str, List[Union[int, str]], None]
+) -> None:
+    """It reads lists of sheets and `all`."""
+    assert parse_sheet_names(sheet_name) == expected
+
+
+@pytest.fixture
+def two_sheet_file(tmp_path: Path) -> str:
+    """Fixture returns path of a workbook with a column in two sheets."""
+    path = str(tmp_path / "sheets.xlsx")
+    workbook = xlsxwriter.Workbook(path)
+    workbook.add_worksheet("Q1").write_column(0, 0, ["Keyword", "diet snacks"])
+    workbook.add_worksheet("Q2").write_column(0, 0, ["Keyword", "keto bars", "nuts"])
+    workbook.close()
+    return path
+
+
+@pytest.mark.parametrize("sheet_name", ["all", "Q1,Q2", "0,1"])
+def test_reads_several_sheets(two_sheet_file: str, sheet_name: str) -> None:
+    """It joins the column of each sheet, in order, when reading or streaming."""
+    file_handler = FileHandler(two_sheet_file, sheet_name=sheet_name)
+    expected = ["diet snacks", "keto bars", "nuts"]
+    assert file_handler.get_terms() == expected
+    assert list(file_handler.iter_terms()) == expected
+
+
+def test_reads_single_sheet_by_number(two_sheet_file: str) -> None:
+    """It reads a sheet given as a number in text, as from the CLI."""
+    file_handler = FileHandler(two_sheet_file, sheet_name="1")
+    assert file_handler.get_terms() == ["keto bars", "nuts"]
+    assert list(file_handler.iter_terms()) == ["keto bars", "nuts"]
+
+
+def test_get_sheet_terms(two_sheet_file: str) -> None:
+    """It reads the terms of each sheet separately."""
+    file_handler = FileHandler(two_sheet_file, sheet_name="all")
+    assert file_handler.get_sheet_terms() == {
+        "Q1": ["diet snacks"],
+        "Q2": ["keto bars", "nuts"],
+    }
+    assert file_handler.metrics.stages[0]["rows"] == 3
+
+
+def test_get_sheet_terms_missing_column(two_sheet_file: str) -> None:
+    """It raises `ClickException` when a sheet lacks the column."""
+    file_handler = FileHandler(two_sheet_file, sheet_name="all", column_name="Query")
+    with pytest.raises(click.ClickException):
+        file_handler.get_sheet_terms()
+
+
 def test_get_file_path(file_handler: FileHandler) -> None:
     """It gets file path from class attribute."""
     result = file_handler.get_file_path()
@@ -130,3 +324,109 @@ def test_destination_path_includes_timestamp(
         output = file_handler_test_file.get_destination_path()
         expected = "input_for_tests/test_input_20201122010203_n-grams"
         assert output == expected
+
+
+@pytest.fixture
+def ngrams_df() -> pd.DataFrame:
+    """Fixture returns side-by-side output with NaN padding."""
+    return pd.concat(
+        [
+            pd.DataFrame({"1-gram": ["snacks", "low"], "1-gram frequency": [4, 2]}),
+            pd.DataFrame({"2-gram": ["snacks low"], "2-gram frequency": [2]}),
+        ],
+        axis=1,
+    )
+
+
+def test_to_long_format(ngrams_df: pd.DataFrame) -> None:
+    """It returns one row per ngram with integer counts and ranks."""
+    long_df = to_long_format(ngrams_df)
+    assert long_df.to_dict("list") == {
+        "n": [1, 1, 2],
+        "rank": [1, 2, 1],
+        "term": ["snacks", "low", "snacks low"],
+        "frequency": [4, 2, 2],
+    }
+    assert str(long_df["frequency"].dtype) == "int64"
+
+
+def test_to_long_format_keeps_error_bounds(ngrams_df: pd.DataFrame) -> None:
+    """It adds an error_bound column in approximate mode."""
+    ngrams_df["1-gram error bound"] = [0, 1]
+    ngrams_df["2-gram error bound"] = [1, None]
+    long_df = to_long_format(ngrams_df)
+    assert long_df["error_bound"].tolist() == [0, 1, 1]
+
+
+def test_to_long_format_keeps_weights(ngrams_df: pd.DataFrame) -> None:
+    """It adds a float weight column for weighted results."""
+    ngrams_df["1-gram weight"] = [30, 12.5]
+    ngrams_df["2-gram weight"] = [7, None]
+    assert to_long_format(ngrams_df)["weight"].tolist() == [30.0, 12.5, 7.0]
+
+
+def test_writes_compressed_csv(ngrams_df: pd.DataFrame, tmp_path: Path) -> None:
+    """It writes gzip compressed csv with the csv layout."""
+    file_handler = FileHandler(str(tmp_path / "terms.xlsx"))
+    path = file_handler.write(ngrams_df, output_format="csv.gz")
+    with gzip.open(f"{path}.csv.gz", "rt") as f:
+        header = f.readline().strip()
+    assert header == ",1-gram,1-gram frequency,2-gram,2-gram frequency"
+
+
+def test_writes_parquet_in_long_format(
+    ngrams_df: pd.DataFrame, tmp_path: Path
+) -> None:
+    """It writes the long layout to parquet."""
+    pytest.importorskip("pyarrow")
+    file_handler = FileHandler(str(tmp_path / "terms.xlsx"))
+    path = file_handler.write(ngrams_df, output_format="parquet")
+    assert pd.read_parquet(f"{path}.parquet").equals(to_long_format(ngrams_df))
+
+
+def test_columnar_output_needs_pyarrow(
+    ngrams_df: pd.DataFrame, tmp_path: Path
+) -> None:
+    """It explains how to install pyarrow when it is missing."""
+    file_handler = FileHandler(str(tmp_path / "terms.xlsx"))
+    with patch("importlib.util.find_spec", return_value=None):
+        with pytest.raises(click.ClickException, match="pyarrow"):
+            file_handler.write(ngrams_df, output_format="feather")
+
+
+def test_writes_xlsx_sheet_per_n(ngrams_df: pd.DataFrame, tmp_path: Path) -> None:
+    """It writes a sheet for each length without the NaN padding."""
+    file_handler = FileHandler(str(tmp_path / "terms.xlsx"))
+    path = file_handler.write(ngrams_df, output_format="xlsx")
+    sheets = pd.read_excel(f"{path}.xlsx", sheet_name=None)
+    assert list(sheets) == ["1-grams", "2-grams"]
+    assert sheets["1-grams"].to_dict("list") == {
+        "1-gram": ["snacks", "low"],
+        "1-gram frequency": [4, 2],
+    }
+    assert sheets["2-grams"].to_dict("list") == {
+        "2-gram": ["snacks low"],
+        "2-gram frequency": [2],
+    }
+
+
+def test_writes_xlsx_terms_as_text(tmp_path: Path) -> None:
+    """It writes terms that look like formulas or URLs as plain text."""
+    path = str(tmp_path / "ngrams.xlsx")
+    terms = ["= sum(a1", "https://example.com/x"]
+    write_xlsx(pd.DataFrame({"1-gram": terms, "1-gram frequency": [2, 1]}), path)
+    worksheet = openpyxl.load_workbook(path)["1-grams"]
+    cells = [worksheet.cell(row, 1) for row in (2, 3)]
+    assert [cell.value for cell in cells] == terms
+    assert [cell.data_type for cell in cells] == ["s", "s"]
+    assert all(cell.hyperlink is None for cell in cells)
+
+
+def test_writes_xlsx_side_by_side(ngrams_df: pd.DataFrame, tmp_path: Path) -> None:
+    """It writes the csv layout to one sheet, leaving padding empty."""
+    file_handler = FileHandler(str(tmp_path / "terms.xlsx"))
+    path = file_handler.write(
+        ngrams_df, output_format="xlsx", xlsx_layout="side-by-side"
+    )
+    sheet = pd.read_excel(f"{path}.xlsx", sheet_name=None)["n-grams"]
+    assert sheet.equals(ngrams_df)
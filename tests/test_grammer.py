@@ -1,11 +1,17 @@
 """Tests cases for the grammer module."""
+from collections import Counter
+from pathlib import Path
+import re
+from typing import Generator
 from unittest.mock import Mock, patch
 
 import pandas as pd
 import pytest
 from pytest_mock import MockFixture
 
-from excel_ngrams.grammer import Grammer
+from excel_ngrams.cache import TokenMemo
+from excel_ngrams.file_handler import FileHandler
+from excel_ngrams.grammer import Grammer, row_ngrams, shard
 
 TEST_DATA = [
     "diet snacks",
@@ -18,6 +24,14 @@ TEST_DATA = [
 # ------- Instance fixture -------
 
 
+@pytest.fixture(autouse=True)
+def token_memo() -> Generator[TokenMemo, None, None]:
+    """Fixture gives each test an empty token memo."""
+    memo = TokenMemo()
+    with patch("excel_ngrams.grammer.Grammer._token_memo", new=memo):
+        yield memo
+
+
 @pytest.fixture
 def grammer_instance() -> Grammer:
     """Fixture returns Grammer instance."""
@@ -71,12 +85,6 @@ def mock_nltk_download(mocker: MockFixture) -> Mock:
     return mocker.patch("nltk.download")
 
 
-@pytest.fixture
-def mock_nltk_stopwords(mocker: MockFixture) -> Mock:
-    """Fixture to patch nltk.stopwords.words."""
-    return mocker.patch("nltk.corpus.stopwords.words")
-
-
 # ------- Grammer tests -------
 
 
@@ -103,28 +111,58 @@ def test_downloads_spacy_model_if_not_present(
         assert grammer._nlp is not None
 
 
-def test_downloads_nltk_stopwords_if_not_present(
-    mock_nltk_download: Mock, mock_nltk_stopwords: Mock
+def test_loads_spacy_tokenizer_only(
+    mock_spacy_load: Mock, mock_spacy_download: Mock
 ) -> None:
-    """It calls os.system with correct command."""
-    with patch("excel_ngrams.grammer.Grammer._stopwords", new=None):
-        mock_nltk_stopwords.return_value = "fake_stopwords"
-        grammer = Grammer(TEST_DATA)
-        mock_nltk_stopwords.assert_called_with("english")
-        assert grammer._stopwords is not None
+    """It loads Spacy without tagger, parser and NER for spacy-tokenizer."""
+    with patch("excel_ngrams.grammer.Grammer._nlp", new=None), patch(
+        "excel_ngrams.grammer.Grammer._tokenizer_nlp", new=None
+    ):
+        mock_spacy_load.side_effect = Mock()
+        grammer = Grammer(TEST_DATA, tokenizer="spacy-tokenizer")
+        mock_spacy_load.assert_called_once_with(
+            "en", disable=["tagger", "parser", "ner"]
+        )
+        assert grammer._tokenizer_nlp is not None
 
 
-def test_displays_exception_if_nltk_stopwords_fails(
-    capsys: MockFixture,
-    mock_nltk_download: Mock,
-) -> None:
-    """It raises exception with message if nltk download fails."""
+def test_regex_tokenizer_needs_no_spacy_model(mock_spacy_load: Mock) -> None:
+    """It doesn't load a Spacy model for the regex tokenizer."""
+    with patch("excel_ngrams.grammer.Grammer._nlp", new=None):
+        Grammer(TEST_DATA, tokenizer="regex")
+        mock_spacy_load.assert_not_called()
+
+
+def test_rejects_unknown_tokenizer() -> None:
+    """It raises ValueError for an unknown tokenizer engine."""
+    with pytest.raises(ValueError):
+        Grammer(TEST_DATA, tokenizer="whitespace")
+
+
+def test_loads_bundled_stopwords_without_download(mock_nltk_download: Mock) -> None:
+    """It loads the bundled stopwords without calling nltk.download."""
     with patch("excel_ngrams.grammer.Grammer._stopwords", new=None):
-        mock_nltk_download.side_effect = Exception
         grammer = Grammer(TEST_DATA)
-        captured = capsys.readouterr()
-        assert "Error" in captured.out
-        assert grammer._stopwords is None
+        mock_nltk_download.assert_not_called()
+        assert "the" in grammer._stopwords
+        assert grammer.stopword_set is grammer._stopwords
+
+
+def test_loads_custom_stopwords_file(tmp_path: Path) -> None:
+    """It removes stopwords listed in a custom file instead."""
+    stopwords_file = tmp_path / "stopwords.txt"
+    stopwords_file.write_text("# diet words\nKeto\n\nlow\n")
+    grammer = Grammer(TEST_DATA, stopwords_file=str(stopwords_file))
+    assert grammer.stopword_set == {"keto", "low"}
+    assert grammer.in_stop_words("keto")
+    assert not grammer.in_stop_words("the")
+    assert Grammer(TEST_DATA).in_stop_words("the")
+
+
+def test_custom_stopwords_file_not_found() -> None:
+    """It raises an error if the stopwords file doesn't exist."""
+    with pytest.raises(OSError):
+        Grammer(TEST_DATA, stopwords_file="doesnt_exist.txt")
 
 
 @pytest.mark.parametrize(
@@ -194,6 +232,26 @@ def test_remove_escaped_chars(grammer_instance: Grammer) -> None:
     ]
 
 
+@pytest.mark.parametrize(
+    "text",
+    [
+        " \n\t lead and trail \t\n ",
+        "mid\n\n\tdle\t\nrow",
+        "it’s curly’",
+        "\u00a0\n\u00a0",
+        "\r\n kept \r",
+        "",
+    ],
+)
+def test_remove_escaped_chars_matches_regex(
+    grammer_instance: Grammer, text: str
+) -> None:
+    """It cleans terms exactly as the previous per-row regex version."""
+    expected = re.sub("’", "'", re.sub(r"(\n*\t*)", "", text.strip()))
+    expected_list = [expected] if expected != "" else []
+    assert grammer_instance.remove_escaped_chars([text]) == expected_list
+
+
 def test_top_results_exceeds_results_available(grammer_instance: Grammer) -> None:
     """It returns all results when top_n_results exceeds results available."""
     grammer_instance.term_list = [
@@ -230,6 +288,339 @@ def test_get_tri_grams(grammer_instance: Grammer) -> None:
     assert result == [(("best", "thing", "ever"), 3)]
 
 
+@pytest.mark.parametrize("tokenizer", ["spacy-tokenizer", "regex"])
+@pytest.mark.parametrize("stopwords", [True, False])
+def test_fast_tokenizers_match_spacy_full(tokenizer: str, stopwords: bool) -> None:
+    """It returns the same ngrams as the full Spacy pipeline."""
+    terms = TEST_DATA + [
+        "it's 'the' best, thing, ever",
+        "best ! day ! ever!",
+        "not, the? best thing ever",
+        "don't buy $10 snacks - they're (not) great...",
+        "3.5mm jack",
+        "u.s. snacks",
+        "1,000 calorie snacks",
+    ]
+    expected = Grammer(terms).ngram_range(3, top_n_results=100, stopwords=stopwords)
+    actual = Grammer(terms, tokenizer=tokenizer).ngram_range(
+        3, top_n_results=100, stopwords=stopwords
+    )
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_shard_splits_in_order() -> None:
+    """It splits a sequence into ordered, contiguous shards."""
+    assert shard([1, 2, 3, 4, 5], 2) == [[1, 2, 3], [4, 5]]
+    assert shard([], 4) == []
+
+
+@pytest.mark.parametrize("stopwords", [True, False])
+@pytest.mark.parametrize("boundary", ["row", "none"])
+def test_numpy_counter_matches_python(stopwords: bool, boundary: str) -> None:
+    """It returns the same frequencies and ordering with the NumPy engine."""
+    terms = TEST_DATA * 2 + ["it's the best keto snacks ever", "the", "keto diet"]
+    expected = Grammer(terms, boundary=boundary).ngram_range(
+        4, top_n_results=100, stopwords=stopwords
+    )
+    actual = Grammer(terms, counter="numpy", boundary=boundary).ngram_range(
+        4, top_n_results=100, stopwords=stopwords
+    )
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_memory_budget_adds_error_bounds() -> None:
+    """It counts approximately and adds an error bound column per length."""
+    grammer = Grammer(TEST_DATA, memory_budget=3)
+    df = grammer.ngram_range(2, top_n_results=2)
+    assert list(df.columns) == [
+        "1-gram",
+        "1-gram frequency",
+        "1-gram error bound",
+        "2-gram",
+        "2-gram frequency",
+        "2-gram error bound",
+    ]
+    assert df["1-gram"][0] == "snacks"
+    assert len(grammer.error_bounds[2]) == 2
+
+
+@pytest.mark.parametrize("boundary", ["row", "none"])
+def test_large_memory_budget_matches_exact(boundary: str) -> None:
+    """It returns exact counts when the budget covers every ngram."""
+    expected = Grammer(TEST_DATA, boundary=boundary).get_ngrams(n=2, top_n_results=3)
+    grammer = Grammer(TEST_DATA, memory_budget=1000, boundary=boundary)
+    assert grammer.get_ngrams(n=2, top_n_results=3) == expected
+    assert grammer.error_bounds[2] == [0, 0, 0]
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+@pytest.mark.parametrize("boundary", ["row", "none"])
+def test_workers_match_serial_results(workers: int, boundary: str) -> None:
+    """It returns the serial results when tokenising across processes."""
+    terms = TEST_DATA * 3 + ["low carb keto diet snacks", "keto diet"]
+    expected = Grammer(terms, boundary=boundary).ngram_range(4, top_n_results=100)
+    actual = Grammer(terms, workers=workers, boundary=boundary).ngram_range(
+        4, top_n_results=100
+    )
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_row_boundary_skips_ngrams_across_rows() -> None:
+    """It counts only ngrams within a row by default."""
+    grammer = Grammer(TEST_DATA, tokenizer="regex")
+    assert ("snacks", "keto") not in grammer.count_ngrams(2)
+    assert grammer.count_ngrams(3) == {
+        ("low", "carb", "snacks"): 1,
+        ("low", "calorie", "snacks"): 1,
+    }
+    assert grammer.count_ngrams(2, prefix=["keto"]) == grammer.count_ngrams(2)
+
+
+def test_sentence_boundary_skips_ngrams_across_sentences() -> None:
+    """It splits rows into sentences before counting."""
+    terms = ["Keto snacks. Low carb! Diet bars 3.5 stars", "keto bars"]
+    grammer = Grammer(terms, tokenizer="regex", boundary="sentence")
+    assert grammer.tokenize() == [
+        ["keto", "snacks"],
+        ["low", "carb"],
+        ["diet", "bars", "3.5", "stars"],
+        ["keto", "bars"],
+    ]
+    assert ("snacks", "low") not in grammer.count_ngrams(2)
+
+
+@pytest.mark.parametrize("rank_by", ["frequency", "weight"])
+@pytest.mark.parametrize("boundary", ["row", "sentence"])
+def test_numpy_weighted_counts_match_python(rank_by: str, boundary: str) -> None:
+    """It sums and ranks by weight the same way with both engines."""
+    terms = [*TEST_DATA, "", "keto diet. low carb snacks", "keto bars"]
+    weights = [10, 5, 20, 1, 99, 3, 40]
+    dfs = [
+        Grammer(
+            terms,
+            tokenizer="regex",
+            counter=counter,
+            boundary=boundary,
+            weights=weights,
+            rank_by=rank_by,
+        ).ngram_range(3, top_n_results=100)
+        for counter in ("python", "numpy")
+    ]
+    pd.testing.assert_frame_equal(dfs[1], dfs[0])
+    assert "3-gram weight" in dfs[0].columns
+
+
+def test_weights_sum_per_row() -> None:
+    """It adds each row's weight to its ngrams, ranking by total if asked."""
+    weights = [10, 5, 20, 1]
+    grammer = Grammer(TEST_DATA, tokenizer="regex", weights=weights)
+    assert grammer.get_ngrams(1, 2) == [(("snacks",), 4), (("low",), 2)]
+    assert grammer.weight_totals[1] == [36.0, 21.0]
+    grammer = Grammer(TEST_DATA, tokenizer="regex", weights=weights, rank_by="weight")
+    assert grammer.get_ngrams(2, 2) == [(("low", "carb"), 1), (("carb", "snacks"), 1)]
+    assert grammer.weight_totals[2] == [20.0, 20.0]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"rank_by": "weight"},
+        {"rank_by": "volume", "weights": [1, 2, 3, 4]},
+        {"weights": [1, 2, 3, 4], "boundary": "none"},
+        {"weights": [1, 2, 3, 4], "memory_budget": 10},
+    ],
+)
+def test_rejects_unusable_weights(kwargs: dict) -> None:
+    """It raises ValueError when weights can't be used as asked."""
+    with pytest.raises(ValueError):
+        Grammer(TEST_DATA, tokenizer="regex", **kwargs)
+
+
+def test_rejects_weights_of_other_length() -> None:
+    """It raises ValueError unless there is one weight per term."""
+    with pytest.raises(ValueError):
+        Grammer(TEST_DATA, tokenizer="regex", weights=[1, 2]).tokenize()
+
+
+def test_rejects_unknown_boundary() -> None:
+    """It raises ValueError for an unknown boundary."""
+    with pytest.raises(ValueError):
+        Grammer(TEST_DATA, boundary="paragraph")
+
+
+def test_ngram_range_without_long_enough_rows() -> None:
+    """It gives an empty column pair for lengths no row reaches."""
+    df = Grammer(TEST_DATA, tokenizer="regex").ngram_range(4, top_n_results=5)
+    assert df["4-gram"].isna().all()
+    assert list(df.columns)[-2:] == ["4-gram", "4-gram frequency"]
+
+
+def test_rejects_fewer_than_one_worker() -> None:
+    """It raises ValueError when workers is less than one."""
+    with pytest.raises(ValueError):
+        Grammer(TEST_DATA, workers=0)
+
+
+def test_tokenizes_once_for_ngram_range(
+    grammer_instance: Grammer, mocker: MockFixture
+) -> None:
+    """It tokenises the corpus once and reuses it for every n."""
+    grammer_instance.term_list = TEST_DATA
+    spy = mocker.spy(grammer_instance, "tokenize_texts")
+    grammer_instance.ngram_range(3, top_n_results=5)
+    grammer_instance.get_ngrams(n=2, stopwords=False)
+    assert spy.call_count == 1
+
+
+def test_tokenizes_each_distinct_row_once(mocker: MockFixture) -> None:
+    """It collapses identical cleaned rows before tokenising them."""
+    grammer = Grammer([*TEST_DATA * 3, " diet snacks\t"], tokenizer="regex")
+    spy = mocker.spy(grammer, "tokenize_texts")
+    assert len(grammer.tokenize()) == 13
+    assert list(spy.call_args[0][0]) == TEST_DATA
+    assert grammer.get_row_counts().tolist() == [4, 3, 3, 3]
+    assert grammer.metrics.stages[0]["unique_rows"] == 4
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("counter", ["python", "numpy"])
+def test_counts_repeated_rows_with_multiplicity(counter: str, workers: int) -> None:
+    """It counts distinct rows by multiplicity as if every row were counted."""
+    terms = ["keto snacks", "the keto diet", *TEST_DATA * 3, "keto snacks"]
+    grammer = Grammer(terms, tokenizer="regex", counter=counter, workers=workers)
+    for n in (1, 2):
+        expected = Counter(row_ngrams(grammer.get_rows(), n)).most_common(5)
+        assert grammer.get_ngrams(n, top_n_results=5) == expected
+
+
+def test_reuses_tokens_across_instances(token_memo: TokenMemo) -> None:
+    """It tokenises texts seen by another instance from the shared memo."""
+    first = Grammer(TEST_DATA, tokenizer="regex")
+    first.tokenize()
+    second = Grammer([*TEST_DATA[:2], "keto bars"], tokenizer="regex")
+    spy = Mock(wraps=second.tokenize_texts)
+    with patch.object(second, "tokenize_texts", spy):
+        assert second.tokenize()[2] == ["keto", "bars"]
+    assert list(spy.call_args[0][0]) == ["keto bars"]
+    assert (token_memo.hits, token_memo.misses) == (2, 5)
+    assert second.metrics.stages[0]["memo_hits"] == 2
+    spacy_rows = Grammer(TEST_DATA, tokenizer="spacy-tokenizer").tokenize()
+    assert spacy_rows == first.tokenize()
+    assert token_memo.misses == 9
+
+
+def test_passes_batch_size_to_spacy(mocker: MockFixture) -> None:
+    """It streams texts through spaCy's pipe in batches of batch_size."""
+    nlp = mocker.patch("excel_ngrams.grammer.Grammer._nlp")
+    nlp.pipe.return_value = iter([])
+    grammer = Grammer(TEST_DATA, batch_size=2)
+    assert list(grammer.tokenize_texts(TEST_DATA)) == []
+    nlp.pipe.assert_called_once_with(TEST_DATA, batch_size=2)
+
+
+def test_tunes_batch_size(mocker: MockFixture) -> None:
+    """It times each batch size on the first texts, keeping their words."""
+    mocker.patch("excel_ngrams.grammer.TUNE_SAMPLE", 2)
+    terms = [f"keto snacks {i}" for i in range(7)]
+    expected = list(Grammer([], tokenizer="spacy-tokenizer").tokenize_texts(terms))
+    grammer = Grammer(terms, tokenizer="spacy-tokenizer", batch_size=None)
+    spy = mocker.spy(grammer, "tokenize_texts")
+    assert grammer.tokenize() == expected
+    assert grammer.batch_size in (64, 256, 1000)
+    assert [len(call[0][0]) for call in spy.call_args_list] == [2, 2, 2, 1, 0]
+    assert grammer.metrics.stages[0]["batch_size"] == grammer.batch_size
+
+
+def test_spacy_full_workers_use_spacy_processes(mocker: MockFixture) -> None:
+    """It runs spaCy's multiprocess pipe instead of sharding spacy-full."""
+    mocker.patch("excel_ngrams.grammer.PIPE_N_PROCESS", True)
+    executor = mocker.patch("excel_ngrams.grammer.ProcessPoolExecutor")
+    grammer = Grammer(TEST_DATA, workers=2)
+    rows = [["word"]] * len(TEST_DATA)
+    spy = mocker.patch.object(grammer, "tokenize_texts", return_value=rows)
+    assert grammer.tokenize_distinct(TEST_DATA) == rows
+    spy.assert_called_once_with(TEST_DATA, processes=2)
+    executor.assert_not_called()
+
+
+def test_rejects_batch_size_below_one() -> None:
+    """It raises ValueError when batch_size is less than one."""
+    with pytest.raises(ValueError):
+        Grammer(TEST_DATA, batch_size=0)
+
+
+def test_accepts_lazy_term_iterator() -> None:
+    """It consumes a generator of terms once and reuses the tokens."""
+    grammer = Grammer(term for term in TEST_DATA)
+    assert grammer.get_ngrams(n=1, top_n_results=1) == [(("snacks",), 4)]
+    assert grammer.get_ngrams(n=2, top_n_results=1) == [(("diet", "snacks"), 1)]
+
+
+def test_skips_blank_cells_from_file(tmp_path: Path) -> None:
+    """It skips empty cells read by get_terms and counts numbers as text."""
+    path = tmp_path / "terms.csv"
+    path.write_text("Keyword\ndiet snacks\n\n2024\n,\nketo snacks\n")
+    terms = FileHandler(str(path)).get_terms()
+    grammer = Grammer(terms, tokenizer="regex")
+    assert grammer.tokenize() == [["diet", "snacks"], ["2024"], ["keto", "snacks"]]
+
+
+def test_skips_blank_terms_with_their_weight(tmp_path: Path) -> None:
+    """It drops the weight of a blank keyword cell along with the cell."""
+    path = tmp_path / "terms.csv"
+    path.write_text("Volume,Keyword\n10,diet snacks\n,\nn/a,keto snacks\n2.5,nuts\n")
+    file_handler = FileHandler(str(path), weight_column="Volume")
+    grammer = Grammer(
+        file_handler.get_terms(),
+        tokenizer="regex",
+        weights=file_handler.get_weights(),
+    )
+    assert grammer.get_ngrams(n=1, top_n_results=1) == [(("snacks",), 2)]
+    assert grammer.get_row_weights().tolist() == [10.0, 0.0, 2.5]
+    assert grammer.weight_totals[1] == [10.0]
+
+
+def test_records_stage_metrics() -> None:
+    """It records tokenize and count stages with volumes."""
+    grammer = Grammer(TEST_DATA)
+    grammer.ngram_range(2, top_n_results=5)
+    stages = {stage["stage"]: stage for stage in grammer.metrics.stages}
+    assert list(stages) == ["tokenize", "count_1", "count_2"]
+    assert stages["tokenize"]["rows"] == 4
+    assert stages["tokenize"]["tokens"] == 10
+    assert stages["count_2"]["tokens"] == 10
+
+
+@pytest.mark.parametrize("counter", ["python", "numpy"])
+def test_counts_rows_without_flat_word_list(
+    counter: str, mocker: MockFixture
+) -> None:
+    """It counts within distinct rows without building every row's words."""
+    grammer = Grammer(TEST_DATA * 2, tokenizer="regex", counter=counter)
+    get_words = mocker.spy(grammer, "get_words")
+    get_rows = mocker.spy(grammer, "get_rows")
+    grammer.ngram_range(2, top_n_results=5)
+    assert [stage["tokens"] for stage in grammer.metrics.stages[1:]] == [20, 20]
+    get_words.assert_not_called()
+    get_rows.assert_not_called()
+
+
+def test_uses_given_tokens_without_spacy(mock_spacy_load: Mock) -> None:
+    """It counts ngrams from given tokens without loading Spacy."""
+    with patch("excel_ngrams.grammer.Grammer._nlp", new=None):
+        grammer = Grammer([], tokens=[["keto", "snacks"], ["diet", "snacks"]])
+        assert grammer.get_ngrams(n=1, top_n_results=1) == [(("snacks",), 2)]
+        mock_spacy_load.assert_not_called()
+
+
+def test_resets_tokens_when_term_list_changes(grammer_instance: Grammer) -> None:
+    """It tokenises again when a new term list is assigned."""
+    grammer_instance.term_list = ["keto snacks"]
+    assert grammer_instance.tokenize() == [["keto", "snacks"]]
+    grammer_instance.term_list = ["diet snacks"]
+    assert grammer_instance.tokenize() == [["diet", "snacks"]]
+
+
 @pytest.mark.e2e
 def test_get_bi_grams_from_file() -> None:
     """It returns most frequent bigram and value from test file in directory."""
@@ -241,6 +632,9 @@ def test_get_bi_grams_from_file() -> None:
     ]
     grammer = Grammer(test_terms)
     result = grammer.get_ngrams(n=2, top_n_results=1)
+    assert result == [(("diet", "snacks"), 1)]
+    grammer = Grammer(test_terms, boundary="none")
+    result = grammer.get_ngrams(n=2, top_n_results=1)
     assert result == [(("snacks", "low"), 2)]
 
 
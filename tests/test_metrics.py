@@ -0,0 +1,72 @@
+"""Tests cases for the metrics module."""
+import json
+from pathlib import Path
+
+import pytest
+
+from excel_ngrams.metrics import format_table, Metrics, reset_peak_rss, write_json
+
+
+@pytest.fixture
+def metrics() -> Metrics:
+    """Fixture returns Metrics with two recorded stages."""
+    metrics = Metrics()
+    with metrics.stage("read") as record:
+        record["rows"] = 1200
+    with metrics.stage("count_1") as record:
+        record["tokens"] = 4800
+    return metrics
+
+
+def test_records_stage(metrics: Metrics) -> None:
+    """It records name, volumes and times for each stage."""
+    read, count = metrics.stages
+    assert read["stage"] == "read"
+    assert read["rows"] == 1200
+    assert read["tokens"] is None
+    assert count["tokens"] == 4800
+    assert read["wall_s"] >= 0
+    assert read["cpu_s"] >= 0
+
+
+@pytest.mark.skipif(not reset_peak_rss(), reason="peak RSS can't be reset")
+def test_records_peak_memory_of_each_stage() -> None:
+    """It records each stage's own peak, also for stages around others."""
+    metrics = Metrics()
+    with metrics.stage("outer"):
+        with metrics.stage("allocate"):
+            buffer = b"x" * (64 * 1024 * 1024)
+            del buffer
+        with metrics.stage("idle"):
+            pass
+    allocate, idle, outer = metrics.stages
+    assert allocate["peak_delta_mb"] >= 60
+    assert allocate["rss_delta_mb"] < 60
+    assert idle["peak_delta_mb"] < 60
+    assert outer["peak_delta_mb"] >= 60
+
+
+def test_records_stage_that_raises() -> None:
+    """It still records a stage when its block raises."""
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.stage("write"):
+            raise ValueError
+    assert metrics.stages[0]["stage"] == "write"
+
+
+def test_format_table_orders_by_start(metrics: Metrics) -> None:
+    """It formats one line per stage in order of start time."""
+    table = format_table(list(reversed(metrics.stages))).splitlines()
+    assert table[0].startswith("stage")
+    assert table[1].split()[0] == "read"
+    assert "1,200" in table[1]
+    assert table[2].split()[0] == "count_1"
+
+
+def test_write_json(metrics: Metrics, tmp_path: Path) -> None:
+    """It writes stage records to a JSON file."""
+    path = tmp_path / "metrics.json"
+    write_json(metrics.stages, str(path))
+    stages = json.loads(path.read_text())
+    assert [stage["stage"] for stage in stages] == ["read", "count_1"]
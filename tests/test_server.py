@@ -0,0 +1,205 @@
+"""Tests cases for the server module."""
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any, Dict, Generator, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+import xlsxwriter
+
+from excel_ngrams.grammer import Grammer
+from excel_ngrams.server import df_to_records, NgramServer, parse_params
+from excel_ngrams.server import ServiceStats
+
+TERMS = ["diet snacks", "keto snacks", "low carb snacks", "low calorie snacks"]
+
+
+@pytest.fixture(scope="module")
+def server() -> Generator[NgramServer, None, None]:
+    """Fixture runs a server with one regex worker on a free port."""
+    server = NgramServer(("127.0.0.1", 0), workers=1, max_queue=1, tokenizer="regex")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(
+    server: NgramServer,
+    path: str,
+    body: Optional[bytes] = None,
+    content_type: str = "application/json",
+) -> Tuple[int, bytes]:
+    """Sends a request to server, returning status and body."""
+    port = server.server_address[1]
+    headers = {"Content-Type": content_type} if body is not None else {}
+    req = Request(f"http://127.0.0.1:{port}{path}", data=body, headers=headers)
+    try:
+        with urlopen(req) as response:  # noqa: S310
+            return response.status, response.read()
+    except HTTPError as error:
+        return error.code, error.read()
+
+
+def post_json(server: NgramServer, data: Dict[str, Any]) -> Tuple[int, Any]:
+    """Posts data as JSON to /ngrams, returning status and decoded body."""
+    status, body = request(server, "/ngrams", json.dumps(data).encode())
+    return status, json.loads(body)
+
+
+def test_parse_params_fills_defaults_and_converts_text() -> None:
+    """It converts query string values and keeps defaults."""
+    params = parse_params({"max_n": "2", "stopwords": "false", "sheet_name": "1"})
+    assert params["max_n"] == 2
+    assert params["stopwords"] is False
+    assert params["sheet_name"] == 1
+    assert params["top_results"] == 250
+    assert params["memory_budget"] is None
+
+
+@pytest.mark.parametrize(
+    "values",
+    [{"max_n": "two"}, {"top_results": 0}, {"counter": "abacus"}, {"colour": "red"}],
+)
+def test_parse_params_rejects_invalid_values(values: Dict[str, Any]) -> None:
+    """It raises ValueError for bad or unknown parameters."""
+    with pytest.raises(ValueError):
+        parse_params(values)
+
+
+def test_service_stats_percentiles() -> None:
+    """It reports counts and latency percentiles in milliseconds."""
+    stats = ServiceStats()
+    for latency in (0.1, 0.2, 0.3):
+        stats.begin()
+        stats.end(latency, ok=latency < 0.3)
+    stats.reject()
+    snapshot = stats.snapshot()
+    assert (snapshot["completed"], snapshot["failed"]) == (2, 1)
+    assert (snapshot["rejected"], snapshot["in_flight"]) == (1, 0)
+    assert snapshot["latency_ms"] == {
+        "mean": 200.0,
+        "p50": 200.0,
+        "p95": 200.0,
+        "max": 300.0,
+    }
+
+
+def test_health(server: NgramServer) -> None:
+    """It reports that it is up."""
+    status, body = request(server, "/health")
+    assert status == 200
+    assert json.loads(body) == {"status": "ok"}
+
+
+def test_ngrams_from_terms(server: NgramServer) -> None:
+    """It returns records for each phrase length."""
+    status, body = post_json(server, {"terms": TERMS, "max_n": 2})
+    assert status == 200
+    assert body["results"]["1"][0] == {"term": "snacks", "frequency": 4}
+    assert body["results"]["2"][0] == {"term": "diet snacks", "frequency": 1}
+
+
+def test_ngrams_skip_null_terms(server: NgramServer) -> None:
+    """It skips null terms rather than counting them as a word."""
+    status, body = post_json(server, {"terms": [None, "keto", None], "max_n": 1})
+    assert status == 200
+    assert body["results"]["1"] == [{"term": "keto", "frequency": 1}]
+
+
+def test_ngrams_as_csv(server: NgramServer) -> None:
+    """It returns the combined dataframe as csv."""
+    data = {"terms": TERMS, "max_n": 1, "format": "csv"}
+    status, body = request(server, "/ngrams", json.dumps(data).encode())
+    assert status == 200
+    assert body.decode().splitlines()[:2] == [",1-gram,1-gram frequency", "0,snacks,4"]
+
+
+def test_ngrams_from_upload(server: NgramServer, tmp_path: Path) -> None:
+    """It analyses a workbook sent as the request body."""
+    path = tmp_path / "terms.xlsx"
+    workbook = xlsxwriter.Workbook(str(path))
+    workbook.add_worksheet().write_column(0, 0, ["Query", *TERMS])
+    workbook.close()
+    status, body = request(
+        server,
+        "/ngrams?column_name=Query&max_n=1",
+        path.read_bytes(),
+        content_type="application/octet-stream",
+    )
+    assert status == 200
+    assert json.loads(body)["results"]["1"][0] == {"term": "snacks", "frequency": 4}
+
+
+def test_bad_request(server: NgramServer) -> None:
+    """It replies 400 to invalid parameters and missing files."""
+    assert post_json(server, {"terms": TERMS, "max_n": 0})[0] == 400
+    assert post_json(server, {"file_path": "doesnt_exist.xlsx"})[0] == 400
+    assert post_json(server, {})[0] == 400
+
+
+def test_rejects_when_queue_is_full(server: NgramServer) -> None:
+    """It replies 503 when every worker and queue slot is taken."""
+    server.slots.acquire()
+    server.slots.acquire()
+    try:
+        status, body = post_json(server, {"terms": TERMS})
+    finally:
+        server.slots.release()
+        server.slots.release()
+    assert status == 503
+    assert body == {"error": "Server busy"}
+
+
+def test_timeout_holds_slot_until_analysis_ends() -> None:
+    """It cancels a queued analysis on timeout, or holds its slot if running."""
+    server = NgramServer(
+        ("127.0.0.1", 0), workers=1, max_queue=1, tokenizer="regex", timeout=0.1
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # Besides the running call, the pool queues up to two more for its
+        # processes, which can no longer be cancelled, so the request waits
+        # behind three.
+        busy = [server.executor.submit(time.sleep, 0.2) for _ in range(3)]
+        assert post_json(server, {"terms": TERMS})[0] == 504
+        assert server.slots.acquire(blocking=False)
+        assert server.slots.acquire(blocking=False)
+        server.slots.release()
+        server.slots.release()
+        busy[-1].result()
+
+        assert post_json(server, {"terms": TERMS * 50000})[0] == 504
+        assert server.slots.acquire(blocking=False)
+        assert not server.slots.acquire(blocking=False)
+        server.slots.release()
+        server.executor.submit(time.sleep, 0).result()
+        assert server.slots.acquire(blocking=False)
+        assert server.slots.acquire(blocking=False)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_metrics(server: NgramServer) -> None:
+    """It reports request counts and latencies."""
+    post_json(server, {"terms": TERMS, "max_n": 1})
+    status, body = request(server, "/metrics")
+    metrics = json.loads(body)
+    assert status == 200
+    assert metrics["completed"] >= 1
+    assert metrics["latency_ms"]["max"] > 0
+
+
+def test_df_to_records_drops_padding() -> None:
+    """It drops the NaN padding of shorter phrase lengths."""
+    df = Grammer(TERMS, tokenizer="regex").ngram_range(2, top_n_results=10)
+    records = df_to_records(df)
+    assert len(records["1"]) == 6
+    assert len(records["2"]) == 6
+    assert records["1"][-1] == {"term": "calorie", "frequency": 1}
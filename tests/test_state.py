@@ -0,0 +1,168 @@
+"""Tests cases for the state module."""
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from excel_ngrams.grammer import Grammer
+from excel_ngrams.state import (
+    CountState,
+    make_settings,
+    merge_errors,
+    merge_states,
+    open_state,
+    StateMismatchError,
+)
+
+TERMS = [
+    "diet snacks",
+    "keto snacks",
+    "",
+    "low carb snacks",
+    "low calorie snacks",
+    "healthy low carb snacks",
+    "the best keto snacks",
+]
+
+SETTINGS = make_settings("regex", True)
+
+
+def count_shard(terms: List[str], max_n: int, boundary: str = "row") -> CountState:
+    """Counts terms into a new state."""
+    state = CountState(make_settings("regex", True, boundary=boundary), max_n)
+    rows = state.new_rows(terms)
+    state.update(Grammer(rows, tokenizer="regex", boundary=boundary))
+    return state
+
+
+def count_in_runs(
+    runs: List[List[str]], max_n: int, path: Path, boundary: str = "row"
+) -> CountState:
+    """Counts the concatenated runs, saving and reloading state between them."""
+    settings = make_settings("regex", True, boundary=boundary)
+    terms: List[str] = []
+    state = None
+    for run in runs:
+        terms = terms + run
+        state, rows = open_state(str(path), settings, max_n, terms.copy)
+        state.update(Grammer(rows, tokenizer="regex", boundary=boundary))
+        state.save(str(path))
+    return state
+
+
+@pytest.mark.parametrize("boundary", ["row", "none"])
+def test_incremental_counts_match_full_run(tmp_path: Path, boundary: str) -> None:
+    """It gives the same counts, in the same order, as one full run."""
+    full = Grammer(TERMS, tokenizer="regex", boundary=boundary)
+    runs = [TERMS[:2], TERMS[2:5], [], TERMS[5:]]
+    state = count_in_runs(runs, 3, tmp_path / "s", boundary)
+    assert state.rows == len(TERMS)
+    for n in range(1, 4):
+        assert list(state.counts[n].items()) == list(full.count_ngrams(n).items())
+        assert state.counts[n].most_common(3) == full.get_ngrams(n, 3)
+
+
+def test_only_new_rows_are_read(tmp_path: Path) -> None:
+    """It skips the rows counted by the saved state."""
+    path = str(tmp_path / "state")
+    count_in_runs([TERMS[:3]], 2, tmp_path / "state")
+    state, rows = open_state(path, SETTINGS, 2, lambda: TERMS)
+    assert state.rows == 3
+    assert list(rows) == TERMS[3:]
+    assert state.rows == len(TERMS)
+
+
+def test_changed_rows_are_recounted(tmp_path: Path) -> None:
+    """It starts again when rows counted earlier have changed."""
+    path = str(tmp_path / "state")
+    count_in_runs([TERMS[:3]], 2, tmp_path / "state")
+    changed = ["vegan snacks", *TERMS[1:]]
+    state, rows = open_state(path, SETTINGS, 2, lambda: changed)
+    assert list(rows) == changed
+
+
+@pytest.mark.parametrize(
+    "settings, max_n",
+    [(make_settings("regex", False), 2), (SETTINGS, 3)],
+)
+def test_other_settings_are_recounted(
+    tmp_path: Path, settings: dict, max_n: int
+) -> None:
+    """It starts again when the state was made with other settings."""
+    path = str(tmp_path / "state")
+    count_in_runs([TERMS[:3]], 2, tmp_path / "state")
+    state, rows = open_state(path, settings, max_n, lambda: TERMS)
+    assert list(rows) == TERMS
+    assert state.counts[1] == {}
+
+
+def test_new_rows_fails_on_shorter_input() -> None:
+    """It raises StateMismatchError when the input lost rows."""
+    state = CountState(SETTINGS, 2)
+    list(state.new_rows(TERMS))
+    with pytest.raises(StateMismatchError):
+        state.new_rows(TERMS[:2])
+
+
+def test_save_and_load_round_trip(tmp_path: Path) -> None:
+    """It loads the counts, offset, digest and tail it saved."""
+    state = count_in_runs([TERMS], 3, tmp_path / "state")
+    loaded = CountState.load(str(tmp_path / "state"))
+    assert loaded is not None
+    assert loaded.counts == state.counts
+    assert [list(c) for c in loaded.counts.values()] == [
+        list(c) for c in state.counts.values()
+    ]
+    assert (loaded.rows, loaded.digest, loaded.tail) == (
+        state.rows,
+        state.digest,
+        ["keto", "snacks"],
+    )
+
+
+def test_load_missing_state(tmp_path: Path) -> None:
+    """It returns None when there is no state file."""
+    assert CountState.load(str(tmp_path / "missing")) is None
+
+
+@pytest.mark.parametrize(
+    "splits",
+    [[2, 5], [1, 2, 3, 4, 5, 6], [0, 3, 3, 7], [7]],
+)
+@pytest.mark.parametrize("boundary", ["row", "none"])
+def test_merged_shards_match_full_run(splits: List[int], boundary: str) -> None:
+    """It merges shards, even ones shorter than an ngram, exactly."""
+    bounds = [0, *splits, len(TERMS)]
+    shards = [
+        count_shard(TERMS[a:b], 4, boundary) for a, b in zip(bounds, bounds[1:])
+    ]
+    merged = merge_states(shards)
+    full = count_shard(TERMS, 4, boundary)
+    for n in range(1, 5):
+        assert list(merged.counts[n].items()) == list(full.counts[n].items())
+    assert (merged.rows, merged.words) == (full.rows, full.words)
+    assert (merged.head, merged.tail) == (full.head, full.tail)
+
+
+def test_merge_rejects_other_settings() -> None:
+    """It raises ValueError when states were counted differently."""
+    with pytest.raises(ValueError):
+        merge_states([count_shard(TERMS, 2), count_shard(TERMS, 3)])
+
+
+def test_prune_keeps_top_and_records_bound() -> None:
+    """It keeps the most frequent ngrams and bounds those dropped."""
+    state = count_shard(TERMS, 2)
+    state.prune(2)
+    assert list(state.counts[1].items()) == [(("snacks",), 6), (("low",), 3)]
+    assert state.bounds[1] == 2
+
+
+def test_merge_errors_of_pruned_states() -> None:
+    """It sums the bounds of pruned states missing each ngram."""
+    first, second = count_shard(TERMS[:4], 1), count_shard(TERMS[4:], 1)
+    second.prune(1)
+    merged = merge_states([first, second])
+    assert merged.bounds[1] == 2
+    keys = [("snacks",), ("keto",), ("low",)]
+    assert merge_errors([first, second], 1, keys) == [0, 2, 2]